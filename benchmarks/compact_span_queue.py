@@ -0,0 +1,87 @@
+"""Measures the memory held per queued span and the time to encode a batch.
+
+Compares the spans the stock BatchSpanProcessor queues with the CompactSpans
+queued by CompactBatchSpanProcessor. Spans are ended through a real
+TracerProvider and kept in a list standing in for the processor queue.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/compact_span_queue.py
+"""
+import gc
+import timeit
+import tracemalloc
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.compact import CompactSpan
+
+QUEUED_SPANS = 10_000
+BATCH_SIZE = 512
+ENCODE_ROUNDS = 20
+
+
+class _Queue(SpanProcessor):
+    """Keeps ended spans alive the way a batch processor queue does."""
+
+    def __init__(self, convert):
+        self.spans = []
+        self._convert = convert
+
+    def on_end(self, span):
+        self.spans.append(self._convert(span))
+
+
+def fill_queue(convert):
+    """Returns the filled queue and the bytes it retains."""
+    queue = _Queue(convert)
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "compact-span-queue"}),
+        sampler=ALWAYS_ON,
+        shutdown_on_exit=False,
+    )
+    provider.add_span_processor(queue)
+    tracer = provider.get_tracer("benchmark")
+    gc.collect()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(QUEUED_SPANS):
+        with tracer.start_as_current_span("GET /items/<id>") as span:
+            span.set_attributes({
+                "http.method": "GET",
+                "http.route": "/items/<id>",
+                "http.target": "/items/" + str(i),
+                "http.status_code": 200,
+                "net.peer.name": "items.example.internal",
+                "net.peer.port": 443,
+            })
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    return queue.spans, after - before
+
+
+def main():
+    print(f"{'queued form':<14} {'bytes/span':>10} "
+          f"{'encode ms/' + str(BATCH_SIZE):>16}")
+    for name, convert in (
+        ("ReadableSpan", lambda span: span),
+        ("CompactSpan", CompactSpan.from_span),
+    ):
+        tracemalloc.start()
+        spans, retained = fill_queue(convert)
+        tracemalloc.stop()
+        batch = spans[:BATCH_SIZE]
+        seconds = min(timeit.repeat(
+            lambda: encode_spans(batch).SerializeToString(),  # pylint: disable=cell-var-from-loop
+            number=1,
+            repeat=ENCODE_ROUNDS,
+        ))
+        print(f"{name:<14} {retained // QUEUED_SPANS:>10} "
+              f"{seconds * 1e3:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
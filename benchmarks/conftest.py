@@ -0,0 +1,42 @@
+import pytest
+from opentelemetry import metrics, trace
+from opentelemetry.util._once import Once
+
+from receiver import OTLPReceiver
+
+
+@pytest.fixture(scope="session")
+def otlp_endpoint():
+    """A local OTLP/HTTP stand-in receiver; yields its base endpoint."""
+    # not decoded, so the receiver costs the exporters as little as possible
+    with OTLPReceiver(decode=False) as receiver:
+        yield receiver.endpoint
+
+
+@pytest.fixture(autouse=True)
+def distro_env(monkeypatch, otlp_endpoint):
+    """Points every exporter the distro builds at the stand-in receiver."""
+    monkeypatch.delenv("DEBUG", raising=False)
+    monkeypatch.setenv("OTEL_EXPORTER_OTLP_ENDPOINT", otlp_endpoint)
+    monkeypatch.setenv("OTEL_SERVICE_NAME", "tgt-benchmarks")
+
+
+def _reset_global_providers():
+    # pylint: disable=protected-access
+    for provider in (trace.get_tracer_provider(), metrics.get_meter_provider()):
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+    trace._TRACER_PROVIDER_SET_ONCE = Once()
+    trace._TRACER_PROVIDER = None
+    metrics._internal._METER_PROVIDER_SET_ONCE = Once()
+    metrics._internal._METER_PROVIDER = None
+
+
+@pytest.fixture
+def reset_global_providers():
+    """
+    Yields a function that shuts down and forgets the globally registered
+    providers, so configure_opentelemetry can register new ones.
+    """
+    yield _reset_global_providers
+    _reset_global_providers()
@@ -0,0 +1,73 @@
+"""Measures Counter.add() throughput at 1, 4, 16 and 64 threads.
+
+Every thread adds to the same attribute set, the worst case for the single
+lock per stream used by the SDK's default sum. Compares that with
+ShardedSumAggregation.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/counter_scaling.py
+"""
+import time
+from threading import Barrier, Thread
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View
+from tgt.opentelemetry.aggregation import ShardedSumAggregation
+
+THREAD_COUNTS = (1, 4, 16, 64)
+TOTAL_ADDS = 640_000
+ATTRIBUTES = {"bee.type": "worker"}
+
+
+def run(views, threads):
+    """Returns add() calls per second across all threads."""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        metric_readers=[reader], views=views, shutdown_on_exit=False
+    )
+    counter = provider.get_meter("benchmark").create_counter("bee_counter")
+    adds = TOTAL_ADDS // threads
+    barrier = Barrier(threads + 1)
+
+    def add():
+        barrier.wait()
+        for _ in range(adds):
+            counter.add(1, ATTRIBUTES)
+
+    workers = [Thread(target=add) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    data = reader.get_metrics_data()
+    (point,) = data.resource_metrics[0].scope_metrics[0] \
+        .metrics[0].data.data_points
+    assert point.value == adds * threads
+    provider.shutdown()
+    return adds * threads / elapsed
+
+
+def main():
+    configurations = (
+        ("default", []),
+        ("sharded", [View(
+            instrument_name="bee_counter",
+            aggregation=ShardedSumAggregation()
+        )]),
+    )
+    print(f"{'aggregation':<14}" + "".join(
+        f"{str(threads) + ' threads':>14}" for threads in THREAD_COUNTS
+    ))
+    for name, views in configurations:
+        rates = [run(views, threads) for threads in THREAD_COUNTS]
+        print(f"{name:<14}" + "".join(f"{rate:>14,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
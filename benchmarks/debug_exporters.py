@@ -0,0 +1,99 @@
+"""Measures request latency with the debug span exporters.
+
+Times requests of one server span with three children, each with a few
+attributes, arriving every millisecond while debug mode writes them to a
+file: before, with the SDK's ConsoleSpanExporter pretty-printing every span
+on the request thread through a SimpleSpanProcessor, and after, with the
+OTLP JSON lines exporter behind a BatchSpanProcessor. Also reports the
+bytes written per span, and the time the batch processor then takes to
+flush the spans still queued.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/debug_exporters.py
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.debug import JsonLinesSpanExporter, JsonLinesWriter
+
+REQUESTS = 5_000
+CHILDREN = 3
+# idle time between requests, leaving the export thread room to run
+INTERVAL = 0.001
+ATTRIBUTES = {
+    "http.method": "GET",
+    "http.route": "/items/<id>",
+    "http.status_code": 200,
+    "net.peer.name": "items.internal",
+}
+
+
+def request_latencies(provider):
+    """Returns the latency of each request in us."""
+    tracer = provider.get_tracer("benchmark")
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter_ns()
+        with tracer.start_as_current_span("GET /items/<id>") as span:
+            span.set_attributes(ATTRIBUTES)
+            for index in range(CHILDREN):
+                with tracer.start_as_current_span(f"query {index}") as child:
+                    child.set_attributes(ATTRIBUTES)
+        latencies.append((time.perf_counter_ns() - start) / 1e3)
+        time.sleep(INTERVAL)
+    return latencies
+
+
+def run(name, path, processor):
+    """Prints the request latencies and output size of the processor."""
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(processor)
+    latencies = sorted(request_latencies(provider))
+    start = time.perf_counter()
+    provider.shutdown()
+    flush = time.perf_counter() - start
+    spans = REQUESTS * (CHILDREN + 1)
+    print(
+        f"{name:<22}{statistics.median(latencies):>10.1f}"
+        f"{latencies[int(len(latencies) * 0.99)]:>10.1f}"
+        f"{os.path.getsize(path) / spans:>12.0f}{flush * 1e3:>12.1f}"
+    )
+
+
+def main():
+    """Prints the latency of each debug exporter."""
+    print(f"{'exporter':<22}{'p50 us':>10}{'p99 us':>10}"
+          f"{'bytes/span':>12}{'flush ms':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        console_path = os.path.join(directory, "console.txt")
+        with open(console_path, "w", encoding="utf-8") as out:
+            run(
+                "console, simple",
+                console_path,
+                SimpleSpanProcessor(ConsoleSpanExporter(out=out))
+            )
+        json_path = os.path.join(directory, "debug.jsonl")
+        writer = JsonLinesWriter(json_path, max_bytes=1 << 30)
+        run(
+            "json lines, batched",
+            json_path,
+            BatchSpanProcessor(
+                JsonLinesSpanExporter(writer),
+                max_queue_size=REQUESTS * (CHILDREN + 1)
+            )
+        )
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
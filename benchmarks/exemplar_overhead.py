@@ -0,0 +1,92 @@
+"""Measures the overhead of exemplar collection on record() and add().
+
+Compares the SDK's default aggregations with ExemplarHistogramAggregation and
+ExemplarSumAggregation, outside any span and inside a sampled span, and
+reports the memory traced by tracemalloc while recording outside a span,
+which should match the default aggregation.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/exemplar_overhead.py
+"""
+import time
+import tracemalloc
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.aggregation import (
+    ExemplarHistogramAggregation,
+    ExemplarSumAggregation
+)
+
+CALLS = 200_000
+ALLOCATION_CALLS = 10_000
+ATTRIBUTES = {"http.route": "/items/<id>"}
+
+
+def instrument(kind, aggregation):
+    """Returns the bound record/add method of a new instrument."""
+    views = [] if aggregation is None else [
+        View(instrument_name="*", aggregation=aggregation)
+    ]
+    provider = MeterProvider(
+        metric_readers=[InMemoryMetricReader()],
+        views=views,
+        shutdown_on_exit=False,
+    )
+    meter = provider.get_meter("benchmark")
+    if kind == "histogram":
+        return meter.create_histogram("latency").record
+    return meter.create_counter("requests").add
+
+
+def per_call_ns(record):
+    """Returns the mean cost of one call in nanoseconds."""
+    record(1, ATTRIBUTES)
+    start = time.perf_counter_ns()
+    for i in range(CALLS):
+        record(i & 1023, ATTRIBUTES)
+    return (time.perf_counter_ns() - start) / CALLS
+
+
+def traced_peak(record):
+    """Returns the peak memory traced while recording outside a span."""
+    record(1, ATTRIBUTES)
+    tracemalloc.start()
+    for i in range(ALLOCATION_CALLS):
+        record(i & 1023, ATTRIBUTES)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("benchmark")
+    print(
+        f"{'instrument':<12}{'aggregation':<12}{'no span ns':>12}"
+        f"{'sampled ns':>12}{'peak bytes':>12}"
+    )
+    for kind, exemplar_aggregation in (
+        ("histogram", ExemplarHistogramAggregation()),
+        ("counter", ExemplarSumAggregation()),
+    ):
+        for name, aggregation in (
+            ("default", None),
+            ("exemplars", exemplar_aggregation),
+        ):
+            record = instrument(kind, aggregation)
+            no_span = per_call_ns(record)
+            with tracer.start_as_current_span("request"):
+                sampled = per_call_ns(record)
+            peak = traced_peak(instrument(kind, aggregation))
+            print(
+                f"{kind:<12}{name:<12}{no_span:>12.0f}"
+                f"{sampled:>12.0f}{peak:>12,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Measures the memory allocated while exporting one batch of spans.
+
+Compares the stock OTLP/HTTP span exporter with PooledHTTPSpanExporter for
+batches of 512 and 4096 spans. Requests are answered by an in-memory session,
+so only encoding, compression and request preparation are measured.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/export_allocations.py
+"""
+import tracemalloc
+
+import requests
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans,
+)
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter as HTTPSpanExporter
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.trace import SpanContext, TraceFlags
+from tgt.opentelemetry.exporter import PooledHTTPSpanExporter
+
+BATCH_SIZES = (512, 4096)
+ROUNDS = 5
+
+
+class _AcceptingSession(requests.Session):
+    """A session that accepts every request without touching the network."""
+
+    def post(self, url, data=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        # touch the whole body like a socket write would
+        self.sent_bytes = len(memoryview(data))
+        return response
+
+
+def make_spans(count):
+    resource = Resource.create({"service.name": "export-allocations"})
+    return [
+        ReadableSpan(
+            name="GET /items/<id>",
+            context=SpanContext(
+                trace_id=i + 1,
+                span_id=i + 1,
+                is_remote=False,
+                trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            ),
+            parent=None,
+            resource=resource,
+            attributes={
+                "http.method": "GET",
+                "http.route": "/items/<id>",
+                "http.target": "/items/" + str(i),
+                "http.status_code": 200,
+                "net.peer.name": "items.example.internal",
+            },
+            start_time=1_700_000_000_000_000_000 + i,
+            end_time=1_700_000_000_000_500_000 + i,
+        )
+        for i in range(count)
+    ]
+
+
+def _peak(export, payload):
+    export(payload)  # warm pools and caches
+    peaks = []
+    for _ in range(ROUNDS):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        export(payload)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    return min(peaks)
+
+
+def measure(exporter, spans):
+    """
+    Returns the peak bytes allocated by a whole export of spans, and by the
+    compress-and-send step alone once the batch is serialized.
+    """
+    serialized = encode_spans(spans).SerializeToString()
+    # pylint: disable=protected-access
+    return _peak(exporter.export, spans), _peak(exporter._export, serialized)
+
+
+def main():
+    tracemalloc.start()
+    print(f"{'exporter':<10} {'compression':<12} {'spans':>6} "
+          f"{'payload':>10} {'export peak':>12} {'send peak':>10}")
+    for compression in (Compression.Gzip, Compression.Deflate):
+        for size in BATCH_SIZES:
+            spans = make_spans(size)
+            for name, exporter_class in (
+                ("stock", HTTPSpanExporter),
+                ("pooled", PooledHTTPSpanExporter),
+            ):
+                session = _AcceptingSession()
+                exporter = exporter_class(
+                    endpoint="http://127.0.0.1:4318/v1/traces",
+                    compression=compression,
+                    session=session,
+                )
+                export_peak, send_peak = measure(exporter, spans)
+                print(f"{name:<10} {compression.value:<12} {size:>6} "
+                      f"{session.sent_bytes:>10} {export_peak:>12} "
+                      f"{send_peak:>10}")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Measures how long short-lived processes take to flush telemetry.
+
+Each run is a fresh interpreter that ends 100 spans and records a counter,
+then exits, against a local OTLP/HTTP stand-in receiver that is healthy,
+answers every request after 2 s, or answers 503 Service Unavailable. The
+time from the end of the work to the end of the process is printed before,
+with the SDK's exit hooks shutting traces and metrics down one after the
+other, and after, with the distro's exit hook shutting them down in
+parallel within a FLUSH_DEADLINE_MILLIS of 2000.
+
+Then times units of work wrapped in invocation(), with FLUSH_MODE set to
+invocation, against the healthy receiver: with no span, so nothing to
+export, and with one span, exported before invocation() returns.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/flush_latency.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from opentelemetry import metrics, trace
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+    OTLPMetricExporter
+)
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter
+)
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from receiver import OTLPReceiver
+from tgt.opentelemetry import configure_opentelemetry, invocation
+from tgt.opentelemetry.flush import TelemetryFlusher, register_flusher
+from tgt.opentelemetry.options import TgtOptions
+
+SPANS = 100
+DEADLINE_MILLIS = 2000
+SLOW_DELAY = 2.0
+INVOCATIONS = 200
+RECEIVERS = ("healthy", "slow", "503")
+
+
+def start_receiver(mode):
+    """Starts a stand-in receiver and returns it."""
+    return OTLPReceiver(
+        latency=SLOW_DELAY if mode == "slow" else 0.0,
+        error_rate=1.0 if mode == "503" else 0.0,
+        decode=False
+    ).start()
+
+
+def child(endpoint, parallel):
+    """Does the work, then prints the time and exits through the hooks."""
+    shutdown_on_exit = not parallel
+    tracer_provider = TracerProvider(
+        sampler=ALWAYS_ON,
+        shutdown_on_exit=shutdown_on_exit
+    )
+    tracer_provider.add_span_processor(
+        BatchSpanProcessor(OTLPSpanExporter(f"{endpoint}/v1/traces"))
+    )
+    meter_provider = MeterProvider(
+        metric_readers=[
+            PeriodicExportingMetricReader(
+                OTLPMetricExporter(f"{endpoint}/v1/metrics")
+            )
+        ],
+        shutdown_on_exit=shutdown_on_exit
+    )
+    if parallel:
+        register_flusher(
+            TelemetryFlusher(
+                tracer_provider,
+                meter_provider,
+                deadline_millis=DEADLINE_MILLIS
+            )
+        )
+    tracer = tracer_provider.get_tracer("benchmark")
+    counter = meter_provider.get_meter("benchmark").create_counter("jobs")
+    for _ in range(SPANS):
+        with tracer.start_as_current_span("job"):
+            counter.add(1)
+    print(time.time(), flush=True)
+
+
+def exit_time(endpoint, parallel):
+    """Returns the seconds a child took to exit after its work."""
+    with subprocess.Popen(
+        [sys.executable, __file__, endpoint, "parallel" if parallel else ""],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True
+    ) as process:
+        done = float(process.stdout.readline())
+        process.wait()
+    return time.time() - done
+
+
+def invocation_latencies(spans):
+    """Returns the latency in ms of each unit of work."""
+    tracer = trace.get_tracer("benchmark")
+    # the distro only samples spans whose parent was sampled
+    parent = trace.set_span_in_context(trace.NonRecordingSpan(
+        trace.SpanContext(
+            trace_id=1,
+            span_id=1,
+            is_remote=True,
+            trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+        )
+    ))
+    latencies = []
+    for _ in range(INVOCATIONS):
+        start = time.perf_counter()
+        with invocation():
+            for _ in range(spans):
+                with tracer.start_as_current_span("job", context=parent):
+                    pass
+        latencies.append((time.perf_counter() - start) * 1e3)
+    return sorted(latencies)
+
+
+def main():
+    """Prints the exit times, then the invocation latencies."""
+    print(f"{'receiver':<10}{'sequential s':>14}{'parallel s':>12}")
+    for mode in RECEIVERS:
+        receiver = start_receiver(mode)
+        endpoint = receiver.endpoint
+        print(
+            f"{mode:<10}{exit_time(endpoint, False):>14.2f}"
+            f"{exit_time(endpoint, True):>12.2f}",
+            flush=True
+        )
+        receiver.stop()
+    receiver = start_receiver("healthy")
+    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = receiver.endpoint
+    configure_opentelemetry(
+        TgtOptions(service_name="benchmark", flush_mode="invocation")
+    )
+    print(f"\n{'invocation':<14}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, spans in (("no span", 0), ("one span", 1)):
+        latencies = invocation_latencies(spans)
+        print(
+            f"{name:<14}{statistics.median(latencies):>10.3f}"
+            f"{latencies[int(len(latencies) * 0.99)]:>10.3f}"
+        )
+    trace.get_tracer_provider().shutdown()
+    metrics.get_meter_provider().shutdown()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        child(sys.argv[1], sys.argv[2] == "parallel")
+    else:
+        main()
@@ -0,0 +1,73 @@
+"""Measures Histogram.record() throughput from 8 threads.
+
+Compares the SDK's default explicit bucket histogram with
+BufferedHistogramAggregation, and reports how long collecting the recorded
+measurements takes afterwards.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/histogram_throughput.py
+"""
+import random
+import time
+from threading import Barrier, Thread
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View
+from tgt.opentelemetry import aggregation
+from tgt.opentelemetry.aggregation import BufferedHistogramAggregation
+
+THREADS = 8
+RECORDS_PER_THREAD = 200_000
+ATTRIBUTES = {"http.route": "/items/<id>", "http.method": "GET"}
+
+
+def run(views):
+    """Returns records per second and collection milliseconds."""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        metric_readers=[reader], views=views, shutdown_on_exit=False
+    )
+    histogram = provider.get_meter("benchmark").create_histogram("latency")
+    values = [random.expovariate(1 / 120) for _ in range(RECORDS_PER_THREAD)]
+    barrier = Barrier(THREADS + 1)
+
+    def record():
+        barrier.wait()
+        for value in values:
+            histogram.record(value, ATTRIBUTES)
+
+    threads = [Thread(target=record) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reader.get_metrics_data()
+    collect = time.perf_counter() - start
+    provider.shutdown()
+    return THREADS * RECORDS_PER_THREAD / elapsed, collect * 1e3
+
+
+def main():
+    buffered = [View(
+        instrument_name="latency",
+        aggregation=BufferedHistogramAggregation()
+    )]
+    print(f"{'aggregation':<20} {'records/s':>12} {'collect ms':>11}")
+    for name, views in (("default", []), ("buffered", buffered)):
+        rate, collect = run(views)
+        print(f"{name:<20} {rate:>12,.0f} {collect:>11.2f}")
+    if aggregation.numpy is not None:
+        aggregation.numpy = None
+        rate, collect = run(buffered)
+        print(f"{'buffered (bisect)':<20} {rate:>12,.0f} {collect:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
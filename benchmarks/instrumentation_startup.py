@@ -0,0 +1,166 @@
+"""Measures the startup time and per-call overhead of instrumentors loaded by
+opentelemetry-instrument, with and without INSTRUMENTATIONS_ENABLED and
+INSTRUMENTATIONS_DISABLED.
+
+The benchmark installs stand-in instrumentors for json, sqlite3, urllib and
+logging into a temporary directory. Each one imports its library and wraps
+one of its functions in a span, like the contrib instrumentors do. It then
+runs a child process under opentelemetry-instrument for each option set,
+reporting the median process startup time and the cost of each wrapped call.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/instrumentation_startup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RUNS = 10
+CALLS = 20_000
+
+# (entry point name, module to import, module:attribute patched, timed call)
+LIBRARIES = [
+    ("json", "json", "json:dumps", "json.dumps({'id': 1})"),
+    ("sqlite3", "sqlite3", "sqlite3:complete_statement",
+     "sqlite3.complete_statement('select 1;')"),
+    ("urllib", "urllib.request", "urllib.parse:quote",
+     "urllib.parse.quote('/items/1 2')"),
+    ("logging", "logging", "logging:Logger.isEnabledFor",
+     "logging.getLogger('bench').isEnabledFor(10)"),
+]
+
+INSTRUMENTOR = '''
+import functools
+import importlib
+from opentelemetry import trace
+from opentelemetry.instrumentation.instrumentor import BaseInstrumentor
+
+importlib.import_module({module!r})
+_module, _path = {target!r}.split(":")
+*_parents, _name = _path.split(".")
+_owner = functools.reduce(getattr, _parents, importlib.import_module(_module))
+
+
+class Instrumentor(BaseInstrumentor):
+    def instrumentation_dependencies(self):
+        return []
+
+    def _instrument(self, **kwargs):
+        original = getattr(_owner, _name)
+        tracer = trace.get_tracer(__name__)
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span({target!r}):
+                return original(*args, **kwargs)
+        setattr(_owner, _name, wrapper)
+
+    def _uninstrument(self, **kwargs):
+        pass
+'''
+
+CHILD = '''
+import json, logging, sqlite3, sys, time, urllib.parse
+calls = {calls}
+results = {{}}
+for name, call in {calls_by_name!r}:
+    code = compile(call, name, "eval")
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        eval(code)
+    results[name] = (time.perf_counter_ns() - start) / calls
+try:
+    from tgt.opentelemetry.instrumentation import instrumentation_report
+    results["report"] = [
+        (t.name, t.total_seconds * 1e3, t.skipped)
+        for t in instrumentation_report()
+    ]
+except ImportError:
+    pass
+print(json.dumps(results))
+'''
+
+SCENARIOS = [
+    ("uninstrumented", None, {}),
+    ("all", "opentelemetry-instrument", {}),
+    ("enabled=json", "opentelemetry-instrument",
+     {"INSTRUMENTATIONS_ENABLED": "json"}),
+    ("disabled=3", "opentelemetry-instrument",
+     {"INSTRUMENTATIONS_DISABLED": "sqlite3,urllib,logging"}),
+]
+
+
+def install_instrumentors(directory: Path):
+    """Writes the stand-in instrumentors and their entry points."""
+    dist_info = directory / "bench_instrumentors-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: bench-instrumentors\nVersion: 1.0\n"
+        "Provides-Extra: instruments\n"
+    )
+    entry_points = ["[opentelemetry_instrumentor]"]
+    for name, module, target, _ in LIBRARIES:
+        (directory / f"bench_instrument_{name}.py").write_text(
+            INSTRUMENTOR.format(module=module, target=target)
+        )
+        entry_points.append(f"{name} = bench_instrument_{name}:Instrumentor")
+    (dist_info / "entry_points.txt").write_text("\n".join(entry_points))
+
+
+def run(command, env, code):
+    """Returns the wall time of one child process and its output."""
+    argv = [sys.executable, "-c", code]
+    if command:
+        argv = [command] + argv
+    start = time.perf_counter()
+    process = subprocess.run(
+        argv, env=env, check=True, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if "Failed to auto initialize" in process.stderr:
+        raise RuntimeError(process.stderr)
+    return elapsed, process.stdout
+
+
+def main():
+    """Prints startup and per-call cost for each option set."""
+    with tempfile.TemporaryDirectory() as directory:
+        install_instrumentors(Path(directory))
+        base_env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(
+                [directory, os.environ.get("PYTHONPATH", "")]
+            ),
+            METRICS_DISABLED="true",
+            OTEL_EXPORTER_OTLP_ENDPOINT="http://127.0.0.1:9",
+        )
+        calls_by_name = [(name, call) for name, _, _, call in LIBRARIES]
+        measure = CHILD.format(calls=CALLS, calls_by_name=calls_by_name)
+        print(f"{'scenario':<16}{'startup ms':>12}"
+              + "".join(f"{name + ' ns':>14}" for name, _ in calls_by_name))
+        for scenario, command, overrides in SCENARIOS:
+            env = dict(base_env, **overrides)
+            startups = [run(command, env, "pass")[0] for _ in range(RUNS)]
+            _, output = run(command, env, measure)
+            results = json.loads(output)
+            print(
+                f"{scenario:<16}{statistics.median(startups) * 1e3:>12.1f}"
+                + "".join(
+                    f"{results[name]:>14.0f}" for name, _ in calls_by_name
+                )
+            )
+            if scenario == "all":
+                report = results.get("report", [])
+        print("\nimport + instrument time with every instrumentor enabled:")
+        for name, total_ms, _ in report:
+            print(f"  {name:<10}{total_ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
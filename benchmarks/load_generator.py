@@ -0,0 +1,161 @@
+"""Drives spans and metrics through the distro at a target rate.
+
+Configures the distro with configure_opentelemetry against an in-process
+OTLPReceiver, then generates requests at the target rate for the given
+duration: each a server span with child spans, a counter increment and a
+histogram record. Once done, flushes what is still queued within
+FLUSH_DEADLINE_MILLIS and prints:
+
+- the rate of spans generated, against the target, and the mean cost of a
+  request, to see whether generating alone saturates the process
+- the spans received and their sustained throughput, and the spans
+  dropped, queued past a full BatchSpanProcessor queue or lost to failed
+  exports
+- the requests the counter recorded in the latest metrics export, against
+  the requests generated
+- the export latency from the end of each span to its arrival, and the
+  time the receiver took per request, as percentiles
+
+The receiver runs in the same process, so on a machine with few cores it
+competes with the generator for the CPU and the GIL; decoding can be
+turned off with --no-decode, at the cost of the span latencies and metric
+sums. Spans are sampled through a sampled remote parent, as the distro
+only samples spans whose parent was.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/load_generator.py --rate 2000 \\
+        --duration 10 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import os
+import time
+
+from opentelemetry import metrics, trace
+from receiver import METRICS, TRACES, OTLPReceiver
+from tgt.opentelemetry import configure_opentelemetry, flush
+from tgt.opentelemetry.options import TgtOptions
+
+COUNTER = "load.requests"
+
+
+def arguments():
+    """Returns the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=1000.0,
+                        help="requests per second to generate")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds to generate requests for")
+    parser.add_argument("--children", type=int, default=2,
+                        help="child spans per request")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds the receiver waits before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of exports answered with 503")
+    parser.add_argument("--metric-interval", type=int, default=1000,
+                        help="milliseconds between metric exports")
+    parser.add_argument("--no-decode", dest="decode", action="store_false",
+                        help="count requests without decoding them")
+    return parser.parse_args()
+
+
+def generate(rate, duration, children):  # pylint: disable=too-many-locals
+    """Generates requests at the rate, and returns how many and the time."""
+    tracer = trace.get_tracer("load")
+    meter = metrics.get_meter("load")
+    counter = meter.create_counter(COUNTER)
+    histogram = meter.create_histogram("load.duration", unit="ms")
+    parent = trace.set_span_in_context(trace.NonRecordingSpan(
+        trace.SpanContext(
+            trace_id=1,
+            span_id=1,
+            is_remote=True,
+            trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+        )
+    ))
+    attributes = {"http.method": "GET", "http.route": "/items/<id>"}
+    requests = 0
+    busy = 0.0
+    start = time.perf_counter()
+    end = start + duration
+    while True:
+        # requests are scheduled, so a generator falling behind catches up
+        scheduled = start + requests / rate
+        if scheduled >= end:
+            break
+        now = time.perf_counter()
+        if scheduled > now:
+            time.sleep(scheduled - now)
+        request_start = time.perf_counter()
+        with tracer.start_as_current_span(
+            "GET /items/<id>",
+            context=parent,
+            kind=trace.SpanKind.SERVER,
+            attributes=attributes
+        ):
+            for index in range(children):
+                with tracer.start_as_current_span(f"query {index}"):
+                    pass
+        counter.add(1, {"http.route": "/items/<id>"})
+        elapsed = time.perf_counter() - request_start
+        histogram.record(elapsed * 1e3, {"http.route": "/items/<id>"})
+        busy += elapsed
+        requests += 1
+    return requests, time.perf_counter() - start, busy
+
+
+def milliseconds(seconds):
+    """Formats seconds as milliseconds."""
+    return "-" if seconds is None else f"{seconds * 1e3:.1f} ms"
+
+
+def main():
+    """Generates the load, then prints what the receiver got."""
+    args = arguments()
+    receiver = OTLPReceiver(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        decode=args.decode
+    ).start()
+    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = receiver.endpoint
+    os.environ["OTEL_METRIC_EXPORT_INTERVAL"] = str(args.metric_interval)
+    configure_opentelemetry(TgtOptions(service_name="load-generator"))
+
+    requests, elapsed, busy = generate(args.rate, args.duration, args.children)
+    flush_start = time.perf_counter()
+    flushed = flush()
+    flush_time = time.perf_counter() - flush_start
+    stats = receiver.stats()
+
+    spans = requests * (args.children + 1)
+    received = stats["items"][TRACES]
+    print(f"generated   {spans / elapsed:>10.0f} spans/s "
+          f"(target {args.rate * (args.children + 1):.0f}), "
+          f"{busy / requests * 1e6:.0f} us per request")
+    if args.decode:
+        print(f"received    {received / (elapsed + flush_time):>10.0f} "
+              f"spans/s, {received} of {spans} spans, "
+              f"{spans - received} dropped")
+    else:
+        print("received    spans not counted, as requests are not decoded")
+    print(f"exports     {stats['requests'][TRACES]:>10} traces, "
+          f"{stats['requests'][METRICS]} metrics, "
+          f"{sum(stats['errors'].values())} failed, "
+          f"{stats['bytes'][TRACES] / max(spans, 1):.0f} bytes/span")
+    if args.decode:
+        print(f"counted     {stats['sums'].get(COUNTER, 0):>10.0f} "
+              f"of {requests} requests")
+        print(f"span delay  p50 {milliseconds(stats['span_delay_p50'])}, "
+              f"p95 {milliseconds(stats['span_delay_p95'])}, "
+              f"p99 {milliseconds(stats['span_delay_p99'])}")
+    print(f"receiver    p50 {milliseconds(stats['request_time_p50'])}, "
+          f"p99 {milliseconds(stats['request_time_p99'])} per request")
+    print(f"flush       {flush_time * 1e3:>10.1f} ms, "
+          f"{'complete' if flushed else 'past the deadline'}")
+    trace.get_tracer_provider().shutdown()
+    metrics.get_meter_provider().shutdown()
+    receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Checks that MEMORY_BUDGET_MB bounds RSS while the collector is down.
+
+Simulates a collector outage: the span exporter blocks until the end of
+the run, so ended spans pile up in a queue raised to 1,000,000 spans, while
+a counter gets a new attribute set, and so a new metric stream, for every
+request. Each configuration runs in a fresh interpreter, unbounded and with
+a 64 MB budget prioritising metrics over traces, and the RSS growth over
+the baseline is printed after each round of requests, along with what the
+budget reserved and shed.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/memory_budget.py
+"""
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.budget import (
+    BudgetedBatchSpanProcessor,
+    BudgetedMeterProvider,
+    MemoryBudget
+)
+
+ROUNDS = 6
+REQUESTS = 10_000
+BUDGET_MB = 64
+MAX_QUEUE_SIZE = 1_000_000
+
+
+# pylint: disable=too-few-public-methods
+class StalledExporter(SpanExporter):
+    """Blocks every export until released, like an unreachable collector."""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def export(self, spans):  # pylint: disable=unused-argument
+        """Waits for the release, then drops the spans."""
+        self.released.wait()
+        return SpanExportResult.SUCCESS
+
+
+def rss_mb():
+    """Returns the resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) \
+                * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # peak rather than current RSS, in KB on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def child(budget_mb):
+    """Runs the workload and prints one JSON line per round."""
+    budget = MemoryBudget(budget_mb * 2**20) if budget_mb else None
+    exporter = StalledExporter()
+    kwargs = {"max_queue_size": MAX_QUEUE_SIZE, "max_export_batch_size": 512}
+    reader = InMemoryMetricReader()
+    if budget is None:
+        processor = BatchSpanProcessor(exporter, **kwargs)
+        meter_provider = MeterProvider(
+            metric_readers=[reader],
+            shutdown_on_exit=False
+        )
+    else:
+        processor = BudgetedBatchSpanProcessor(exporter, budget, **kwargs)
+        meter_provider = BudgetedMeterProvider(
+            budget,
+            metric_readers=[reader],
+            shutdown_on_exit=False
+        )
+    tracer_provider = TracerProvider(
+        sampler=ALWAYS_ON,
+        shutdown_on_exit=False
+    )
+    tracer_provider.add_span_processor(processor)
+    tracer = tracer_provider.get_tracer("benchmark")
+    counter = meter_provider.get_meter("benchmark").create_counter("requests")
+    gc.collect()
+    baseline = rss_mb()
+    for round_number in range(1, ROUNDS + 1):
+        for request in range(REQUESTS):
+            request_id = f"{round_number}-{request}"
+            with tracer.start_as_current_span("GET /items/<id>") as span:
+                span.set_attributes({
+                    "http.method": "GET",
+                    "http.route": "/items/<id>",
+                    "http.target": f"/items/{request_id}",
+                    "http.status_code": 200,
+                    "request.id": request_id,
+                })
+            counter.add(1, {"request.id": request_id})
+        gc.collect()
+        print(json.dumps({
+            "round": round_number,
+            "rss_mb": rss_mb() - baseline,
+            "usage": budget.usage() if budget else None,
+            "dropped": budget.dropped if budget else None,
+        }), flush=True)
+    exporter.released.set()
+    os._exit(0)  # pylint: disable=protected-access
+
+
+def run(budget_mb):
+    """Returns the rounds reported by a child process."""
+    output = subprocess.run(
+        [sys.executable, __file__, str(budget_mb)],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return [json.loads(line) for line in output.splitlines()]
+
+
+def main():
+    """Prints the RSS growth of each configuration per round."""
+    unbounded = run(0)
+    budgeted = run(BUDGET_MB)
+    print(f"{'requests':>10}{'unbounded MB':>14}{f'{BUDGET_MB} MB budget':>16}"
+          f"{'traces MB':>11}{'metrics MB':>12}{'spans shed':>12}"
+          f"{'streams shed':>14}")
+    for free, bounded in zip(unbounded, budgeted):
+        usage, dropped = bounded["usage"], bounded["dropped"]
+        print(
+            f"{free['round'] * REQUESTS:>10}{free['rss_mb']:>14.1f}"
+            f"{bounded['rss_mb']:>16.1f}{usage['traces'] / 2**20:>11.1f}"
+            f"{usage['metrics'] / 2**20:>12.1f}{dropped['traces']:>12}"
+            f"{dropped['metrics']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        child(int(sys.argv[1]))
+    else:
+        main()
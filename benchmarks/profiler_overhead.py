@@ -0,0 +1,94 @@
+"""Measures the CPU overhead of SamplingProfiler at 10-100 Hz.
+
+Runs a CPU-bound workload 20 frames deep on 4 threads, each inside a
+sampled span, for a fixed time without the profiler and with it sampling
+at 10, 25, 50 and 100 Hz. Reports the workload throughput lost to the
+profiler, against a run without it just before, and the profiler thread's
+own CPU time per sample and per second. On a noisy host the CPU time is the
+steadier measure of overhead.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/profiler_overhead.py
+"""
+import os
+import tempfile
+import threading
+import time
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.profiler import (
+    FoldedStackFileExporter,
+    SamplingProfiler
+)
+
+DURATION = 5.0
+THREADS = 4
+DEPTH = 20
+FREQUENCIES = [10, 25, 50, 100]
+
+
+def work(depth):
+    """Recurses to the depth, then does a slice of pure Python work."""
+    if depth:
+        return work(depth - 1)
+    return sum(i * i for i in range(200))
+
+
+def run(tracker):
+    """Returns the work slices done by all threads in DURATION seconds."""
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    if tracker is not None:
+        provider.add_span_processor(tracker)
+    tracer = provider.get_tracer("benchmark")
+    done = threading.Event()
+    counts = []
+
+    def worker():
+        count = 0
+        with tracer.start_as_current_span("job"):
+            while not done.is_set():
+                work(DEPTH)
+                count += 1
+        counts.append(count)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    done.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def main():
+    """Prints the throughput and profiler CPU at each frequency."""
+    print(f"{'frequency':<12}{'off/s':>10}{'on/s':>10}{'overhead':>10}"
+          f"{'us/sample':>12}{'cpu ms/s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for frequency in FREQUENCIES:
+            baseline = run(None)
+            profiler = SamplingProfiler(
+                FoldedStackFileExporter(
+                    os.path.join(directory, f"{frequency}.folded")
+                ),
+                frequency=frequency,
+                export_interval=1.0,
+            )
+            profiler.start()
+            slices = run(profiler.span_tracker)
+            profiler.shutdown()
+            per_sample = profiler.sample_cpu_ns / profiler.sample_count
+            print(
+                f"{f'{frequency} Hz':<12}{baseline / DURATION:>10.0f}"
+                f"{slices / DURATION:>10.0f}"
+                f"{1 - slices / baseline:>10.1%}"
+                f"{per_sample / 1e3:>12.1f}"
+                f"{profiler.sample_cpu_ns / DURATION / 1e6:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
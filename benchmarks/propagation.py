@@ -0,0 +1,91 @@
+"""Measures per-request extract and inject with the default W3C propagators
+and with the distro's caching propagators.
+
+Each request carries a traceparent, drawn from a pool of recent parents or
+unique, and a baggage header drawn from a small pool, as upstream services
+attaching the same user and tenant baggage would send.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/propagation.py
+"""
+import random
+import time
+
+from opentelemetry.baggage.propagation import W3CBaggagePropagator
+from opentelemetry.context import attach, detach
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.trace.propagation.tracecontext import (
+    TraceContextTextMapPropagator
+)
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.propagation import create_propagator
+
+REQUESTS = 50_000
+PARENTS = 256
+BAGGAGE_HEADERS = [
+    f"user.id={user},tenant=store-{user % 7},tier=gold,region=us-central"
+    for user in range(16)
+]
+
+
+def traceparent():
+    """Returns a random sampled traceparent header."""
+    return (
+        f"00-{random.getrandbits(128):032x}-{random.getrandbits(64):016x}-01"
+    )
+
+
+def requests(unique_parents):
+    """Returns the incoming headers of every request."""
+    parents = [traceparent() for _ in range(PARENTS)]
+    return [
+        {
+            "traceparent":
+                traceparent() if unique_parents else random.choice(parents),
+            "baggage": random.choice(BAGGAGE_HEADERS),
+        }
+        for _ in range(REQUESTS)
+    ]
+
+
+def run(propagator, incoming):
+    """Returns the mean extract and inject cost per request in us."""
+    extract_ns = inject_ns = 0
+    for headers in incoming:
+        start = time.perf_counter_ns()
+        context = propagator.extract(headers)
+        middle = time.perf_counter_ns()
+        token = attach(context)
+        outgoing = {}
+        propagator.inject(outgoing)
+        end = time.perf_counter_ns()
+        detach(token)
+        extract_ns += middle - start
+        inject_ns += end - middle
+    return extract_ns / len(incoming) / 1e3, inject_ns / len(incoming) / 1e3
+
+
+def main():
+    """Prints the cost of each propagator with pooled and unique parents."""
+    random.seed(7)
+    print(f"{'propagators':<14}{'parents':<10}{'extract us':>12}"
+          f"{'inject us':>12}")
+    for unique_parents in (False, True):
+        incoming = requests(unique_parents)
+        for name, propagator in (
+            ("default", CompositePropagator([
+                TraceContextTextMapPropagator(),
+                W3CBaggagePropagator(),
+            ])),
+            ("tgt", create_propagator(TgtOptions())),
+        ):
+            extract_us, inject_us = run(propagator, incoming)
+            print(
+                f"{name:<14}{'unique' if unique_parents else 'pooled':<10}"
+                f"{extract_us:>12.2f}{inject_us:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
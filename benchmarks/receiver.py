@@ -0,0 +1,280 @@
+"""A local OTLP/HTTP stand-in receiver for benchmarks and load tests.
+
+Runs in the process using it, on a thread per connection, so exporters
+can be measured without Docker or a collector. Every request is read, and
+optionally decoded to count the spans, metric data points and log records
+it carries, the time from the end of each span to its arrival, and the
+latest value of each sum metric. Latency and error responses can be
+injected, and changed while the receiver runs, to simulate a slow or
+failing collector.
+
+Only OTLP over HTTP with protobuf payloads is served, the one protocol the
+distro exports with.
+
+Typical usage example:
+
+    receiver = OTLPReceiver(latency=0.05, error_rate=0.1)
+    receiver.start()
+    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = receiver.endpoint
+    ...
+    print(receiver.stats())
+    receiver.stop()
+
+Or standalone, printing what it received every 10 seconds:
+
+    $bash> poetry run python benchmarks/receiver.py --port 4318
+"""
+import argparse
+import gzip
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from opentelemetry.proto.collector.logs.v1.logs_service_pb2 import (
+    ExportLogsServiceRequest
+)
+from opentelemetry.proto.collector.metrics.v1.metrics_service_pb2 import (
+    ExportMetricsServiceRequest
+)
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest
+)
+
+TRACES = "traces"
+METRICS = "metrics"
+LOGS = "logs"
+
+_SIGNALS = {
+    "/v1/traces": TRACES,
+    "/v1/metrics": METRICS,
+    "/v1/logs": LOGS,
+}
+
+
+def percentile(values, fraction):
+    """Returns the value at the fraction of the sorted values, or None."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Reads every OTLP/HTTP request, and answers as the receiver is set."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Records the request, then answers 200 OK or the error status."""
+        start = time.perf_counter()
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        status = self.server.receiver.handle(
+            self.path,
+            self.headers.get("Content-Encoding"),
+            body,
+            start
+        )
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keeps the benchmark output clean."""
+
+
+# pylint: disable=too-many-instance-attributes
+class OTLPReceiver:
+    """
+    Receives OTLP/HTTP requests on a local port, counting and timing them.
+
+    Args:
+        port (int): the port to listen on, any free one by default
+        latency (float): the seconds to wait before answering each request
+        error_rate (float): the fraction of requests answered with the
+        error status instead of 200 OK
+        error_status (int): the status of injected errors; 503 and 429 are
+        retried by the exporters, other statuses are not
+        decode (bool): whether to decode the requests to count their items
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        decode: bool = True
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.decode = decode
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        # exporters abandoned at a flush deadline reset their connections
+        self._server.handle_error = lambda request, client_address: None
+        self._server.receiver = self
+        self._thread = None
+        self.reset()
+
+    @property
+    def endpoint(self) -> str:
+        """Returns the base endpoint to export to."""
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "OTLPReceiver":
+        """Starts serving requests on a daemon thread."""
+        self._thread = threading.Thread(
+            name="OTLPReceiver",
+            target=self._server.serve_forever,
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving requests and closes the port."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OTLPReceiver":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def reset(self) -> None:
+        """Forgets everything received so far."""
+        with self._lock:
+            self.requests = dict.fromkeys(_SIGNALS.values(), 0)
+            self.errors = dict.fromkeys(_SIGNALS.values(), 0)
+            self.bytes = dict.fromkeys(_SIGNALS.values(), 0)
+            self.items = dict.fromkeys(_SIGNALS.values(), 0)
+            # seconds each request took to read, decode and answer
+            self.request_times = []
+            # seconds from the end of each span to its arrival
+            self.span_delays = []
+            # the latest value of each sum metric, summed over attributes
+            self.sums = {}
+
+    def handle(
+        self,
+        path: str,
+        encoding: str,
+        body: bytes,
+        start: float
+    ) -> int:
+        """Records a request, and returns the status to answer with."""
+        received_ns = time.time_ns()
+        signal = _SIGNALS.get(path)
+        if signal is None:
+            return 404
+        with self._lock:
+            failed = self.error_rate and \
+                self._random.random() < self.error_rate
+        items, delays, sums = 0, [], {}
+        if self.decode and not failed:
+            if encoding == "gzip":
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+            items, delays, sums = _decode(signal, body, received_ns)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests[signal] += 1
+            self.bytes[signal] += len(body)
+            if failed:
+                self.errors[signal] += 1
+            else:
+                self.items[signal] += items
+                self.span_delays.extend(delays)
+                self.sums.update(sums)
+            self.request_times.append(time.perf_counter() - start)
+        return self.error_status if failed else 200
+
+    def stats(self) -> dict:
+        """Returns a summary of everything received so far."""
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "bytes": dict(self.bytes),
+                "items": dict(self.items),
+                "request_time_p50": percentile(self.request_times, 0.5),
+                "request_time_p99": percentile(self.request_times, 0.99),
+                "span_delay_p50": percentile(self.span_delays, 0.5),
+                "span_delay_p95": percentile(self.span_delays, 0.95),
+                "span_delay_p99": percentile(self.span_delays, 0.99),
+                "sums": dict(self.sums),
+            }
+
+
+def _decode(signal, body, received_ns):
+    """Returns the items, span delays and sum values of a request."""
+    delays, sums = [], {}
+    if signal == TRACES:
+        request = ExportTraceServiceRequest.FromString(body)
+        for resource_spans in request.resource_spans:
+            for scope_spans in resource_spans.scope_spans:
+                delays.extend(
+                    (received_ns - span.end_time_unix_nano) / 1e9
+                    for span in scope_spans.spans
+                )
+        return len(delays), delays, sums
+    if signal == METRICS:
+        request = ExportMetricsServiceRequest.FromString(body)
+        points = 0
+        for resource_metrics in request.resource_metrics:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    data = getattr(metric, metric.WhichOneof("data"))
+                    points += len(data.data_points)
+                    if metric.HasField("sum"):
+                        sums[metric.name] = sum(
+                            point.as_int or point.as_double
+                            for point in data.data_points
+                        )
+        return points, delays, sums
+    request = ExportLogsServiceRequest.FromString(body)
+    return sum(
+        len(scope_logs.log_records)
+        for resource_logs in request.resource_logs
+        for scope_logs in resource_logs.scope_logs
+    ), delays, sums
+
+
+def main():
+    """Serves until interrupted, printing the totals every 10 seconds."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    arguments = parser.parse_args()
+    receiver = OTLPReceiver(
+        arguments.port,
+        arguments.latency,
+        arguments.error_rate,
+        arguments.error_status
+    ).start()
+    print(f"receiving on {receiver.endpoint}", flush=True)
+    try:
+        while True:
+            time.sleep(10)
+            stats = receiver.stats()
+            print(
+                f"requests {stats['requests']} errors {stats['errors']} "
+                f"items {stats['items']}",
+                flush=True
+            )
+    except KeyboardInterrupt:
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
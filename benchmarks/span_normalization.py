@@ -0,0 +1,179 @@
+"""Measures the cost and payload savings of NormalizingSpanProcessor.
+
+Times the rewrite of ended spans named after a request path with an ID,
+with http.target and http.url attributes carrying the ID and a query
+string: with ID segments replaced and no routes, and with 10 and 100
+routes, the requested one listed last. The lifecycle of such a span,
+exported by a SimpleSpanProcessor to a no-op exporter, is timed alongside
+for scale. The 100 routes are also matched
+with one regular expression each, tried in turn, for comparison with the
+single combined expression.
+
+Then encodes a batch of 512 such spans to an OTLP request, as the exporter
+does, and prints its size raw and gzipped, and the number of distinct span
+names, with and without normalization.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/span_normalization.py
+"""
+import gzip
+import re
+import time
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans
+)
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.normalize import (
+    NormalizingSpanProcessor,
+    SpanNormalizer,
+    intern_value,
+    route_pattern
+)
+
+SPANS = 10_000
+REPEATS = 7
+BATCH = 512
+ROUTE = "/items/<int:item_id>"
+
+
+# pylint: disable=too-few-public-methods
+class NoopExporter(SpanExporter):
+    """Drops every span, so only the span lifecycle is measured."""
+
+    def export(self, spans):  # pylint: disable=unused-argument
+        """Drops the spans."""
+        return SpanExportResult.SUCCESS
+
+
+class SequentialNormalizer(SpanNormalizer):
+    """Matches each route with its own regular expression, in turn."""
+
+    def __init__(self, routes):
+        super().__init__()
+        self._sequential = [
+            (re.compile(f"((?:[A-Z]+ )?(?:[a-zA-Z][a-zA-Z0-9+.-]*://[^/?#]*)?)"
+                        f"{route_pattern(route)}(?:[?#].*)?", re.DOTALL),
+             route)
+            for route in routes
+        ]
+
+    def normalize(self, value):
+        """Returns the value rewritten by the first route matching it."""
+        for pattern, route in self._sequential:
+            match = pattern.fullmatch(value)
+            if match is not None:
+                return intern_value(match.group(1) + route)
+        return super().normalize(value)
+
+
+def route_templates(count):
+    """Returns the count of routes, ending with the requested one."""
+    return [f"/resource{index}/<int:id>" for index in range(count - 1)] \
+        + [ROUTE]
+
+
+def end_spans(tracer, count):
+    """Starts and ends the count of spans of distinct requests."""
+    for item in range(count):
+        with tracer.start_as_current_span(f"GET /items/{item}") as span:
+            span.set_attributes({
+                "http.method": "GET",
+                "http.target": f"/items/{item}?ref=home",
+                "http.url": f"http://api.internal/items/{item}?ref=home",
+                "http.status_code": 200,
+            })
+
+
+def provider(normalizer, exporter):
+    """Returns a provider, optionally normalizing before the exporter."""
+    tracer_provider = TracerProvider(
+        sampler=ALWAYS_ON,
+        shutdown_on_exit=False
+    )
+    if normalizer is not None:
+        tracer_provider.add_span_processor(
+            NormalizingSpanProcessor(normalizer)
+        )
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return tracer_provider
+
+
+def finished_spans(count):
+    """Returns the count of ended spans, not normalized."""
+    exporter = InMemorySpanExporter()
+    end_spans(provider(None, exporter).get_tracer("benchmark"), count)
+    return exporter.get_finished_spans()
+
+
+def rewrite_us(normalizer):
+    """Returns the least mean cost of rewriting one ended span in us."""
+    processor = NormalizingSpanProcessor(normalizer)
+    best = None
+    for _ in range(REPEATS):
+        # rewritten in place, so each repeat needs spans of its own
+        spans = finished_spans(SPANS)
+        start = time.perf_counter_ns()
+        for span in spans:
+            processor.on_end(span)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / SPANS / 1e3
+
+
+def lifecycle_us():
+    """Returns the least mean cost of one span, not normalized, in us."""
+    tracer = provider(None, NoopExporter()).get_tracer("benchmark")
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter_ns()
+        end_spans(tracer, SPANS)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / SPANS / 1e3
+
+
+def payload(normalizer):
+    """Returns the raw and gzipped request size and distinct span names."""
+    exporter = InMemorySpanExporter()
+    end_spans(provider(normalizer, exporter).get_tracer("benchmark"), BATCH)
+    spans = exporter.get_finished_spans()
+    request = encode_spans(spans).SerializeToString()
+    return len(request), len(gzip.compress(request)), \
+        len({span.name for span in spans})
+
+
+def main():
+    """Prints the per-span cost, then the payload sizes."""
+    print(f"span lifecycle without normalization: {lifecycle_us():.2f} us\n")
+    print(f"{'normalizer':<28}{'rewrite us/span':>16}")
+    for name, normalizer in (
+        ("ids, no routes", SpanNormalizer()),
+        ("10 routes", SpanNormalizer(route_templates(10))),
+        ("100 routes", SpanNormalizer(route_templates(100))),
+        ("100 routes, one regex each", SequentialNormalizer(route_templates(100))),
+    ):
+        print(f"{name:<28}{rewrite_us(normalizer):>16.2f}")
+    print(f"\n{'batch of 512':<28}{'bytes':>10}{'gzip bytes':>12}"
+          f"{'span names':>12}")
+    for name, normalizer in (
+        ("none", None),
+        ("ids, no routes", SpanNormalizer()),
+        ("10 routes", SpanNormalizer(route_templates(10))),
+    ):
+        raw, compressed, names = payload(normalizer)
+        print(f"{name:<28}{raw:>10}{compressed:>12}{names:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Measures what ResourceUsageSpanProcessor adds to the span lifecycle.
+
+Starts and ends sampled spans exported by a SimpleSpanProcessor to a no-op
+exporter, without the usage processor, with CPU time only, and with CPU
+time and allocations. tracemalloc slows every allocation in the process,
+not only span bookkeeping, so the allocating workload inside the span is
+also timed with tracemalloc off and on.
+
+Typical usage example:
+
+    $bash> poetry run python benchmarks/span_usage.py
+"""
+import time
+import tracemalloc
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from tgt.opentelemetry.usage import ResourceUsageSpanProcessor
+
+SPANS = 10_000
+REPEATS = 5
+ATTRIBUTES = {"http.method": "GET", "http.route": "/items/<id>"}
+
+
+# pylint: disable=too-few-public-methods
+class NoopExporter(SpanExporter):
+    """Drops every span, so only the span lifecycle is measured."""
+
+    def export(self, spans):  # pylint: disable=unused-argument
+        """Drops the spans."""
+        return SpanExportResult.SUCCESS
+
+
+def tracer(usage):
+    """Returns a tracer, optionally with the usage processor first."""
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    if usage is not None:
+        provider.add_span_processor(usage)
+    provider.add_span_processor(SimpleSpanProcessor(NoopExporter()))
+    return provider.get_tracer("benchmark")
+
+
+def per_span_us(span_tracer, work):
+    """Returns the least mean cost of one span around the work in us."""
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter_ns()
+        for _ in range(SPANS):
+            with span_tracer.start_as_current_span("GET /items/<id>") as span:
+                span.set_attributes(ATTRIBUTES)
+                work()
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / SPANS / 1e3
+
+
+def no_work():
+    """An empty span body."""
+
+
+def allocating_work():
+    """A span body allocating like a small request handler."""
+    return [{"id": i, "name": str(i)} for i in range(20)]
+
+
+def main():
+    """Prints the per-span cost of each configuration."""
+    print(f"{'processor':<22}{'empty span us':>15}{'20 dicts us':>15}")
+    for name, usage in (
+        ("none", None),
+        ("cpu time", ResourceUsageSpanProcessor()),
+        ("none, tracemalloc on", "tracemalloc"),
+        ("cpu + allocations", ResourceUsageSpanProcessor(allocations=True)),
+    ):
+        if usage == "tracemalloc":
+            tracemalloc.start()
+            usage = None
+        span_tracer = tracer(usage)
+        empty = per_span_us(span_tracer, no_work)
+        allocating = per_span_us(span_tracer, allocating_work)
+        print(f"{name:<22}{empty:>15.2f}{allocating:>15.2f}")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""pytest-benchmark suite for the distro's hot paths.
+
+Run with `make bench` to compare against the stored baseline, or
+`make bench-baseline` to record a new one.
+"""
+import io
+
+import pytest
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter as HTTPSpanExporter
+)
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.metrics.view import View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.trace import SpanContext, TraceFlags
+
+from tgt.opentelemetry.aggregation import (
+    BufferedHistogramAggregation,
+    ShardedSumAggregation,
+)
+from tgt.opentelemetry.compact import CompactBatchSpanProcessor
+from tgt.opentelemetry.distro import configure_opentelemetry
+from tgt.opentelemetry.exporter import PooledHTTPSpanExporter
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.resource import create_resource
+
+ATTRIBUTES = {"http.route": "/items/<id>", "http.method": "GET"}
+EXPORT_BATCH_SIZE = 512
+
+
+@pytest.mark.benchmark(group="startup")
+def test_options_construction(benchmark):
+    benchmark(TgtOptions)
+
+
+@pytest.mark.benchmark(group="startup")
+def test_create_resource(benchmark):
+    benchmark(create_resource, TgtOptions())
+
+
+@pytest.mark.benchmark(group="startup")
+def test_configure_opentelemetry(benchmark, reset_global_providers):
+    benchmark.pedantic(
+        configure_opentelemetry,
+        setup=reset_global_providers,
+        rounds=20,
+    )
+
+
+def _batch_processor(endpoint):
+    return BatchSpanProcessor(
+        PooledHTTPSpanExporter(endpoint=endpoint + "/v1/traces")
+    )
+
+
+def _compact_processor(endpoint):
+    return CompactBatchSpanProcessor(
+        PooledHTTPSpanExporter(endpoint=endpoint + "/v1/traces")
+    )
+
+
+def _console_processor(_endpoint):
+    return SimpleSpanProcessor(ConsoleSpanExporter(out=io.StringIO()))
+
+
+@pytest.mark.benchmark(group="span")
+@pytest.mark.parametrize("processor", [
+    _batch_processor,
+    _compact_processor,
+    _console_processor,
+], ids=["batch", "compact", "console"])
+def test_span_start_end(benchmark, otlp_endpoint, processor):
+    span_processor = processor(otlp_endpoint)
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(span_processor)
+    tracer = provider.get_tracer("benchmark")
+
+    def start_end():
+        with tracer.start_as_current_span("GET /items/<id>") as span:
+            span.set_attributes(ATTRIBUTES)
+
+    benchmark(start_end)
+    provider.shutdown()
+
+
+def _meter_provider(views):
+    return MeterProvider(
+        metric_readers=[InMemoryMetricReader()],
+        views=views,
+        shutdown_on_exit=False,
+    )
+
+
+@pytest.mark.benchmark(group="metrics")
+@pytest.mark.parametrize("views", [
+    [],
+    [View(instrument_name="requests", aggregation=ShardedSumAggregation())],
+], ids=["default", "sharded"])
+def test_counter_add(benchmark, views):
+    provider = _meter_provider(views)
+    counter = provider.get_meter("benchmark").create_counter("requests")
+    benchmark(counter.add, 1, ATTRIBUTES)
+    provider.shutdown()
+
+
+@pytest.mark.benchmark(group="metrics")
+@pytest.mark.parametrize("views", [
+    [],
+    [View(
+        instrument_name="latency",
+        aggregation=BufferedHistogramAggregation()
+    )],
+], ids=["default", "buffered"])
+def test_histogram_record(benchmark, views):
+    provider = _meter_provider(views)
+    histogram = provider.get_meter("benchmark").create_histogram("latency")
+    benchmark(histogram.record, 42.0, ATTRIBUTES)
+    provider.shutdown()
+
+
+def _spans(count):
+    resource = Resource.create({"service.name": "tgt-benchmarks"})
+    return [
+        ReadableSpan(
+            name="GET /items/<id>",
+            context=SpanContext(
+                trace_id=i + 1,
+                span_id=i + 1,
+                is_remote=False,
+                trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            ),
+            resource=resource,
+            attributes=dict(ATTRIBUTES, **{"http.target": "/items/%d" % i}),
+            start_time=1_700_000_000_000_000_000 + i,
+            end_time=1_700_000_000_000_500_000 + i,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.benchmark(group="export")
+@pytest.mark.parametrize("exporter_class", [
+    HTTPSpanExporter,
+    PooledHTTPSpanExporter,
+], ids=["stock", "pooled"])
+@pytest.mark.parametrize("compression", [
+    Compression.NoCompression,
+    Compression.Gzip,
+], ids=["none", "gzip"])
+def test_export_batch(benchmark, otlp_endpoint, exporter_class, compression):
+    exporter = exporter_class(
+        endpoint=otlp_endpoint + "/v1/traces",
+        compression=compression,
+    )
+    spans = _spans(EXPORT_BATCH_SIZE)
+    benchmark(exporter.export, spans)
+    exporter.shutdown()
@@ -1,2 +1,3 @@
 from tgt.opentelemetry.distro import configure_opentelemetry
+from tgt.opentelemetry.flush import flush, invocation
 from tgt.opentelemetry.options import TgtOptions
@@ -0,0 +1,453 @@
+from array import array
+from bisect import bisect_left
+from itertools import count
+from random import randrange
+from threading import local
+from time import time_ns
+from typing import Dict, List, Optional, Sequence
+from opentelemetry.metrics import Counter, Instrument, Synchronous
+from opentelemetry.sdk.metrics._internal.aggregation import (
+    AggregationTemporality,
+    _Aggregation,
+    _ExplicitBucketHistogramAggregation,
+    _SumAggregation,
+)
+from opentelemetry.sdk.metrics._internal.measurement import Measurement
+from opentelemetry.sdk.metrics.view import (
+    ExplicitBucketHistogramAggregation,
+    SumAggregation,
+)
+from opentelemetry.trace import get_current_span
+from opentelemetry.util.types import Attributes
+from tgt.opentelemetry.exemplars import ExemplarRecord, with_exemplars
+
+# the SDK aggregations keep their state in attributes set up by their own
+# constructors, which pylint cannot follow through the private base classes
+# pylint: disable=attribute-defined-outside-init,no-member
+# pylint: disable=too-few-public-methods
+# overrides of the SDK aggregation interface are documented by the SDK
+# pylint: disable=missing-function-docstring,unused-argument
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    numpy = None
+
+# raw measurements buffered per stream before the recording thread folds
+# them into the bucket counts itself, bounding memory between collections
+DEFAULT_MAX_BUFFERED_MEASUREMENTS = 1 << 16
+
+# exemplars kept per sum stream and collection interval
+DEFAULT_SUM_EXEMPLARS = 4
+
+
+class _ThreadSlot:
+    """
+    The accumulator slot owned by one live thread. The slot index is handed
+    back when the thread exits and its thread-local data is released, so
+    indexes stay bounded by the number of concurrent threads.
+    """
+    __slots__ = ("index",)
+
+    def __init__(self):
+        try:
+            self.index = _free_slots.pop()
+        except IndexError:
+            self.index = next(_next_slot)
+
+    def __del__(self):
+        _free_slots.append(self.index)
+
+
+_free_slots = []
+_next_slot = count()
+_thread_slot = local()
+
+
+def _current_slot() -> int:
+    try:
+        return _thread_slot.slot.index
+    except AttributeError:
+        _thread_slot.slot = _ThreadSlot()
+        return _thread_slot.slot.index
+
+
+def _bucket_values(boundaries: Sequence[float], values: array):
+    """
+    Buckets the values in bulk.
+
+    Args:
+        boundaries (Sequence[float]): the explicit bucket boundaries
+        values (array): the raw measurements, as an array('d')
+
+    Returns:
+        tuple: the per-bucket counts, sum, min and max of the values
+    """
+    if numpy is not None:
+        data = numpy.frombuffer(values, dtype=numpy.float64)
+        counts = numpy.bincount(
+            numpy.searchsorted(boundaries, data, side="left"),
+            minlength=len(boundaries) + 1
+        )
+        return (
+            counts.tolist(),
+            float(data.sum()),
+            float(data.min()),
+            float(data.max()),
+        )
+    counts = [0] * (len(boundaries) + 1)
+    for value in values:
+        counts[bisect_left(boundaries, value)] += 1
+    return counts, sum(values), min(values), max(values)
+
+
+# pylint: disable=too-many-instance-attributes
+class _BufferedHistogramAggregation(_ExplicitBucketHistogramAggregation):
+    """
+    An explicit bucket histogram that appends each measurement to an
+    array('d') and buckets the buffer in bulk when it is collected.
+
+    Recording is a single C-level append, which the GIL makes atomic, so it
+    takes no lock and does no bucket search. A thread preempted between
+    reading the buffer and appending to it can land a value in a buffer that
+    was just swapped out; the swapped buffer and its length at swap time are
+    kept, so such late values are picked up by the following fold.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        attributes: Attributes,
+        start_time_unix_nano: int,
+        boundaries: Sequence[float],
+        record_min_max: bool = True,
+        max_buffered: int = DEFAULT_MAX_BUFFERED_MEASUREMENTS,
+    ):
+        super().__init__(
+            attributes,
+            start_time_unix_nano,
+            boundaries,
+            record_min_max
+        )
+        self._max_buffered = max_buffered
+        self._values = array("d")
+        self._swapped = array("d")
+        self._swapped_length = 0
+
+    def aggregate(self, measurement: Measurement) -> None:
+        values = self._values
+        values.append(measurement.value)
+        if len(values) >= self._max_buffered:
+            self._fold()
+
+    def _fold(self):
+        with self._lock:
+            values = self._values
+            self._values = array("d")
+            pending = self._swapped[self._swapped_length:]
+            length = len(values)
+            pending.extend(values[:length])
+            self._swapped = values
+            self._swapped_length = length
+            if not pending:
+                return
+
+            counts, sum_, min_, max_ = _bucket_values(
+                self._boundaries, pending
+            )
+            self._bucket_counts = [
+                current + new
+                for current, new in zip(self._bucket_counts, counts)
+            ]
+            self._sum += sum_
+            if self._record_min_max:
+                self._min = min(self._min, min_)
+                self._max = max(self._max, max_)
+
+    def collect(self, collection_aggregation_temporality,
+                collection_start_nano):
+        self._fold()
+        return super().collect(
+            collection_aggregation_temporality,
+            collection_start_nano
+        )
+
+
+class BufferedHistogramAggregation(ExplicitBucketHistogramAggregation):
+    """
+    A drop-in replacement for ExplicitBucketHistogramAggregation that buffers
+    raw measurements and buckets them at collection time, using NumPy when it
+    is installed and bisect otherwise.
+
+    Args:
+        boundaries: increasing bucket boundary values, defaulting to the SDK
+        defaults
+        record_min_max: whether to record min and max
+        max_buffered: measurements buffered per stream before they are
+        bucketed early on the recording thread
+        exemplars: whether points carry exemplars, as with
+        ExemplarHistogramAggregation
+    """
+
+    def __init__(
+        self,
+        boundaries: Sequence[float] = None,
+        record_min_max: bool = True,
+        max_buffered: int = DEFAULT_MAX_BUFFERED_MEASUREMENTS,
+        exemplars: bool = False,
+    ):
+        if boundaries is None:
+            super().__init__(record_min_max=record_min_max)
+        else:
+            super().__init__(boundaries, record_min_max)
+        self._max_buffered = max_buffered
+        self._exemplars = exemplars
+
+    def _create_aggregation(
+        self,
+        instrument: Instrument,
+        attributes: Attributes,
+        start_time_unix_nano: int,
+    ) -> _Aggregation:
+        aggregation_class = _ExemplarBufferedHistogramAggregation \
+            if self._exemplars else _BufferedHistogramAggregation
+        return aggregation_class(
+            attributes,
+            start_time_unix_nano,
+            self._boundaries,
+            self._record_min_max,
+            self._max_buffered,
+        )
+
+
+class _ShardedSumAggregation(_SumAggregation):
+    """
+    A sum for synchronous instruments where every thread adds into its own
+    accumulator, merged when the stream is collected.
+
+    Each slot only ever has one writer, so recording takes no lock: the GIL
+    makes the dict read and store atomic with respect to the collector,
+    which only reads. Slots hold running totals and are never reset; the
+    collector hands the growth since the previous collection to the stock
+    sum, which applies the usual temporality conversion.
+    """
+
+    def __init__(
+        self,
+        attributes: Attributes,
+        instrument_is_monotonic: bool,
+        instrument_aggregation_temporality: AggregationTemporality,
+        start_time_unix_nano: int,
+    ):
+        super().__init__(
+            attributes,
+            instrument_is_monotonic,
+            instrument_aggregation_temporality,
+            start_time_unix_nano
+        )
+        self._slots: Dict[int, float] = {}
+        self._collected_total = 0
+
+    def aggregate(self, measurement: Measurement) -> None:
+        slot = _current_slot()
+        slots = self._slots
+        slots[slot] = slots.get(slot, 0) + measurement.value
+
+    def collect(self, collection_aggregation_temporality,
+                collection_start_nano):
+        with self._lock:
+            # list() snapshots the values in a single step, so slots added
+            # by new threads meanwhile cannot break the iteration
+            total = sum(list(self._slots.values()))
+            if total != self._collected_total:
+                self._current_value = total - self._collected_total
+                self._collected_total = total
+        return super().collect(
+            collection_aggregation_temporality,
+            collection_start_nano
+        )
+
+
+class ShardedSumAggregation(SumAggregation):
+    """
+    A SumAggregation whose synchronous streams record into per-thread
+    accumulators merged at collection time. Asynchronous instruments, which
+    are only updated from the collecting thread, keep the stock sum.
+
+    Args:
+        exemplars: whether points carry exemplars, as with
+        ExemplarSumAggregation
+    """
+
+    def __init__(self, exemplars: bool = False):
+        self._exemplars = exemplars
+
+    def _create_aggregation(
+        self,
+        instrument: Instrument,
+        attributes: Attributes,
+        start_time_unix_nano: int,
+    ) -> _Aggregation:
+        if not isinstance(instrument, Synchronous):
+            return super()._create_aggregation(
+                instrument,
+                attributes,
+                start_time_unix_nano
+            )
+        aggregation_class = _ExemplarShardedSumAggregation \
+            if self._exemplars else _ShardedSumAggregation
+        return aggregation_class(
+            attributes,
+            isinstance(instrument, Counter),
+            AggregationTemporality.DELTA,
+            start_time_unix_nano,
+        )
+
+
+class _HistogramExemplars:
+    """
+    Keeps the latest measurement recorded under a sampled span in each
+    bucket of a histogram stream, handed out with the next collected point.
+
+    Checking for a sampled span only reads the current context and
+    allocates nothing, so recording without one costs a few attribute
+    lookups.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._exemplars: List[Optional[ExemplarRecord]] = \
+            [None] * (len(self._boundaries) + 1)
+
+    def aggregate(self, measurement: Measurement) -> None:
+        super().aggregate(measurement)
+        span_context = get_current_span().get_span_context()
+        if span_context.trace_flags.sampled:
+            value = measurement.value
+            self._exemplars[bisect_left(self._boundaries, value)] = (
+                value, time_ns(), span_context.trace_id, span_context.span_id
+            )
+
+    def collect(self, collection_aggregation_temporality,
+                collection_start_nano):
+        point = super().collect(
+            collection_aggregation_temporality,
+            collection_start_nano
+        )
+        exemplars = self._exemplars
+        self._exemplars = [None] * len(exemplars)
+        if point is None:
+            return None
+        return with_exemplars(point, exemplars)
+
+
+class _SumExemplars:
+    """
+    Keeps a fixed-size, uniformly sampled reservoir of the measurements
+    recorded under a sampled span in a sum stream, handed out with the next
+    collected point.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._exemplars: List[Optional[ExemplarRecord]] = \
+            [None] * DEFAULT_SUM_EXEMPLARS
+        self._offered = 0
+
+    def aggregate(self, measurement: Measurement) -> None:
+        super().aggregate(measurement)
+        span_context = get_current_span().get_span_context()
+        if span_context.trace_flags.sampled:
+            offered = self._offered
+            self._offered = offered + 1
+            if offered >= DEFAULT_SUM_EXEMPLARS:
+                offered = randrange(offered + 1)
+            if offered < DEFAULT_SUM_EXEMPLARS:
+                self._exemplars[offered] = (
+                    measurement.value,
+                    time_ns(),
+                    span_context.trace_id,
+                    span_context.span_id,
+                )
+
+    def collect(self, collection_aggregation_temporality,
+                collection_start_nano):
+        point = super().collect(
+            collection_aggregation_temporality,
+            collection_start_nano
+        )
+        exemplars = self._exemplars
+        self._exemplars = [None] * DEFAULT_SUM_EXEMPLARS
+        self._offered = 0
+        if point is None:
+            return None
+        return with_exemplars(point, exemplars)
+
+
+class _ExemplarHistogramAggregation(
+    _HistogramExemplars, _ExplicitBucketHistogramAggregation
+):
+    pass
+
+
+class _ExemplarBufferedHistogramAggregation(
+    _HistogramExemplars, _BufferedHistogramAggregation
+):
+    pass
+
+
+class _ExemplarSumAggregation(_SumExemplars, _SumAggregation):
+    pass
+
+
+class _ExemplarShardedSumAggregation(_SumExemplars, _ShardedSumAggregation):
+    pass
+
+
+class ExemplarHistogramAggregation(ExplicitBucketHistogramAggregation):
+    """
+    An ExplicitBucketHistogramAggregation whose points carry exemplars: the
+    trace and span IDs of the latest measurement recorded in each bucket
+    while a sampled span was active.
+    """
+
+    def _create_aggregation(
+        self,
+        instrument: Instrument,
+        attributes: Attributes,
+        start_time_unix_nano: int,
+    ) -> _Aggregation:
+        return _ExemplarHistogramAggregation(
+            attributes,
+            start_time_unix_nano,
+            self._boundaries,
+            self._record_min_max,
+        )
+
+
+class ExemplarSumAggregation(SumAggregation):
+    """
+    A SumAggregation whose synchronous streams carry exemplars: the trace and
+    span IDs of a fixed-size sample of the measurements recorded while a
+    sampled span was active. Asynchronous instruments, which are recorded
+    outside of any span, keep the stock sum.
+    """
+
+    def _create_aggregation(
+        self,
+        instrument: Instrument,
+        attributes: Attributes,
+        start_time_unix_nano: int,
+    ) -> _Aggregation:
+        if not isinstance(instrument, Synchronous):
+            return super()._create_aggregation(
+                instrument,
+                attributes,
+                start_time_unix_nano
+            )
+        return _ExemplarSumAggregation(
+            attributes,
+            isinstance(instrument, Counter),
+            AggregationTemporality.DELTA,
+            start_time_unix_nano,
+        )
@@ -0,0 +1,397 @@
+"""Bounds the memory all telemetry buffers may hold together.
+
+Every buffer growing with load reserves an approximate size for each item
+it keeps from one process-wide MemoryBudget, and gives it back once the
+item is exported: spans queued for export, metric streams (one per
+instrument and attribute set, kept for the life of the provider), and the
+stacks the profiler keeps until it exports them as logs. An item is shed
+instead of kept when its reservation would not fit; measurements of metric
+streams that do not fit are folded into one overflow stream.
+
+Signals are ranked by MEMORY_BUDGET_PRIORITY, highest first. The highest
+ranked signal may fill the whole budget, and each lower rank stops 10% of
+the budget earlier, so under pressure the lowest priority signal is shed
+first while higher priority ones still have room.
+
+Typical usage example:
+
+    $bash> MEMORY_BUDGET_MB=64 MEMORY_BUDGET_PRIORITY=metrics,traces,logs \\
+        opentelemetry-instrument python app.py
+
+Sizes are estimates of the Python objects held, calibrated with
+tracemalloc against opentelemetry-sdk 1.22, not exact accounting. Memory
+held by exporters while encoding and sending a batch is not counted.
+"""
+import collections
+import os
+import sys
+import weakref
+from logging import getLogger
+from threading import Lock
+from typing import Dict, Iterable, Optional, Sequence, Set
+from opentelemetry.sdk.metrics import Histogram, MeterProvider
+from opentelemetry.sdk.metrics._internal.measurement import Measurement
+from opentelemetry.sdk.metrics._internal.measurement_consumer import (
+    MeasurementConsumer
+)
+from opentelemetry.sdk.metrics.export import Metric
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult
+)
+from opentelemetry.util.types import Attributes
+from tgt.opentelemetry.compact import CompactBatchSpanProcessor, CompactSpan
+from tgt.opentelemetry.options import (
+    DEFAULT_MEMORY_BUDGET_PRIORITY,
+    TgtOptions
+)
+
+_logger = getLogger(__name__)
+
+TRACES = "traces"
+METRICS = "metrics"
+LOGS = "logs"
+
+# share of the budget each lower priority rank leaves to the ranks above
+PRIORITY_HEADROOM = 0.1
+
+# approximate bytes held by an ended span, a CompactSpan, one of their
+# events or links, and a metric stream with its key in the budgeted
+# measurement consumer, without their attributes
+SPAN_SIZE = 2700
+COMPACT_SPAN_SIZE = 480
+EVENT_SIZE = 600
+STREAM_SIZE = 900
+HISTOGRAM_STREAM_SIZE = 1100
+
+# approximate bytes held by an attribute besides its key and value, as a
+# dict entry and as an entry of a CompactSpan's value tuple
+_ATTRIBUTE_ENTRY_SIZE = 80
+_COMPACT_ATTRIBUTE_ENTRY_SIZE = 16
+
+# the attributes of measurements whose attribute set did not fit
+OVERFLOW_ATTRIBUTES = {"otel.metric.overflow": True}
+
+
+def _value_size(value) -> int:
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(map(sys.getsizeof, value))
+    return sys.getsizeof(value)
+
+
+def attributes_size(attributes: Attributes) -> int:
+    """
+    Returns the approximate bytes held by the attributes of a span, event
+    or data point.
+
+    Args:
+        attributes (Attributes): the attributes, or None
+    """
+    if not attributes:
+        return 0
+    return sum(
+        _ATTRIBUTE_ENTRY_SIZE + sys.getsizeof(key) + _value_size(value)
+        for key, value in attributes.items()
+    )
+
+
+def span_size(span: ReadableSpan) -> int:
+    """
+    Returns the approximate bytes held by the ended span while queued.
+
+    Args:
+        span (ReadableSpan): an ended span, or a CompactSpan
+    """
+    if isinstance(span, CompactSpan):
+        # the attribute keys are shared between compact spans
+        # pylint: disable=protected-access
+        size = COMPACT_SPAN_SIZE + sum(
+            _COMPACT_ATTRIBUTE_ENTRY_SIZE + _value_size(value)
+            for value in span._attribute_values
+        )
+    else:
+        size = SPAN_SIZE + attributes_size(span.attributes)
+    for event in span.events:
+        size += EVENT_SIZE + attributes_size(event.attributes)
+    for link in span.links:
+        size += EVENT_SIZE + attributes_size(link.attributes)
+    return size + len(span.name)
+
+
+class MemoryBudget:
+    """
+    A process-wide account of the bytes held by telemetry buffers, shared
+    by every signal, which refuses reservations from a signal once they
+    would take the total past that signal's share.
+    """
+
+    def __init__(
+        self,
+        limit_bytes: int,
+        priority: Optional[Sequence[str]] = None
+    ):
+        priority = priority or DEFAULT_MEMORY_BUDGET_PRIORITY
+        unknown = set(priority) - {TRACES, METRICS, LOGS}
+        if unknown:
+            raise ValueError(
+                f"unknown signals {sorted(unknown)} in the budget priority"
+            )
+        self.limit_bytes = limit_bytes
+        # signals missing from the priority rank below every listed one
+        self._thresholds = {
+            signal: limit_bytes * (1 - PRIORITY_HEADROOM * len(priority))
+            for signal in (TRACES, METRICS, LOGS)
+        }
+        for rank, signal in enumerate(priority):
+            self._thresholds[signal] = \
+                limit_bytes * (1 - PRIORITY_HEADROOM * rank)
+        self._used = dict.fromkeys(self._thresholds, 0)
+        self._total = 0
+        self.dropped = dict.fromkeys(self._thresholds, 0)
+        self._lock = Lock()
+        if hasattr(os, "register_at_fork"):
+            # the lock may have been held by another thread at the fork
+            weak_reinit = weakref.WeakMethod(self._at_fork_reinit)
+            os.register_at_fork(
+                # pylint: disable=unnecessary-lambda
+                after_in_child=lambda: weak_reinit()()
+            )
+
+    def _at_fork_reinit(self):
+        self._lock = Lock()
+
+    @property
+    def used_bytes(self) -> int:
+        """
+        Returns the bytes currently reserved by all signals.
+        """
+        return self._total
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Returns the bytes currently reserved by each signal.
+        """
+        with self._lock:
+            return dict(self._used)
+
+    def reserve(self, signal: str, size: int) -> bool:
+        """
+        Reserves the bytes for an item of the signal, if they fit within
+        the signal's share of the budget.
+
+        Args:
+            signal (str): one of TRACES, METRICS or LOGS
+            size (int): the approximate bytes the item will hold
+
+        Returns:
+            bool: whether the item may be kept; if not, it must be dropped
+        """
+        with self._lock:
+            if self._total + size > self._thresholds[signal]:
+                if not self.dropped[signal]:
+                    _logger.warning(
+                        "Telemetry memory budget of %d bytes exhausted, "
+                        "dropping %s",
+                        self.limit_bytes,
+                        signal
+                    )
+                self.dropped[signal] += 1
+                return False
+            self._total += size
+            self._used[signal] += size
+            return True
+
+    def release(self, signal: str, size: int) -> None:
+        """
+        Returns the bytes reserved for items of the signal that are no
+        longer held.
+
+        Args:
+            signal (str): one of TRACES, METRICS or LOGS
+            size (int): the bytes reserved for the items
+        """
+        with self._lock:
+            self._total -= size
+            self._used[signal] -= size
+
+
+# pylint: disable=too-few-public-methods
+class _ReleasingSpanExporter(SpanExporter):
+    """
+    Releases the reservations of the spans it exports, whether the export
+    succeeds or not, as the batch processor drops them either way.
+    """
+
+    def __init__(self, span_exporter: SpanExporter, budget: MemoryBudget):
+        self.span_exporter = span_exporter
+        self._budget = budget
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Exports the spans, then releases their reservations."""
+        try:
+            return self.span_exporter.export(spans)
+        finally:
+            self._budget.release(TRACES, sum(map(span_size, spans)))
+
+    def shutdown(self) -> None:
+        """Shuts the wrapped exporter down."""
+        self.span_exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Flushes the wrapped exporter."""
+        return self.span_exporter.force_flush(timeout_millis)
+
+
+# pylint: disable=too-few-public-methods
+class BudgetedBatchSpanProcessor(BatchSpanProcessor):
+    """
+    A BatchSpanProcessor that reserves each queued span from the budget,
+    and drops the span if it does not fit.
+
+    When the queue is full, the span being ended is dropped, where the
+    BatchSpanProcessor drops the oldest queued one, so that every queued
+    span reaches the exporter and has its reservation released. The queue
+    itself is unbounded, so spans racing past a full queue are kept rather
+    than silently evicting others.
+    """
+
+    def __init__(
+        self,
+        span_exporter: SpanExporter,
+        budget: MemoryBudget,
+        **kwargs
+    ):
+        super().__init__(
+            _ReleasingSpanExporter(span_exporter, budget),
+            **kwargs
+        )
+        self.queue = collections.deque()
+        self._budget = budget
+        self._queue_full = False
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Queues the span if the queue and the budget have room for it."""
+        if not span.context.trace_flags.sampled or self.done:
+            return
+        if len(self.queue) >= self.max_queue_size:
+            if not self._queue_full:
+                _logger.warning("Queue is full, likely spans will be dropped.")
+                self._queue_full = True
+            return
+        if self._budget.reserve(TRACES, span_size(span)):
+            super().on_end(span)
+
+    def _at_fork_reinit(self):
+        # the child drops the spans queued and being exported when it
+        # forked, so their reservations are released with them
+        in_flight = [span for span in self.spans_list if span is not None]
+        self._budget.release(
+            TRACES,
+            sum(map(span_size, (*self.queue, *in_flight)))
+        )
+        self.spans_list[:] = [None] * len(self.spans_list)
+        super()._at_fork_reinit()
+
+
+# pylint: disable=too-many-ancestors
+class BudgetedCompactBatchSpanProcessor(
+    CompactBatchSpanProcessor,
+    BudgetedBatchSpanProcessor
+):
+    """
+    A CompactBatchSpanProcessor reserving the size of each CompactSpan
+    from the budget.
+    """
+
+
+class BudgetedMeasurementConsumer(MeasurementConsumer):
+    """
+    Reserves every new attribute set of a synchronous instrument from the
+    budget before its measurements reach the SDK, which keeps a metric
+    stream for each set for the life of the meter provider. Measurements
+    of sets that do not fit are recorded with the single
+    otel.metric.overflow=true attribute instead, as the specification's
+    cardinality limit does, so totals stay correct while the number of
+    streams stays bounded.
+
+    Observable instruments are not budgeted: their callbacks report the
+    current attribute sets at each collection.
+    """
+
+    def __init__(self, consumer: MeasurementConsumer, budget: MemoryBudget):
+        self._consumer = consumer
+        self._budget = budget
+        self._streams: Dict[object, Set[frozenset]] = {}
+        self._lock = Lock()
+
+    def consume_measurement(self, measurement: Measurement) -> None:
+        """Passes the measurement on, overflowing attribute sets that do
+        not fit in the budget."""
+        key = frozenset((measurement.attributes or {}).items())
+        streams = self._streams.get(measurement.instrument)
+        if streams is None or key not in streams:
+            if not self._admit(measurement, key):
+                measurement = Measurement(
+                    measurement.value,
+                    measurement.instrument,
+                    OVERFLOW_ATTRIBUTES
+                )
+        self._consumer.consume_measurement(measurement)
+
+    def _admit(self, measurement: Measurement, key: frozenset) -> bool:
+        with self._lock:
+            streams = self._streams.setdefault(measurement.instrument, set())
+            if key in streams:
+                return True
+            size = HISTOGRAM_STREAM_SIZE \
+                if isinstance(measurement.instrument, Histogram) \
+                else STREAM_SIZE
+            if not self._budget.reserve(
+                METRICS, size + attributes_size(measurement.attributes)
+            ):
+                return False
+            streams.add(key)
+            return True
+
+    def register_asynchronous_instrument(self, instrument) -> None:
+        """Registers the observable instrument with the SDK's consumer."""
+        self._consumer.register_asynchronous_instrument(instrument)
+
+    def collect(
+        self,
+        metric_reader,
+        timeout_millis: float = 10_000
+    ) -> Iterable[Metric]:
+        """Collects the metrics from the SDK's consumer."""
+        return self._consumer.collect(metric_reader, timeout_millis)
+
+
+class BudgetedMeterProvider(MeterProvider):
+    """
+    A MeterProvider whose meters send measurements through a
+    BudgetedMeasurementConsumer.
+    """
+
+    def __init__(self, budget: MemoryBudget, **kwargs):
+        super().__init__(**kwargs)
+        self._measurement_consumer = BudgetedMeasurementConsumer(
+            self._measurement_consumer,
+            budget
+        )
+
+
+def create_memory_budget(options: TgtOptions) -> Optional[MemoryBudget]:
+    """
+    Returns the memory budget set in the options, or None if unbounded.
+
+    Args:
+        options (TgtOptions): the Target options to configure with
+    """
+    if options.memory_budget_mb <= 0:
+        return None
+    return MemoryBudget(
+        options.memory_budget_mb * 1024 * 1024,
+        options.memory_budget_priority
+    )
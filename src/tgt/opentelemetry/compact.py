@@ -0,0 +1,179 @@
+import sys
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import Link, SpanContext, SpanKind
+from opentelemetry.trace.status import Status, StatusCode
+
+# upper bound on the number of distinct attribute key sets kept interned,
+# least recently used first out
+MAX_INTERNED_KEY_SETS = 4096
+
+_interned_key_sets: "OrderedDict[Tuple[str, ...], Tuple[str, ...]]" = \
+    OrderedDict()
+_UNSET_STATUS = Status(StatusCode.UNSET)
+
+
+def intern_keys(keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Returns a shared instance of the attribute key tuple, with every key
+    interned, so spans carrying the same attribute names reference a single
+    tuple instead of each holding their own keys.
+
+    Args:
+        keys (tuple): the attribute keys of a span, in insertion order
+
+    Returns:
+        tuple: the shared key tuple
+    """
+    shared = _interned_key_sets.get(keys)
+    # another thread may evict the key set in between, so misses are allowed
+    if shared is None:
+        shared = tuple(sys.intern(key) for key in keys)
+        _interned_key_sets[shared] = shared
+        if len(_interned_key_sets) > MAX_INTERNED_KEY_SETS:
+            try:
+                _interned_key_sets.popitem(last=False)
+            except KeyError:
+                pass
+    else:
+        try:
+            _interned_key_sets.move_to_end(keys)
+        except KeyError:
+            pass
+    return shared
+
+
+# pylint: disable=too-many-instance-attributes
+class CompactSpan:
+    """
+    A slotted, immutable record of an ended span.
+
+    Holds only what the OTLP encoder reads. Attributes are stored as a shared
+    key tuple plus a value tuple, and the locks, bounded containers and
+    limits kept alive by a ReadableSpan are dropped. Exposes the subset of the
+    ReadableSpan interface the OTLP encoders use, so batches of CompactSpans
+    can be handed straight to the exporter.
+    """
+    __slots__ = (
+        "name",
+        "context",
+        "parent",
+        "kind",
+        "start_time",
+        "end_time",
+        "status",
+        "resource",
+        "instrumentation_scope",
+        "events",
+        "links",
+        "dropped_attributes",
+        "dropped_events",
+        "dropped_links",
+        "_attribute_keys",
+        "_attribute_values",
+    )
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent: Optional[SpanContext],
+        kind: SpanKind,
+        start_time: int,
+        end_time: int,
+        status: Status,
+        resource: Resource,
+        instrumentation_scope: Optional[InstrumentationScope],
+        attribute_keys: Tuple[str, ...] = (),
+        attribute_values: tuple = (),
+        events: Sequence[Event] = (),
+        links: Sequence[Link] = (),
+        dropped_attributes: int = 0,
+        dropped_events: int = 0,
+        dropped_links: int = 0,
+    ):
+        self.name = name
+        self.context = context
+        self.parent = parent
+        self.kind = kind
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = status
+        self.resource = resource
+        self.instrumentation_scope = instrumentation_scope
+        self.events = events
+        self.links = links
+        self.dropped_attributes = dropped_attributes
+        self.dropped_events = dropped_events
+        self.dropped_links = dropped_links
+        self._attribute_keys = attribute_keys
+        self._attribute_values = attribute_values
+
+    @classmethod
+    def from_span(cls, span: ReadableSpan) -> "CompactSpan":
+        """
+        Builds a CompactSpan from an ended span.
+
+        Args:
+            span (ReadableSpan): the span handed to SpanProcessor.on_end
+
+        Returns:
+            CompactSpan: the compact record of the span
+        """
+        attributes = span.attributes
+        status = span.status
+        if status.status_code is StatusCode.UNSET \
+           and status.description is None:
+            status = _UNSET_STATUS
+        return cls(
+            name=span.name,
+            context=span.context,
+            parent=span.parent,
+            kind=span.kind,
+            start_time=span.start_time,
+            end_time=span.end_time,
+            status=status,
+            resource=span.resource,
+            instrumentation_scope=span.instrumentation_scope,
+            attribute_keys=intern_keys(tuple(attributes)),
+            attribute_values=tuple(attributes.values()),
+            events=span.events,
+            links=span.links,
+            dropped_attributes=span.dropped_attributes,
+            dropped_events=span.dropped_events,
+            dropped_links=span.dropped_links,
+        )
+
+    @property
+    def attributes(self) -> dict:
+        """
+        Returns the span attributes as a new dict.
+        """
+        return dict(zip(self._attribute_keys, self._attribute_values))
+
+    def get_span_context(self) -> SpanContext:
+        """
+        Returns the SpanContext of the span.
+        """
+        return self.context
+
+
+# pylint: disable=too-few-public-methods
+class CompactBatchSpanProcessor(BatchSpanProcessor):
+    """
+    A BatchSpanProcessor that queues ended spans as CompactSpans.
+
+    Sampled spans are converted once, on the thread ending them, and the
+    exporter encodes directly from the compact records.
+    """
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Queues the sampled span as a CompactSpan."""
+        if not span.context.trace_flags.sampled:
+            return
+        super().on_end(CompactSpan.from_span(span))
@@ -0,0 +1,247 @@
+"""Writes telemetry as OTLP JSON lines for debugging.
+
+Each export writes one compact JSON line holding the OTLP export request
+a collector would have received, with trace and span IDs in hex, to stdout
+or to a file rotated by size. The exporters are meant to run behind the
+batching span processor and the periodic metric reader, so the encoding
+and writing happen on their background threads and never on the thread
+ending a span.
+
+Typical usage example:
+
+    $bash> DEBUG=true DEBUG_FILE=/tmp/telemetry.jsonl python app.py
+"""
+import json
+import os
+import sys
+from base64 import b64decode
+from logging import getLogger
+from threading import Lock
+from typing import Dict, Optional, Sequence
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.message import Message
+from opentelemetry.exporter.otlp.proto.common._log_encoder import (
+    encode_logs
+)
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans
+)
+from opentelemetry.sdk._logs import LogData
+from opentelemetry.sdk._logs.export import LogExporter, LogExportResult
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    MetricsData
+)
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from tgt.opentelemetry.exemplars import encode_metrics_with_exemplars
+from tgt.opentelemetry.options import (
+    DEFAULT_DEBUG_FILE_MAX_BYTES,
+    TgtOptions
+)
+
+_logger = getLogger(__name__)
+
+# rotated files kept next to the debug file, as <path>.1 to <path>.N
+DEFAULT_DEBUG_FILE_BACKUPS = 3
+
+# OTLP JSON carries these bytes fields as hex rather than base64
+_ID_FIELDS = frozenset(("traceId", "spanId", "parentSpanId"))
+
+_writers: Dict[Optional[str], "JsonLinesWriter"] = {}
+_writers_lock = Lock()
+
+
+def _hex_ids(value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in _ID_FIELDS:
+                value[key] = b64decode(item).hex()
+            else:
+                _hex_ids(item)
+    elif isinstance(value, list):
+        for item in value:
+            _hex_ids(item)
+
+
+def to_json_line(request: Message) -> str:
+    """
+    Returns the OTLP export request as one line of OTLP JSON.
+
+    Args:
+        request (Message): an encoded OTLP export request
+    """
+    encoded = MessageToDict(request, use_integers_for_enums=True)
+    _hex_ids(encoded)
+    return json.dumps(encoded, separators=(",", ":"))
+
+
+class JsonLinesWriter:
+    """
+    Writes lines to stdout, or appends them to a file that is rotated
+    once it would grow past max_bytes, keeping backup_count older files.
+    Writes are serialized, so exporters of every signal can share one
+    writer without interleaving their lines.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = DEFAULT_DEBUG_FILE_MAX_BYTES,
+        backup_count: int = DEFAULT_DEBUG_FILE_BACKUPS
+    ):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._file = None
+        self._size = 0
+        self._lock = Lock()
+
+    def write(self, lines: Sequence[str]) -> None:
+        """
+        Writes the lines, each followed by a newline, and flushes them.
+
+        Args:
+            lines (sequence): the lines to write, without newlines
+        """
+        data = "".join(f"{line}\n" for line in lines)
+        with self._lock:
+            if self._path is None:
+                # looked up on every write, so redirecting stdout works
+                sys.stdout.write(data)
+                sys.stdout.flush()
+                return
+            if self._file is None:
+                self._open()
+            if self._size and self._size + len(data) > self._max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            # JSON is encoded as ASCII, so characters are bytes
+            self._size += len(data)
+
+    def close(self) -> None:
+        """
+        Closes the file, if one is open.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> None:
+        # pylint: disable=consider-using-with
+        self._file = open(self._path, "a", encoding="ascii")
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        # dropped first, so a failed reopen is retried by the next write
+        self._file = None
+        try:
+            for index in range(self._backup_count - 1, 0, -1):
+                source = f"{self._path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self._path}.{index + 1}")
+            if self._backup_count:
+                os.replace(self._path, f"{self._path}.1")
+            else:
+                os.remove(self._path)
+        except OSError:
+            # keep appending to the original path rather than losing lines
+            _logger.warning("Failed to rotate %s", self._path, exc_info=True)
+        self._open()
+
+
+def json_lines_writer(options: TgtOptions) -> JsonLinesWriter:
+    """
+    Returns the writer for the debug file in the options, or stdout,
+    shared by every exporter writing there.
+
+    Args:
+        options (TgtOptions): the Target options to configure with
+    """
+    with _writers_lock:
+        writer = _writers.get(options.debug_file)
+        if writer is None:
+            writer = _writers[options.debug_file] = JsonLinesWriter(
+                options.debug_file,
+                options.debug_file_max_bytes
+            )
+        return writer
+
+
+# pylint: disable=too-few-public-methods
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Writes each batch of spans as an OTLP JSON ExportTraceServiceRequest.
+    """
+
+    def __init__(self, writer: JsonLinesWriter):
+        self._writer = writer
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """Writes the spans as one line."""
+        try:
+            self._writer.write([to_json_line(encode_spans(spans))])
+        except (OSError, ValueError):
+            _logger.exception("Failed to write spans")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+class JsonLinesMetricExporter(MetricExporter):
+    """
+    Writes each collection as an OTLP JSON ExportMetricsServiceRequest,
+    exemplars included.
+    """
+
+    def __init__(self, writer: JsonLinesWriter):
+        super().__init__()
+        self._writer = writer
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,  # pylint: disable=unused-argument
+        **kwargs,  # pylint: disable=unused-argument
+    ) -> MetricExportResult:
+        """Writes the metrics as one line."""
+        try:
+            self._writer.write(
+                [to_json_line(encode_metrics_with_exemplars(metrics_data))]
+            )
+        except (OSError, ValueError):
+            _logger.exception("Failed to write metrics")
+            return MetricExportResult.FAILURE
+        return MetricExportResult.SUCCESS
+
+    # pylint: disable=unused-argument
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        """Returns immediately, as every export is written at once."""
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        """Leaves the shared writer open for the other exporters."""
+
+
+class JsonLinesLogExporter(LogExporter):
+    """
+    Writes each batch of log records as an OTLP JSON ExportLogsServiceRequest.
+    """
+
+    def __init__(self, writer: JsonLinesWriter):
+        self._writer = writer
+
+    def export(self, batch: Sequence[LogData]) -> LogExportResult:
+        """Writes the log records as one line."""
+        try:
+            self._writer.write([to_json_line(encode_logs(batch))])
+        except (OSError, ValueError):
+            _logger.exception("Failed to write logs")
+            return LogExportResult.FAILURE
+        return LogExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        """Leaves the shared writer open for the other exporters."""
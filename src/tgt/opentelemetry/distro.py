@@ -18,9 +18,16 @@ from logging import getLogger
 from typing import Optional
 from opentelemetry.instrumentation.distro import BaseDistro
 from opentelemetry.metrics import set_meter_provider
+from opentelemetry.propagate import set_global_textmap
 from opentelemetry.trace import set_tracer_provider
+from tgt.opentelemetry.budget import create_memory_budget
+from tgt.opentelemetry.flush import TelemetryFlusher, register_flusher
+from tgt.opentelemetry.instrumentation import load_instrumentor
 from tgt.opentelemetry.metrics import create_meter_provider
 from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.profiler import create_profiler
+from tgt.opentelemetry.propagation import create_propagator
+from tgt.opentelemetry.reload import ConfigReloader
 from tgt.opentelemetry.resource import create_resource
 from tgt.opentelemetry.trace import create_tracer_provider
 
@@ -44,21 +51,64 @@ def configure_opentelemetry(
         options = TgtOptions()
     _logger.info("🎯 Configuring OpenTelemetry using Target distro 🎯")
     _logger.debug(vars(options))
+    set_global_textmap(create_propagator(options))
+    _logger.info("configured propagators: %s", options.propagators)
     resource = create_resource(options)
+    # shared by the span queue, metric streams and profiler stacks
+    budget = create_memory_budget(options)
+    reloader = None
+    if options.config_reload_file:
+        reloader = ConfigReloader(options.config_reload_file)
+    profiler = create_profiler(options, resource, budget=budget) \
+        if options.profiling else None
+    tracer_provider = meter_provider = None
     if not options.traces_disabled:
-        set_tracer_provider(
-            create_tracer_provider(options, resource)
+        tracer_provider = create_tracer_provider(
+            options,
+            resource,
+            reloader=reloader,
+            budget=budget
         )
+        if profiler is not None:
+            # tags the sampled stacks with the span open on their thread
+            tracer_provider.add_span_processor(profiler.span_tracker)
+        set_tracer_provider(tracer_provider)
         _logger.info("started traces")
     else:
         _logger.info("traces disabled via TRACES_DISABLED environment variable")
     if not options.metrics_disabled:
-        set_meter_provider(
-            create_meter_provider(options, resource)
+        # exemplars link metrics to the sampled traces recorded alongside
+        meter_provider = create_meter_provider(
+            options,
+            resource,
+            exemplars=not options.traces_disabled,
+            reloader=reloader,
+            budget=budget
         )
+        set_meter_provider(meter_provider)
         _logger.info("started metrics")
     else:
         _logger.info("metrics disabled via METRICS_DISABLED environment variable")
+    if profiler is not None:
+        profiler.start()
+        _logger.info(
+            "started profiling at %d Hz", options.profiling_frequency
+        )
+    if reloader is not None:
+        reloader.start()
+        _logger.info(
+            "reloading config from %s", options.config_reload_file
+        )
+    # flushes everything in parallel at exit, and after each invocation
+    register_flusher(
+        TelemetryFlusher(
+            tracer_provider,
+            meter_provider,
+            profiler,
+            deadline_millis=options.flush_deadline_millis
+        )
+    )
+    _logger.info("flush mode %s", options.flush_mode)
 
 
 
@@ -80,7 +130,22 @@ class TargetDistro(BaseDistro):
 
     [tool.poetry.plugins."opentelemetry_distro"]
     distro = "tgt.opentelemetry.distro:TargetDistro"
+
+    Instrumentors are loaded through load_instrumentor() below, which skips
+    those excluded by the INSTRUMENTATIONS_ENABLED and
+    INSTRUMENTATIONS_DISABLED options before they are imported.
     """
+    _options = None
 
     def _configure(self, **kwargs):
-        configure_opentelemetry()
+        self._options = TgtOptions()
+        configure_opentelemetry(self._options)
+
+    def load_instrumentor(self, entry_point, **kwargs):
+        """
+        Loads the instrumentor unless the options exclude it, recording its
+        import and instrument time in the instrumentation report.
+        """
+        if self._options is None:
+            self._options = TgtOptions()
+        load_instrumentor(entry_point, self._options, **kwargs)
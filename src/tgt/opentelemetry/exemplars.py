@@ -0,0 +1,197 @@
+from dataclasses import dataclass, fields
+from threading import local
+from typing import Optional, Sequence, Tuple, Union
+from opentelemetry.exporter.otlp.proto.common._internal import (
+    _encode_attributes,
+)
+from opentelemetry.exporter.otlp.proto.common.metrics_encoder import (
+    encode_metrics
+)
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+    OTLPMetricExporter as HTTPMetricExporter
+)
+from opentelemetry.proto.collector.metrics.v1.metrics_service_pb2 import (
+    ExportMetricsServiceRequest
+)
+from opentelemetry.proto.metrics.v1 import metrics_pb2 as pb2
+from opentelemetry.sdk.metrics.export import (
+    HistogramDataPoint,
+    MetricExportResult,
+    MetricsData,
+    NumberDataPoint
+)
+from opentelemetry.util.types import Attributes
+
+# (value, time_unix_nano, trace_id, span_id) as captured while recording;
+# turned into an Exemplar only when the stream is collected
+ExemplarRecord = Tuple[Union[int, float], int, int, int]
+
+_NO_METRICS = MetricsData(resource_metrics=[])
+
+
+@dataclass(frozen=True)
+class Exemplar:
+    """
+    A measurement recorded while a sampled span was active, linking a data
+    point to a representative trace.
+    """
+    value: Union[int, float]
+    time_unix_nano: int
+    trace_id: int
+    span_id: int
+    filtered_attributes: Attributes = None
+
+
+@dataclass(frozen=True)
+class ExemplarNumberDataPoint(NumberDataPoint):
+    """
+    A NumberDataPoint carrying the exemplars of its collection interval.
+    """
+    exemplars: Sequence[Exemplar] = ()
+
+
+@dataclass(frozen=True)
+class ExemplarHistogramDataPoint(HistogramDataPoint):
+    """
+    A HistogramDataPoint carrying the exemplars of its collection interval,
+    at most one per bucket.
+    """
+    exemplars: Sequence[Exemplar] = ()
+
+
+def with_exemplars(
+    point: Union[NumberDataPoint, HistogramDataPoint],
+    records: Sequence[Optional[ExemplarRecord]]
+):
+    """
+    Returns a copy of the data point carrying the recorded exemplars.
+
+    Args:
+        point (NumberDataPoint or HistogramDataPoint): the collected point
+        records (sequence): the reservoir slots, None where empty
+
+    Returns:
+        the point as an ExemplarNumberDataPoint or ExemplarHistogramDataPoint
+    """
+    point_class = ExemplarHistogramDataPoint \
+        if isinstance(point, HistogramDataPoint) else ExemplarNumberDataPoint
+    return point_class(
+        **{field.name: getattr(point, field.name) for field in fields(point)},
+        exemplars=tuple(
+            Exemplar(*record) for record in records if record is not None
+        ),
+    )
+
+
+def _encode_exemplar(exemplar: Exemplar) -> pb2.Exemplar:
+    encoded = pb2.Exemplar(
+        time_unix_nano=exemplar.time_unix_nano,
+        trace_id=exemplar.trace_id.to_bytes(16, "big"),
+        span_id=exemplar.span_id.to_bytes(8, "big"),
+        filtered_attributes=_encode_attributes(exemplar.filtered_attributes),
+    )
+    if isinstance(exemplar.value, int):
+        encoded.as_int = exemplar.value
+    else:
+        encoded.as_double = exemplar.value
+    return encoded
+
+
+def _attributes_key(encoded_attributes) -> bytes:
+    # the encoded key-values of a point, comparable across both sides
+    return b"".join(
+        attribute.SerializeToString()
+        for attribute in encoded_attributes or ()
+    )
+
+
+def encode_metrics_with_exemplars(
+    data: MetricsData
+) -> ExportMetricsServiceRequest:
+    """
+    Encodes the metrics like the stock OTLP encoder, adding the exemplars
+    carried by the data points.
+
+    Args:
+        data (MetricsData): the collected metrics
+
+    Returns:
+        ExportMetricsServiceRequest: the encoded request
+    """
+    request = encode_metrics(data)
+    # the encoder groups resources and scopes its own way, so points are
+    # matched on their scope, metric name and attributes, not their order
+    exemplars = {}
+    for resource_metrics in data.resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            scope = scope_metrics.scope
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    point_exemplars = getattr(point, "exemplars", ())
+                    if point_exemplars:
+                        exemplars[(
+                            scope.name,
+                            scope.version or "",
+                            metric.name,
+                            _attributes_key(
+                                _encode_attributes(point.attributes)
+                            ),
+                        )] = point_exemplars
+    if not exemplars:
+        return request
+    # pylint: disable=no-member
+    for encoded_resource in request.resource_metrics:
+        for encoded_scope in encoded_resource.scope_metrics:
+            for encoded_metric in encoded_scope.metrics:
+                for encoded_point in getattr(
+                    encoded_metric, encoded_metric.WhichOneof("data")
+                ).data_points:
+                    point_exemplars = exemplars.get((
+                        encoded_scope.scope.name,
+                        encoded_scope.scope.version,
+                        encoded_metric.name,
+                        _attributes_key(encoded_point.attributes),
+                    ))
+                    if point_exemplars:
+                        encoded_point.exemplars.extend(
+                            _encode_exemplar(exemplar)
+                            for exemplar in point_exemplars
+                        )
+    return request
+
+
+# pylint: disable=too-few-public-methods
+class ExemplarHTTPMetricExporter(HTTPMetricExporter):
+    """
+    An OTLP/HTTP metric exporter that also sends the exemplars attached to
+    data points, which the stock encoder drops.
+
+    Exports are left to the stock exporter, retries included; only the
+    request it posts is replaced with the one encoded with exemplars.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded = local()
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> MetricExportResult:
+        """Exports the metrics with their exemplars."""
+        self._encoded.request = encode_metrics_with_exemplars(
+            metrics_data
+        ).SerializeToString()
+        try:
+            # the stock exporter only encodes an empty collection, as the
+            # request it posts is replaced in _export
+            return super().export(_NO_METRICS, timeout_millis, **kwargs)
+        finally:
+            self._encoded.request = None
+
+    def _export(self, serialized_data: bytes):
+        return super()._export(
+            getattr(self._encoded, "request", None) or serialized_data
+        )
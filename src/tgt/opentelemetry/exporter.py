@@ -0,0 +1,170 @@
+import zlib
+from threading import Lock
+from typing import List
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+    OTLPSpanExporter as HTTPSpanExporter
+)
+
+DEFAULT_BUFFER_SIZE = 256 * 1024
+DEFAULT_MAX_POOLED_BUFFERS = 2
+
+# the serialized payload is fed to the compressor in slices of this size so
+# the compressor never hands back one large, freshly allocated output block
+COMPRESS_CHUNK_SIZE = 64 * 1024
+
+# zlib window bits selecting the container written around the deflate stream
+_WBITS = {
+    Compression.Gzip: 16 + zlib.MAX_WBITS,
+    Compression.Deflate: zlib.MAX_WBITS,
+}
+
+
+class ExportBuffer:
+    """
+    A growable byte buffer that keeps its allocation between exports.
+
+    Bytes are written in place with slice assignment and the written region
+    is handed out as a memoryview, so sending it does not copy the payload.
+    """
+    __slots__ = ("_data", "_length")
+
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE):
+        self._data = bytearray(size)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        """
+        Returns the number of bytes the buffer can hold without growing.
+        """
+        return len(self._data)
+
+    def reset(self):
+        """
+        Marks the buffer as empty without releasing its allocation.
+        """
+        self._length = 0
+
+    def write(self, chunk: bytes):
+        """
+        Appends the chunk to the buffer, growing it if needed.
+
+        Args:
+            chunk (bytes): the bytes-like object to append
+        """
+        end = self._length + len(chunk)
+        if end > len(self._data):
+            # a view handed out earlier may still be referenced, so grow into
+            # a new allocation instead of resizing the exported one
+            data = bytearray(max(end, 2 * len(self._data)))
+            data[:self._length] = memoryview(self._data)[:self._length]
+            self._data = data
+        self._data[self._length:end] = chunk
+        self._length = end
+
+    def view(self) -> memoryview:
+        """
+        Returns a zero-copy view over the written bytes.
+        """
+        return memoryview(self._data)[:self._length]
+
+
+class BufferPool:
+    """
+    A small, thread-safe pool of ExportBuffers.
+
+    Released buffers are kept for reuse up to max_buffers; anything beyond
+    that is left to the garbage collector.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        max_buffers: int = DEFAULT_MAX_POOLED_BUFFERS
+    ):
+        self._buffer_size = buffer_size
+        self._max_buffers = max_buffers
+        self._free: List[ExportBuffer] = []
+        self._lock = Lock()
+
+    def acquire(self) -> ExportBuffer:
+        """
+        Returns an empty buffer, reusing a pooled one when available.
+        """
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return ExportBuffer(self._buffer_size)
+
+    def release(self, buffer: ExportBuffer):
+        """
+        Returns the buffer to the pool.
+
+        Args:
+            buffer (ExportBuffer): a buffer previously returned by acquire
+        """
+        buffer.reset()
+        with self._lock:
+            if len(self._free) < self._max_buffers:
+                self._free.append(buffer)
+
+
+def compress_into(
+    buffer: ExportBuffer,
+    data: bytes,
+    compression: Compression
+):
+    """
+    Compresses data into the buffer using the gzip or deflate container.
+
+    Args:
+        buffer (ExportBuffer): the buffer to write the compressed bytes to
+        data (bytes): the serialized payload
+        compression (Compression): either Compression.Gzip or
+        Compression.Deflate
+    """
+    compressor = zlib.compressobj(wbits=_WBITS[compression])
+    payload = memoryview(data)
+    for offset in range(0, len(payload), COMPRESS_CHUNK_SIZE):
+        buffer.write(
+            compressor.compress(payload[offset:offset + COMPRESS_CHUNK_SIZE])
+        )
+    buffer.write(compressor.flush())
+
+
+# pylint: disable=too-few-public-methods
+class PooledHTTPSpanExporter(HTTPSpanExporter):
+    """
+    An OTLP/HTTP span exporter that compresses each batch into a pooled,
+    reusable buffer and posts a memoryview of it.
+
+    The stock exporter builds the gzip payload in a BytesIO and copies it out
+    with getvalue(), and copies the serialized payload again before deflating
+    it. This exporter writes the compressed stream straight into a buffer that
+    is kept between batches and hands the socket a view of it. Uncompressed
+    batches are already sent without an extra copy and take the stock path.
+    """
+
+    def __init__(self, *args, buffer_pool: BufferPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._buffer_pool = buffer_pool or BufferPool()
+
+    def _export(self, serialized_data: bytes):
+        if self._compression not in _WBITS:
+            return super()._export(serialized_data)
+
+        buffer = self._buffer_pool.acquire()
+        try:
+            compress_into(buffer, serialized_data, self._compression)
+            return self._session.post(
+                url=self._endpoint,
+                data=buffer.view(),
+                verify=self._certificate_file,
+                timeout=self._timeout,
+            )
+        finally:
+            self._buffer_pool.release(buffer)
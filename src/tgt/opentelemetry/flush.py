@@ -0,0 +1,271 @@
+"""Flushes telemetry within one deadline, at exit or after each invocation.
+
+configure_opentelemetry registers the providers it creates here instead of
+letting each register its own exit hook, which shut them down one after
+the other, each waiting out its exporter's timeouts and retries. At exit,
+traces, metrics and the profiler are shut down in parallel, and the process
+moves on once FLUSH_DEADLINE_MILLIS has passed, whatever is still sending.
+
+With FLUSH_MODE=invocation, for batch jobs and serverless-style handlers
+whose process may be frozen between units of work, metrics are no longer
+exported in the background. Wrapping each unit of work in invocation()
+exports the spans it queued, and the metrics once per
+OTEL_METRIC_EXPORT_INTERVAL, before returning.
+
+Typical usage example:
+
+    configure_opentelemetry(TgtOptions(flush_mode="invocation"))
+
+    @invocation()
+    def handler(event, context):
+        ...
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Callable, List, Optional
+from opentelemetry.sdk.environment_variables import (
+    OTEL_METRIC_EXPORT_INTERVAL
+)
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from tgt.opentelemetry.options import DEFAULT_FLUSH_DEADLINE_MILLIS
+from tgt.opentelemetry.profiler import SamplingProfiler
+
+_logger = getLogger(__name__)
+
+_flusher: Optional["TelemetryFlusher"] = None
+
+# the SDK's default OTEL_METRIC_EXPORT_INTERVAL
+DEFAULT_METRICS_INTERVAL_MILLIS = 60000
+
+# a call given the milliseconds left, returning False on failure
+_Call = Callable[[float], Optional[bool]]
+
+
+def _metrics_interval_millis() -> float:
+    # read like the SDK's PeriodicExportingMetricReader, so an invalid value
+    # falls back to the default in both instead of failing startup
+    try:
+        return float(os.environ.get(
+            OTEL_METRIC_EXPORT_INTERVAL,
+            DEFAULT_METRICS_INTERVAL_MILLIS
+        ))
+    except ValueError:
+        _logger.warning(
+            "Found invalid value for export interval, using default"
+        )
+        return DEFAULT_METRICS_INTERVAL_MILLIS
+
+
+def _run(call: _Call, timeout_millis: float) -> bool:
+    try:
+        return call(timeout_millis) is not False
+    except Exception:  # pylint: disable=broad-except
+        _logger.exception("Exception while flushing telemetry.")
+        return False
+
+
+def _run_parallel(calls: List[_Call], timeout_millis: float) -> bool:
+    """
+    Runs the calls in parallel on daemon threads, and returns whether they
+    all succeeded before the deadline. Threads are used even for a single
+    call, as exporters do not all honour the timeout they are given, and
+    a call still running at the deadline is left behind.
+    """
+    if not calls:
+        return True
+    end = time.monotonic() + timeout_millis / 1e3
+    results = [False] * len(calls)
+
+    def run(index: int, call: _Call):
+        results[index] = _run(call, timeout_millis)
+
+    threads = [
+        threading.Thread(
+            name="TgtFlush",
+            target=run,
+            args=(index, call),
+            daemon=True
+        )
+        for index, call in enumerate(calls)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(0.0, end - time.monotonic()))
+    if any(thread.is_alive() for thread in threads):
+        _logger.warning(
+            "Telemetry flush did not finish within %sms", timeout_millis
+        )
+        return False
+    return all(results)
+
+
+class TelemetryFlusher:
+    """
+    Flushes and shuts down the providers created by configure_opentelemetry
+    together, within a single deadline.
+    """
+
+    # every signal's source is optional, and passed by keyword
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        tracer_provider: Optional[TracerProvider] = None,
+        meter_provider: Optional[MeterProvider] = None,
+        profiler: Optional[SamplingProfiler] = None,
+        deadline_millis: float = DEFAULT_FLUSH_DEADLINE_MILLIS,
+        metrics_interval_millis: Optional[float] = None
+    ):
+        # the default deadline, and the one at exit
+        self.deadline_millis = deadline_millis
+        self._tracer_provider = tracer_provider
+        self._meter_provider = meter_provider
+        self._profiler = profiler
+        if metrics_interval_millis is None:
+            metrics_interval_millis = _metrics_interval_millis()
+        self._metrics_interval = metrics_interval_millis / 1e3
+        self._metrics_flushed = time.monotonic()
+
+    def _flush_spans(self, timeout_millis: float) -> bool:
+        return self._tracer_provider.force_flush(int(timeout_millis))
+
+    def _flush_metrics(self, timeout_millis: float) -> bool:
+        self._metrics_flushed = time.monotonic()
+        return self._meter_provider.force_flush(timeout_millis)
+
+    def _spans_queued(self) -> bool:
+        # pylint: disable=protected-access
+        processors = \
+            self._tracer_provider._active_span_processor._span_processors
+        return any(
+            processor.queue for processor in processors
+            if isinstance(processor, BatchSpanProcessor)
+        )
+
+    def flush(self, timeout_millis: float) -> bool:
+        """
+        Exports every queued span, the current metrics and the profile of
+        the current interval, in parallel.
+
+        Args:
+            timeout_millis (float): the milliseconds to wait at most
+
+        Returns:
+            bool: whether everything was exported before the deadline
+        """
+        calls: List[_Call] = []
+        if self._tracer_provider is not None:
+            calls.append(self._flush_spans)
+        if self._meter_provider is not None:
+            calls.append(self._flush_metrics)
+        if self._profiler is not None:
+            calls.append(lambda timeout_millis: self._profiler.export())
+        return _run_parallel(calls, timeout_millis)
+
+    def flush_invocation(self, timeout_millis: float) -> bool:
+        """
+        Exports the spans queued since the last flush, if any, and the
+        metrics if the metric export interval has passed since they were
+        last exported. Returns at once when there is nothing to export.
+
+        Args:
+            timeout_millis (float): the milliseconds to wait at most
+
+        Returns:
+            bool: whether everything was exported before the deadline
+        """
+        calls: List[_Call] = []
+        if self._tracer_provider is not None and self._spans_queued():
+            calls.append(self._flush_spans)
+        if self._meter_provider is not None and \
+           time.monotonic() - self._metrics_flushed >= self._metrics_interval:
+            calls.append(self._flush_metrics)
+        return _run_parallel(calls, timeout_millis)
+
+    def shutdown(self, timeout_millis: float) -> bool:
+        """
+        Shuts the providers and profiler down in parallel, exporting what
+        they still hold.
+
+        Args:
+            timeout_millis (float): the milliseconds to wait at most
+
+        Returns:
+            bool: whether everything was shut down before the deadline
+        """
+        calls: List[_Call] = []
+        if self._tracer_provider is not None:
+            calls.append(
+                lambda timeout_millis: self._tracer_provider.shutdown()
+            )
+        if self._meter_provider is not None:
+            calls.append(self._meter_provider.shutdown)
+        if self._profiler is not None:
+            calls.append(lambda timeout_millis: self._profiler.shutdown())
+        return _run_parallel(calls, timeout_millis)
+
+
+def _shutdown_at_exit() -> None:
+    if _flusher is not None:
+        _flusher.shutdown(_flusher.deadline_millis)
+
+
+def register_flusher(flusher: TelemetryFlusher) -> None:
+    """
+    Makes the flusher the one used by flush() and invocation(), and shuts
+    it down at exit within its deadline.
+
+    Args:
+        flusher (TelemetryFlusher): the providers to flush
+    """
+    global _flusher  # pylint: disable=global-statement
+    _flusher = flusher
+    # registered once, however many times configure_opentelemetry is called
+    atexit.unregister(_shutdown_at_exit)
+    atexit.register(_shutdown_at_exit)
+
+
+def flush(timeout_millis: Optional[float] = None) -> bool:
+    """
+    Exports every queued span, the current metrics and profile, in
+    parallel.
+
+    Args:
+        timeout_millis (float, optional): the milliseconds to wait at most,
+        by default FLUSH_DEADLINE_MILLIS
+
+    Returns:
+        bool: whether everything was exported before the deadline, True if
+        configure_opentelemetry was not called
+    """
+    if _flusher is None:
+        return True
+    return _flusher.flush(
+        _flusher.deadline_millis if timeout_millis is None else timeout_millis
+    )
+
+
+@contextmanager
+def invocation(timeout_millis: Optional[float] = None):
+    """
+    Wraps a unit of work, as a context manager or a decorator, exporting
+    the spans it queued, and the metrics when due, as it ends.
+
+    Args:
+        timeout_millis (float, optional): the milliseconds to wait at most
+        for the export, by default FLUSH_DEADLINE_MILLIS
+    """
+    try:
+        yield
+    finally:
+        if _flusher is not None:
+            _flusher.flush_invocation(
+                _flusher.deadline_millis if timeout_millis is None
+                else timeout_millis
+            )
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from logging import getLogger
+from time import perf_counter
+from typing import List, Optional
+from pkg_resources import EntryPoint
+from tgt.opentelemetry.options import TgtOptions
+
+_logger = getLogger(__name__)
+
+
+@dataclass
+class InstrumentorTiming:
+    """
+    The startup cost of one instrumentor entry point: the time spent
+    importing it, and the time its instrument() call took to patch the
+    library. Skipped instrumentors are never imported and record why.
+    """
+    name: str
+    import_seconds: float = 0.0
+    instrument_seconds: float = 0.0
+    skipped: Optional[str] = None
+
+    @property
+    def total_seconds(self) -> float:
+        """The import and instrument time together."""
+        return self.import_seconds + self.instrument_seconds
+
+
+_report: List[InstrumentorTiming] = []
+
+
+def instrumentation_enabled(name: str, options: TgtOptions) -> bool:
+    """
+    Returns whether the options allow the named instrumentation. The deny
+    list wins over the allow list, and no allow list enables everything.
+
+    Args:
+        name (str): the instrumentor entry point name, e.g. "sqlite3"
+        options (TgtOptions): the Target options to check against
+    """
+    if name in options.instrumentations_disabled:
+        return False
+    return options.instrumentations_enabled is None \
+        or name in options.instrumentations_enabled
+
+
+def load_instrumentor(
+    entry_point: EntryPoint,
+    options: TgtOptions,
+    **kwargs
+) -> InstrumentorTiming:
+    """
+    Imports and activates the instrumentor behind the entry point if the
+    options allow it, timing both steps. Denied instrumentors are skipped
+    before their module is imported, so they add no startup or per-call
+    cost at all.
+
+    Args:
+        entry_point (EntryPoint): an opentelemetry_instrumentor entry point
+        options (TgtOptions): the Target options with the allow/deny lists
+        kwargs: passed to the instrumentor's instrument() call
+
+    Returns:
+        InstrumentorTiming: the timing, also added to the report
+    """
+    timing = InstrumentorTiming(entry_point.name)
+    _report.append(timing)
+    if not instrumentation_enabled(entry_point.name, options):
+        timing.skipped = "disabled by options"
+        _logger.debug("Instrumentation skipped for %s", entry_point.name)
+        return timing
+    start = perf_counter()
+    instrumentor = entry_point.load()
+    loaded = perf_counter()
+    instrumentor().instrument(**kwargs)
+    timing.import_seconds = loaded - start
+    timing.instrument_seconds = perf_counter() - loaded
+    _logger.debug(
+        "Instrumented %s in %.1fms",
+        entry_point.name,
+        timing.total_seconds * 1e3
+    )
+    return timing
+
+
+def instrumentation_report() -> List[InstrumentorTiming]:
+    """
+    Returns the timing of every instrumentor the distro was asked to load,
+    slowest first.
+    """
+    return sorted(_report, key=lambda timing: -timing.total_seconds)
+
+
+def log_instrumentation_report():
+    """
+    Logs the instrumentation report. Registered as an
+    opentelemetry_post_instrument entry point, so opentelemetry-instrument
+    calls it once every instrumentor has loaded.
+    """
+    for timing in instrumentation_report():
+        if timing.skipped:
+            _logger.info("instrumentation %s skipped: %s",
+                         timing.name, timing.skipped)
+        else:
+            _logger.info(
+                "instrumentation %s added %.1fms "
+                "(import %.1fms, instrument %.1fms)",
+                timing.name,
+                timing.total_seconds * 1e3,
+                timing.import_seconds * 1e3,
+                timing.instrument_seconds * 1e3
+            )
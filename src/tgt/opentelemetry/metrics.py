@@ -1,45 +1,154 @@
+import math
+from logging import getLogger
+from typing import Optional
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import (
-    PeriodicExportingMetricReader,
-    ConsoleMetricExporter
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    MeterProvider,
+    UpDownCounter
 )
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
     OTLPMetricExporter as HTTPMetricExporter
 )
-from tgt.opentelemetry.options import TgtOptions
+from opentelemetry.sdk.metrics.view import View
+from tgt.opentelemetry.aggregation import (
+    BufferedHistogramAggregation,
+    ExemplarHistogramAggregation,
+    ExemplarSumAggregation,
+    ShardedSumAggregation
+)
+from tgt.opentelemetry.budget import BudgetedMeterProvider, MemoryBudget
+from tgt.opentelemetry.debug import JsonLinesMetricExporter, json_lines_writer
+from tgt.opentelemetry.exemplars import ExemplarHTTPMetricExporter
+from tgt.opentelemetry.multiprocess import (
+    MULTIPROCESS_SUPPORTED,
+    MultiprocessMetricExporter
+)
+from tgt.opentelemetry.options import FLUSH_MODE_INVOCATION, TgtOptions
+from tgt.opentelemetry.prometheus import PrometheusMetricReader
+from tgt.opentelemetry.reload import (
+    ConfigReloader,
+    ReloadablePeriodicExportingMetricReader
+)
+
+_logger = getLogger(__name__)
 
 
-def create_meter_provider(options: TgtOptions, resource: Resource):
+# pylint: disable=too-many-branches
+def create_meter_provider(
+    options: TgtOptions,
+    resource: Resource,
+    exemplars: bool = False,
+    reloader: Optional[ConfigReloader] = None,
+    budget: Optional[MemoryBudget] = None
+):
     """
     Configures and returns a new MeterProvider to send metrics telemetry.
 
+    The provider does not shut itself down at exit; configure_opentelemetry
+    registers it with the exit flush. Callers using it on its own must call
+    shutdown() themselves, or the last metrics are not exported.
+
     Args:
         options (HoneycombOptions): the Honeycomb options to configure with
         resource (Resource): the resource to use with the new meter provider
+        exemplars (bool): attach the trace and span IDs of sampled spans to
+        histogram and counter points as exemplars
+        reloader (ConfigReloader, optional): makes the export interval
+        reloadable while the provider runs
+        budget (MemoryBudget, optional): the memory budget every metric
+        stream is reserved from
 
     Returns:
         MeterProvider: the new meter provider
     """
-    exporter = HTTPMetricExporter(
-        endpoint=options.get_metrics_endpoint(),
-        headers=options.get_metrics_headers()
-    )
+    # in invocation mode, metrics are only exported when flushed
+    export_interval_millis = math.inf \
+        if options.flush_mode == FLUSH_MODE_INVOCATION else None
     readers = []
-    if options.debug:
+    if options.prometheus_metrics and not options.debug:
         readers.append(
-            PeriodicExportingMetricReader(
-                ConsoleMetricExporter(),
+            PrometheusMetricReader(
+                options.prometheus_host,
+                options.prometheus_port
             )
         )
     else:
-        readers.append(
-            PeriodicExportingMetricReader(
-                exporter
+        if options.debug:
+            exporter = JsonLinesMetricExporter(json_lines_writer(options))
+        else:
+            exporter_class = ExemplarHTTPMetricExporter if exemplars \
+                else HTTPMetricExporter
+            exporter = exporter_class(
+                endpoint=options.get_metrics_endpoint(),
+                headers=options.get_metrics_headers()
+            )
+        if options.metrics_multiprocess_dir:
+            if MULTIPROCESS_SUPPORTED:
+                exporter = MultiprocessMetricExporter(
+                    exporter,
+                    options.metrics_multiprocess_dir
+                )
+            else:
+                _logger.warning(
+                    "METRICS_MULTIPROCESS_DIR requires fcntl, "
+                    "exporting metrics from every process"
+                )
+        if reloader is not None:
+            reader = ReloadablePeriodicExportingMetricReader(
+                exporter,
+                export_interval_millis=export_interval_millis
+            )
+            reloader.add_metric_reader(reader)
+        else:
+            reader = PeriodicExportingMetricReader(
+                exporter,
+                export_interval_millis=export_interval_millis
+            )
+        readers.append(reader)
+
+    views = []
+    if options.buffered_histograms:
+        views.append(
+            View(
+                instrument_type=Histogram,
+                aggregation=BufferedHistogramAggregation(exemplars=exemplars)
             )
         )
+    elif exemplars:
+        views.append(
+            View(
+                instrument_type=Histogram,
+                aggregation=ExemplarHistogramAggregation()
+            )
+        )
+    if options.sharded_counters or exemplars:
+        if options.sharded_counters:
+            sum_aggregation = ShardedSumAggregation(exemplars=exemplars)
+        else:
+            sum_aggregation = ExemplarSumAggregation()
+        for instrument_type in (Counter, UpDownCounter):
+            views.append(
+                View(
+                    instrument_type=instrument_type,
+                    aggregation=sum_aggregation
+                )
+            )
 
+    if budget is not None:
+        return BudgetedMeterProvider(
+            budget,
+            metric_readers=readers,
+            resource=resource,
+            views=views,
+            shutdown_on_exit=False
+        )
+    # shut down by the distro's exit hook, within FLUSH_DEADLINE_MILLIS
     return MeterProvider(
         metric_readers=readers,
-        resource=resource
+        resource=resource,
+        views=views,
+        shutdown_on_exit=False
     )
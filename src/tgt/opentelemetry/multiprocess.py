@@ -0,0 +1,495 @@
+"""Shares metric aggregation between prefork worker processes.
+
+Every worker collects its own metrics as usual and writes the cumulative
+data points into a memory-mapped file of its own in a directory shared by all
+workers. Workers compete for an exclusive lock on that directory, and only the
+process holding it merges every worker's file and exports the totals, so the
+collector receives one copy of each series instead of one per worker.
+
+Typical usage example:
+
+    $bash> METRICS_MULTIPROCESS_DIR=/tmp/tgt-metrics gunicorn app:app
+
+Configure OpenTelemetry in each worker after it is forked (e.g. in gunicorn's
+post_fork hook) and empty the directory before the server starts; files left
+behind by exited workers keep contributing their last values so cumulative
+totals never go backwards.
+"""
+import json
+import mmap
+import os
+import struct
+from glob import glob
+from logging import getLogger
+from time import sleep, time_ns
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    ObservableCounter,
+    ObservableGauge,
+    ObservableUpDownCounter,
+    UpDownCounter
+)
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    Gauge,
+    Histogram as HistogramData,
+    HistogramDataPoint,
+    Metric,
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+    NumberDataPoint,
+    ResourceMetrics,
+    ScopeMetrics,
+    Sum
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+_logger = getLogger(__name__)
+
+# True when the platform can elect a single exporting process
+MULTIPROCESS_SUPPORTED = fcntl is not None
+
+DEFAULT_FILE_SIZE = 64 * 1024
+LEADER_LOCK_FILE = "leader.lock"
+METRICS_FILE_PATTERN = "metrics-*.db"
+
+# the file starts with the number of bytes in use, followed by entries of
+# (key length, value count, sequence, key padded to 8 bytes, value count
+# doubles); the sequence is odd while the values are being overwritten
+_HEADER = struct.Struct("<Q")
+_ENTRY_HEADER = struct.Struct("<IIQ")
+_SEQUENCE = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 8
+
+# times a reader retries an entry being overwritten before skipping it
+_READ_ATTEMPTS = 100
+_READ_RETRY_DELAY = 0.0001
+
+_SUM = "sum"
+_UP_DOWN_SUM = "updown"
+_GAUGE = "gauge"
+_HISTOGRAM = "histogram"
+
+# every entry's values start with its start and end time in seconds
+_START, _TIME, _VALUE = 0, 1, 2
+_COUNT, _TOTAL, _MIN, _MAX, _BUCKETS = 2, 3, 4, 5, 6
+
+_CUMULATIVE = {
+    instrument_type: AggregationTemporality.CUMULATIVE
+    for instrument_type in (
+        Counter,
+        UpDownCounter,
+        Histogram,
+        ObservableCounter,
+        ObservableUpDownCounter,
+        ObservableGauge,
+    )
+}
+
+
+def _padded(length: int) -> int:
+    return (length + 7) & ~7
+
+
+class SharedMetricFile:
+    """
+    A memory-mapped file holding one process's data points.
+
+    Only the owning process writes to it. New points are written in full
+    before the used size in the header is advanced past them, and values of
+    known points are overwritten in place between two increments of the
+    entry's sequence, which readers check before and after reading the
+    values, so other processes reading the file only ever see complete
+    entries.
+    """
+
+    def __init__(self, path: str, size: int = DEFAULT_FILE_SIZE):
+        self.path = path
+        self._file = open(path, "w+b")  # pylint: disable=consider-using-with
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._map, 0, self._used)
+        # the start of each point's entry, and of its values
+        self._entries: Dict[bytes, Tuple[int, int]] = {}
+
+    def write(self, key: bytes, values: Sequence[float]):
+        """
+        Stores the values of the data point identified by key.
+
+        Args:
+            key (bytes): the encoded identity of the data point
+            values (sequence): the point's values, always the same length
+            for a given key
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._append(key, values)
+            return
+        start, offset = entry
+        sequence_offset = start + _SEQUENCE_OFFSET
+        (sequence,) = _SEQUENCE.unpack_from(self._map, sequence_offset)
+        _SEQUENCE.pack_into(self._map, sequence_offset, sequence + 1)
+        struct.pack_into(f"<{len(values)}d", self._map, offset, *values)
+        _SEQUENCE.pack_into(self._map, sequence_offset, sequence + 2)
+
+    def _append(self, key: bytes, values: Sequence[float]):
+        start = self._used
+        offset = start + _ENTRY_HEADER.size + _padded(len(key))
+        end = offset + 8 * len(values)
+        if end > len(self._map):
+            self._grow(end)
+        _ENTRY_HEADER.pack_into(self._map, start, len(key), len(values), 0)
+        self._map[start + _ENTRY_HEADER.size:
+                  start + _ENTRY_HEADER.size + len(key)] = key
+        struct.pack_into(f"<{len(values)}d", self._map, offset, *values)
+        # advanced last, so readers never reach a partly written entry
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._entries[key] = (start, offset)
+
+    def _grow(self, needed: int):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        """
+        Unmaps and closes the file, leaving its contents on disk.
+        """
+        self._map.close()
+        self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Tuple[bytes, Tuple[float, ...]]]:
+        """
+        Reads every complete entry from a shared metric file.
+
+        Args:
+            path (str): the file written by a SharedMetricFile
+
+        Returns:
+            iterator: (key, values) for each data point in the file
+        """
+        entries = []
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < _HEADER.size:
+                return
+            with mmap.mmap(
+                file.fileno(), size, access=mmap.ACCESS_READ
+            ) as data:
+                (used,) = _HEADER.unpack_from(data, 0)
+                position = _HEADER.size
+                while position < min(used, size):
+                    key_length, count, _ = \
+                        _ENTRY_HEADER.unpack_from(data, position)
+                    key_start = position + _ENTRY_HEADER.size
+                    offset = key_start + _padded(key_length)
+                    values = _read_values(data, position, offset, count)
+                    if values is not None:
+                        entries.append(
+                            (data[key_start:key_start + key_length], values)
+                        )
+                    position = offset + 8 * count
+        yield from entries
+
+
+def _read_values(
+    data: mmap.mmap,
+    start: int,
+    offset: int,
+    count: int
+) -> Optional[Tuple[float, ...]]:
+    # retried while the owning process overwrites the values
+    sequence_offset = start + _SEQUENCE_OFFSET
+    for _ in range(_READ_ATTEMPTS):
+        (before,) = _SEQUENCE.unpack_from(data, sequence_offset)
+        if not before % 2:
+            values = struct.unpack_from(f"<{count}d", data, offset)
+            (after,) = _SEQUENCE.unpack_from(data, sequence_offset)
+            if after == before:
+                return values
+        sleep(_READ_RETRY_DELAY)
+    _logger.debug("Skipping a data point still being written")
+    return None
+
+
+# pylint: disable=too-many-arguments
+def _encode_key(scope: InstrumentationScope, metric: Metric, kind: str,
+                is_int: bool, boundaries, attributes) -> bytes:
+    return json.dumps([
+        scope.name,
+        scope.version,
+        scope.schema_url,
+        metric.name,
+        metric.description,
+        metric.unit,
+        kind,
+        is_int,
+        boundaries,
+        sorted(attributes.items()),
+    ], separators=(",", ":")).encode("utf-8")
+
+
+def _attribute_value(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _point_entries(scope: InstrumentationScope, metric: Metric):
+    data = metric.data
+    if isinstance(data, Sum):
+        kind = _SUM if data.is_monotonic else _UP_DOWN_SUM
+    elif isinstance(data, Gauge):
+        kind = _GAUGE
+    elif isinstance(data, HistogramData):
+        kind = _HISTOGRAM
+    else:
+        _logger.debug(
+            "%s is not shared between processes: %s is not supported",
+            metric.name, type(data).__name__
+        )
+        return
+    for point in data.data_points:
+        times = [point.start_time_unix_nano / 1e9, point.time_unix_nano / 1e9]
+        if kind == _HISTOGRAM:
+            yield _encode_key(
+                scope, metric, kind, False,
+                list(point.explicit_bounds), point.attributes
+            ), times + [
+                point.count, point.sum, point.min, point.max,
+                *point.bucket_counts
+            ]
+        else:
+            yield _encode_key(
+                scope, metric, kind, isinstance(point.value, int),
+                None, point.attributes
+            ), times + [point.value]
+
+
+def _merge_values(kind: str, merged: List[float], values: Tuple[float, ...]):
+    if kind == _GAUGE:
+        if values[_TIME] >= merged[_TIME]:
+            merged[_VALUE] = values[_VALUE]
+    elif kind == _HISTOGRAM:
+        merged[_COUNT] += values[_COUNT]
+        merged[_TOTAL] += values[_TOTAL]
+        merged[_MIN] = min(merged[_MIN], values[_MIN])
+        merged[_MAX] = max(merged[_MAX], values[_MAX])
+        for index in range(_BUCKETS, len(merged)):
+            merged[index] += values[index]
+    else:
+        merged[_VALUE] += values[_VALUE]
+    merged[_START] = min(merged[_START], values[_START])
+    merged[_TIME] = max(merged[_TIME], values[_TIME])
+
+
+# pylint: disable=too-many-locals
+def merge_metric_files(directory: str, resource: Resource) -> MetricsData:
+    """
+    Merges the data points written by every process into cumulative
+    MetricsData.
+
+    Args:
+        directory (str): the directory shared by all worker processes
+        resource (Resource): the resource to report the merged metrics under
+
+    Returns:
+        MetricsData: the merged metrics
+    """
+    merged: Dict[bytes, List[float]] = {}
+    for path in sorted(glob(os.path.join(directory, METRICS_FILE_PATTERN))):
+        for key, values in SharedMetricFile.read(path):
+            current = merged.get(key)
+            if current is None:
+                merged[key] = list(values)
+            else:
+                _merge_values(json.loads(key)[6], current, values)
+
+    scopes: Dict[tuple, Dict[tuple, list]] = {}
+    for key, values in merged.items():
+        (scope_name, scope_version, schema_url, name, description, unit,
+         kind, is_int, boundaries, attributes) = json.loads(key)
+        metrics = scopes.setdefault(
+            (scope_name, scope_version, schema_url), {}
+        )
+        points = metrics.setdefault(
+            (name, description, unit, kind, is_int), []
+        )
+        start = int(values[_START] * 1e9)
+        end = int(values[_TIME] * 1e9)
+        attributes = {
+            attribute: _attribute_value(value)
+            for attribute, value in attributes
+        }
+        if kind == _HISTOGRAM:
+            points.append(HistogramDataPoint(
+                attributes=attributes,
+                start_time_unix_nano=start,
+                time_unix_nano=end,
+                count=int(values[_COUNT]),
+                sum=values[_TOTAL],
+                bucket_counts=[int(count) for count in values[_BUCKETS:]],
+                explicit_bounds=boundaries,
+                min=values[_MIN],
+                max=values[_MAX],
+            ))
+        else:
+            value = values[_VALUE]
+            points.append(NumberDataPoint(
+                attributes=attributes,
+                start_time_unix_nano=start,
+                time_unix_nano=end,
+                value=int(value) if is_int else value,
+            ))
+
+    scope_metrics = []
+    for (scope_name, scope_version, schema_url), metrics in scopes.items():
+        scope_metrics.append(ScopeMetrics(
+            scope=InstrumentationScope(scope_name, scope_version, schema_url),
+            metrics=[
+                Metric(
+                    name=name,
+                    description=description,
+                    unit=unit,
+                    data=_metric_data(kind, points),
+                )
+                for (name, description, unit, kind, _), points
+                in metrics.items()
+            ],
+            schema_url=schema_url or "",
+        ))
+    return MetricsData(resource_metrics=[ResourceMetrics(
+        resource=resource,
+        scope_metrics=scope_metrics,
+        schema_url=resource.schema_url,
+    )])
+
+
+def _metric_data(kind: str, points: list):
+    if kind == _GAUGE:
+        return Gauge(data_points=points)
+    if kind == _HISTOGRAM:
+        return HistogramData(
+            data_points=points,
+            aggregation_temporality=AggregationTemporality.CUMULATIVE,
+        )
+    return Sum(
+        data_points=points,
+        aggregation_temporality=AggregationTemporality.CUMULATIVE,
+        is_monotonic=kind == _SUM,
+    )
+
+
+class MultiprocessMetricExporter(MetricExporter):
+    """
+    A MetricExporter that shares each worker's metrics through a directory
+    of memory-mapped files and exports the merged totals from one process.
+
+    Every export writes this process's cumulative points to its own file.
+    The process holding the directory's leader lock then merges all files
+    and forwards the totals to the wrapped exporter; other processes export
+    nothing. When the leader exits its lock is released and the next worker
+    to export takes over.
+    """
+
+    def __init__(self, exporter: MetricExporter, directory: str):
+        super().__init__(preferred_temporality=_CUMULATIVE)
+        self._exporter = exporter
+        self._directory = directory
+        self._file: Optional[SharedMetricFile] = None
+        self._lock_file = None
+        self._resource: Optional[Resource] = None
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._at_fork_reinit)
+
+    def _at_fork_reinit(self):
+        # the file and lock belong to the parent; closing the inherited
+        # descriptors does not release the parent's lock
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def is_leader(self) -> bool:
+        """
+        Returns whether this process holds the leader lock, trying to take
+        it if no process does.
+        """
+        if self._lock_file is None:
+            # pylint: disable=consider-using-with
+            lock_file = open(
+                os.path.join(self._directory, LEADER_LOCK_FILE), "a+b"
+            )
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,  # pylint: disable=unused-argument
+    ) -> MetricExportResult:
+        """
+        Writes this process's points to its shared file and, if this process
+        is the leader, exports the merged totals of every process.
+        """
+        if self._file is None:
+            self._file = SharedMetricFile(os.path.join(
+                self._directory, f"metrics-{os.getpid()}-{time_ns()}.db"
+            ))
+        for resource_metrics in metrics_data.resource_metrics:
+            self._resource = resource_metrics.resource
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    for key, values in _point_entries(
+                        scope_metrics.scope, metric
+                    ):
+                        self._file.write(key, values)
+
+        if self._resource is None or not self.is_leader():
+            return MetricExportResult.SUCCESS
+        return self._exporter.export(
+            merge_metric_files(self._directory, self._resource),
+            timeout_millis=timeout_millis,
+        )
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        """
+        Flushes the wrapped exporter.
+        """
+        return self._exporter.force_flush(timeout_millis=timeout_millis)
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        """
+        Gives up leadership, closes this process's shared file and shuts
+        down the wrapped exporter.
+        """
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._exporter.shutdown(timeout_millis=timeout_millis, **kwargs)
@@ -0,0 +1,258 @@
+"""Rewrites span names and URL attributes that embed IDs to templates.
+
+Server spans named after the request path, and the http.target and
+http.url attributes of client and server spans, carry a distinct value for
+every item requested, which bloats the span queue and export payloads and
+makes every request look different to the tracing backend. HTTP spans,
+those with any of HTTP_ATTRIBUTES, ending with a path matching one of
+SPAN_ROUTES, Flask-style route templates, are renamed to the route, and
+the query string is dropped:
+
+    SPAN_ROUTES=/items/<int:item_id>,/users/<user_id>/orders
+
+    GET /items/42?ref=home  ->  GET /items/<int:item_id>
+
+Paths matching no route have their numeric, UUID and long hexadecimal
+segments replaced with <id>, and their query string dropped.
+
+Typical usage example:
+
+    $bash> NORMALIZE_SPANS=true SPAN_ROUTES=/items/<int:item_id> \\
+        opentelemetry-instrument python app.py
+
+The routes are compiled once, grouped by their first path segment into a
+single regular expression each, so a path is only matched against the
+routes sharing its first segment, whatever the number of routes. As in
+Flask, routes starting with a literal segment are tried before routes
+starting with a variable.
+"""
+import re
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from opentelemetry.attributes import BoundedAttributes
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+
+# replaces the ID-like path segments matching no route
+ID_PLACEHOLDER = "<id>"
+
+# the span attributes holding a request path or URL, rewritten like names
+NORMALIZED_ATTRIBUTES = frozenset((
+    "http.target",
+    "http.url",
+    "url.path",
+    "url.full",
+))
+
+# the span attributes marking a span as HTTP, the only spans rewritten, as
+# other spans may be named after anything holding a slash
+HTTP_ATTRIBUTES = NORMALIZED_ATTRIBUTES | frozenset((
+    "http.method",
+    "http.request.method",
+    "http.route",
+))
+
+# upper bound on the number of distinct normalized values kept interned,
+# least recently used first out
+MAX_INTERNED_VALUES = 4096
+
+# the patterns matched by Flask's URL converters; <path:...> may not be
+# followed by more of the route, as Flask would backtrack into it
+_CONVERTER_PATTERNS = {
+    "default": r"[^/]+",
+    "string": r"[^/]+",
+    "int": r"\d+",
+    "float": r"\d+\.\d+",
+    "path": r"[^/].*?",
+    "uuid": r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+            r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+}
+
+_ROUTE_VARIABLE = re.compile(
+    r"<(?:(?P<converter>[a-zA-Z_]\w*)(?:\((?P<arguments>[^)]*)\))?:)?"
+    r"(?P<name>[a-zA-Z_]\w*)>"
+)
+
+# the first segment of the path, after an optional method, as in span
+# names, and scheme and host, as in URLs
+_FIRST_SEGMENT = re.compile(
+    r"(?:[A-Z]+ )?(?:[a-zA-Z][a-zA-Z0-9+.-]*://[^/?#]*)?/(?P<segment>[^/?#]*)"
+)
+
+_QUERY = re.compile(r"(?<=\S)[?#]\S*")
+
+_ID_SEGMENTS = re.compile(
+    r"/(?:"
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{12}"
+    r"|[0-9a-fA-F]{16,}"
+    r"|\d+"
+    r")(?=/|\s|$)"
+)
+
+_ID_SEGMENT = "/" + ID_PLACEHOLDER
+
+_interned_values: "OrderedDict[str, str]" = OrderedDict()
+
+
+def intern_value(value: str) -> str:
+    """
+    Returns a shared instance of the normalized value, so spans carrying
+    the same value reference a single string.
+
+    Args:
+        value (str): a normalized attribute value or span name
+
+    Returns:
+        str: the shared value
+    """
+    shared = _interned_values.get(value)
+    # another thread may evict the value in between, so misses are allowed
+    if shared is None:
+        shared = _interned_values[value] = value
+        if len(_interned_values) > MAX_INTERNED_VALUES:
+            try:
+                _interned_values.popitem(last=False)
+            except KeyError:
+                pass
+    else:
+        try:
+            _interned_values.move_to_end(value)
+        except KeyError:
+            pass
+    return shared
+
+
+def route_pattern(route: str) -> str:
+    """
+    Returns a regular expression matching the paths of a Flask route.
+
+    Args:
+        route (str): a route template, such as /items/<int:item_id>
+
+    Returns:
+        str: the pattern, without capturing groups
+    """
+    pattern = []
+    position = 0
+    for variable in _ROUTE_VARIABLE.finditer(route):
+        pattern.append(re.escape(route[position:variable.start()]))
+        converter = variable.group("converter") or "default"
+        if converter == "any":
+            pattern.append("(?:%s)" % "|".join(
+                re.escape(argument.strip().strip("'\""))
+                for argument in variable.group("arguments").split(",")
+            ))
+        else:
+            pattern.append(_CONVERTER_PATTERNS.get(
+                converter,
+                _CONVERTER_PATTERNS["default"]
+            ))
+        position = variable.end()
+    pattern.append(re.escape(route[position:]))
+    return "".join(pattern)
+
+
+# pylint: disable=too-few-public-methods
+class SpanNormalizer:
+    """
+    Rewrites paths, URLs and span names containing them to the route they
+    match, or with their ID-like segments replaced.
+    """
+
+    def __init__(self, routes: Optional[Sequence[str]] = None):
+        self._templates: Dict[str, str] = {}
+        # routes by their first segment, None if it holds a variable
+        alternatives: Dict[Optional[str], List[str]] = {}
+        for index, route in enumerate(routes or ()):
+            self._templates[f"r{index}"] = route
+            segment = route.lstrip("/").split("/", 1)[0]
+            alternatives.setdefault(
+                None if "<" in segment else segment,
+                []
+            ).append(f"(?P<r{index}>{route_pattern(route)})")
+        # each route is its own group, so lastgroup names the one matched
+        self._routes = {
+            segment: re.compile(
+                f"(?:{'|'.join(patterns)})(?:[?#].*)?",
+                re.DOTALL
+            )
+            for segment, patterns in alternatives.items()
+        }
+        self._variable_routes = self._routes.pop(None, None)
+
+    def normalize(self, value: str) -> str:
+        """
+        Returns the value with its path rewritten to the route it matches,
+        or with its ID-like segments replaced, and its query dropped.
+
+        Args:
+            value (str): a path, a URL, or a span name such as GET /items/1
+
+        Returns:
+            str: the interned normalized value, or the value as is if it
+            holds no path
+        """
+        if "/" not in value:
+            return value
+        match = None
+        if self._templates:
+            path = _FIRST_SEGMENT.match(value)
+            if path is not None:
+                start = path.start("segment") - 1
+                routes = self._routes.get(path.group("segment"))
+                if routes is not None:
+                    match = routes.fullmatch(value, start)
+                if match is None and self._variable_routes is not None:
+                    match = self._variable_routes.fullmatch(value, start)
+        if match is not None:
+            value = value[:start] + self._templates[match.lastgroup]
+        else:
+            value = _ID_SEGMENTS.sub(_ID_SEGMENT, _QUERY.sub("", value))
+        return intern_value(value)
+
+
+class NormalizingSpanProcessor(SpanProcessor):
+    """
+    A span processor rewriting the name and the path and URL attributes
+    of each sampled HTTP span as it ends, and interning its attribute keys, so
+    spans queued for export share them along with the normalized values.
+
+    Span names are rewritten as spans end, as a sampler cannot rename the
+    spans it samples, and instrumentations may rename them after they
+    start. The span is rewritten in place, so this processor must be added
+    to the tracer provider before any exporting processor.
+    """
+
+    def __init__(self, normalizer: SpanNormalizer):
+        self._normalizer = normalizer
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Rewrites the name and attributes of the span."""
+        if not span.context.trace_flags.sampled:
+            return
+        # the name and attributes are shared with the span that just
+        # ended, and are read by the processors after this one
+        # pylint: disable=protected-access
+        attributes = span._attributes
+        if not isinstance(attributes, BoundedAttributes):
+            return
+        normalize = self._normalizer.normalize
+        http = not HTTP_ATTRIBUTES.isdisjoint(attributes._dict)
+        if http:
+            span._name = normalize(span.name)
+        normalized = OrderedDict()
+        for key, value in attributes._dict.items():
+            if (http and key in NORMALIZED_ATTRIBUTES
+                    and isinstance(value, str)):
+                value = normalize(value)
+            normalized[sys.intern(key)] = value
+        attributes._dict = normalized
+
+    def shutdown(self) -> None:
+        """Does nothing, as nothing is buffered."""
+
+    # pylint: disable=unused-argument
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Returns immediately, as nothing is buffered."""
+        return True
@@ -1,15 +1,20 @@
 import logging
 import os
+from typing import Iterable, List, Optional
+from opentelemetry.environment_variables import OTEL_PROPAGATORS
 from opentelemetry.sdk.environment_variables import (
     OTEL_EXPORTER_OTLP_ENDPOINT,
     OTEL_EXPORTER_OTLP_INSECURE,
     OTEL_EXPORTER_OTLP_METRICS_PROTOCOL,
     OTEL_EXPORTER_OTLP_METRICS_INSECURE,
     OTEL_EXPORTER_OTLP_METRICS_ENDPOINT,
+    OTEL_EXPORTER_OTLP_LOGS_ENDPOINT,
     OTEL_EXPORTER_OTLP_PROTOCOL,
     OTEL_EXPORTER_OTLP_TRACES_ENDPOINT,
     OTEL_EXPORTER_OTLP_TRACES_INSECURE,
     OTEL_EXPORTER_OTLP_TRACES_PROTOCOL,
+    OTEL_EXPORTER_PROMETHEUS_HOST,
+    OTEL_EXPORTER_PROMETHEUS_PORT,
     OTEL_LOG_LEVEL,
     OTEL_SERVICE_NAME
 )
@@ -19,6 +24,30 @@ DEBUG = "DEBUG"
 CLOUD_APPLICATION = "CLOUD_APPLICATION"
 METRICS_DISABLED = "METRICS_DISABLED"
 TRACES_DISABLED = "TRACES_DISABLED"
+COMPACT_SPAN_QUEUE = "COMPACT_SPAN_QUEUE"
+BUFFERED_HISTOGRAMS = "BUFFERED_HISTOGRAMS"
+SHARDED_COUNTERS = "SHARDED_COUNTERS"
+METRICS_MULTIPROCESS_DIR = "METRICS_MULTIPROCESS_DIR"
+PROMETHEUS_METRICS = "PROMETHEUS_METRICS"
+BAGGAGE_MAX_ENTRIES = "BAGGAGE_MAX_ENTRIES"
+BAGGAGE_MAX_BYTES = "BAGGAGE_MAX_BYTES"
+INSTRUMENTATIONS_ENABLED = "INSTRUMENTATIONS_ENABLED"
+INSTRUMENTATIONS_DISABLED = "INSTRUMENTATIONS_DISABLED"
+CONFIG_RELOAD_FILE = "CONFIG_RELOAD_FILE"
+SPAN_CPU_TIME = "SPAN_CPU_TIME"
+SPAN_ALLOCATIONS = "SPAN_ALLOCATIONS"
+PROFILING = "PROFILING"
+PROFILING_FREQUENCY = "PROFILING_FREQUENCY"
+PROFILING_EXPORT_INTERVAL = "PROFILING_EXPORT_INTERVAL"
+PROFILING_FILE = "PROFILING_FILE"
+DEBUG_FILE = "DEBUG_FILE"
+DEBUG_FILE_MAX_BYTES = "DEBUG_FILE_MAX_BYTES"
+MEMORY_BUDGET_MB = "MEMORY_BUDGET_MB"
+MEMORY_BUDGET_PRIORITY = "MEMORY_BUDGET_PRIORITY"
+FLUSH_MODE = "FLUSH_MODE"
+FLUSH_DEADLINE_MILLIS = "FLUSH_DEADLINE_MILLIS"
+NORMALIZE_SPANS = "NORMALIZE_SPANS"
+SPAN_ROUTES = "SPAN_ROUTES"
 
 
 # Deployment environements
@@ -32,6 +61,17 @@ DEFAULT_EXPORTER_PROTOCOL = "http/protobuf"
 DEFAULT_SERVICE_NAME = "unknown_service:python"
 DEFAULT_LOG_LEVEL = "ERROR"
 DEFAULT_DEPLOYMENT = UNKNOWN_DEPLOYMENT
+DEFAULT_PROMETHEUS_HOST = "localhost"
+DEFAULT_PROMETHEUS_PORT = 9464
+DEFAULT_PROPAGATORS = ["tracecontext", "baggage"]
+DEFAULT_BAGGAGE_MAX_ENTRIES = 64
+DEFAULT_BAGGAGE_MAX_BYTES = 8192
+DEFAULT_PROFILING_FREQUENCY = 19
+DEFAULT_PROFILING_EXPORT_INTERVAL = 60
+DEFAULT_DEBUG_FILE_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MEMORY_BUDGET_PRIORITY = ["metrics", "traces", "logs"]
+DEFAULT_FLUSH_MODE = "batch"
+DEFAULT_FLUSH_DEADLINE_MILLIS = 5000
 
 # Errors and Warnings
 INVALID_DEBUG_ERROR = "Unable to parse DEBUG environment variable. " + \
@@ -40,6 +80,43 @@ INVALID_METRICS_DISABLED_ERROR = "Unable to parse " + \
     "METRICS_DISABLED. Defaulting to False."
 INVALID_TRACES_DISABLED_ERROR = "Unable to parse " + \
     "TRACES_DISABLED. Defaulting to False."
+INVALID_COMPACT_SPAN_QUEUE_ERROR = "Unable to parse " + \
+    "COMPACT_SPAN_QUEUE. Defaulting to False."
+INVALID_BUFFERED_HISTOGRAMS_ERROR = "Unable to parse " + \
+    "BUFFERED_HISTOGRAMS. Defaulting to False."
+INVALID_SHARDED_COUNTERS_ERROR = "Unable to parse " + \
+    "SHARDED_COUNTERS. Defaulting to False."
+INVALID_PROMETHEUS_METRICS_ERROR = "Unable to parse " + \
+    "PROMETHEUS_METRICS. Defaulting to False."
+INVALID_PROMETHEUS_PORT_ERROR = "Unable to parse " + \
+    "OTEL_EXPORTER_PROMETHEUS_PORT. Defaulting to 9464."
+INVALID_BAGGAGE_MAX_ENTRIES_ERROR = "Unable to parse " + \
+    "BAGGAGE_MAX_ENTRIES. Defaulting to 64."
+INVALID_BAGGAGE_MAX_BYTES_ERROR = "Unable to parse " + \
+    "BAGGAGE_MAX_BYTES. Defaulting to 8192."
+INVALID_SPAN_CPU_TIME_ERROR = "Unable to parse " + \
+    "SPAN_CPU_TIME. Defaulting to False."
+INVALID_SPAN_ALLOCATIONS_ERROR = "Unable to parse " + \
+    "SPAN_ALLOCATIONS. Defaulting to False."
+INVALID_PROFILING_ERROR = "Unable to parse " + \
+    "PROFILING. Defaulting to False."
+INVALID_PROFILING_FREQUENCY_ERROR = "Unable to parse " + \
+    "PROFILING_FREQUENCY as a positive integer. Defaulting to 19."
+INVALID_PROFILING_EXPORT_INTERVAL_ERROR = "Unable to parse " + \
+    "PROFILING_EXPORT_INTERVAL as a positive integer. Defaulting to 60."
+INVALID_DEBUG_FILE_MAX_BYTES_ERROR = "Unable to parse " + \
+    "DEBUG_FILE_MAX_BYTES. Defaulting to 10485760."
+INVALID_MEMORY_BUDGET_MB_ERROR = "Unable to parse " + \
+    "MEMORY_BUDGET_MB. Defaulting to 0, no budget."
+INVALID_MEMORY_BUDGET_PRIORITY_ERROR = "Invalid " + \
+    "MEMORY_BUDGET_PRIORITY detected. Must only list " + \
+    "['metrics', 'traces', 'logs']. Defaulting to metrics,traces,logs."
+INVALID_FLUSH_MODE_ERROR = "Invalid FLUSH_MODE detected. Must be one " + \
+    "of ['batch', 'invocation']. Defaulting to batch."
+INVALID_FLUSH_DEADLINE_MILLIS_ERROR = "Unable to parse " + \
+    "FLUSH_DEADLINE_MILLIS. Defaulting to 5000."
+INVALID_NORMALIZE_SPANS_ERROR = "Unable to parse " + \
+    "NORMALIZE_SPANS. Defaulting to False."
 INVALID_EXPORTER_PROTOCOL_ERROR = "Invalid OTLP exporter protocol " + \
     "detected. Must be one of ['http/protobuf']. Defaulting to http/protobuf."
 INVALID_INSECURE_ERROR = "Unable to parse " + \
@@ -68,11 +145,26 @@ EXPORTER_PROTOCOL_HTTP_PROTO = "http/protobuf"
 
 TRACES_HTTP_PATH = "v1/traces"
 METRICS_HTTP_PATH = "v1/metrics"
+LOGS_HTTP_PATH = "v1/logs"
 
 exporter_protocols = {
     EXPORTER_PROTOCOL_HTTP_PROTO
 }
 
+memory_budget_signals = {
+    "metrics",
+    "traces",
+    "logs"
+}
+
+FLUSH_MODE_BATCH = "batch"
+FLUSH_MODE_INVOCATION = "invocation"
+
+flush_modes = {
+    FLUSH_MODE_BATCH,
+    FLUSH_MODE_INVOCATION
+}
+
 _logger = logging.getLogger(__name__)
 
 def _append_traces_path(protocol: str, endpoint: str) -> str:
@@ -125,6 +217,50 @@ def parse_bool(environment_variable: str,
             _logger.warning(error_message)
     return default_value
 
+def parse_int(environment_variable: str,
+              default_value: int,
+              error_message: str) -> int:
+    """
+    Attempts to parse the provided environment variable into an int. If it
+    does not exist or fails parse, the default value is returned instead.
+
+    Args:
+        environment_variable (str): the environment variable name to use
+        default_value (int): the default value if not found or unable parse
+        error_message (str): the error message to log if unable to parse
+
+    Returns:
+        int: either the parsed environment variable or default value
+    """
+    val = os.getenv(environment_variable, None)
+    if val:
+        try:
+            return int(val)
+        except ValueError:
+            _logger.warning(error_message)
+    return default_value
+
+def parse_list(environment_variable: str,
+               default_value: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """
+    Attempts to parse the provided environment variable into a list of
+    comma separated names. If it does not exist, the default value is
+    parsed instead.
+
+    Args:
+        environment_variable (str): the environment variable name to use
+        default_value (str or list): the default value if not found
+
+    Returns:
+        list: the stripped, non-empty names, or None if neither is set
+    """
+    val = os.getenv(environment_variable, default_value)
+    if val is None:
+        return None
+    if isinstance(val, str):
+        val = val.split(",")
+    return [name.strip() for name in val if name.strip()]
+
 def get_default_insecure(deployment: str) -> bool:
     """
     Attempts to determine if insecure should default to true or false based on deployment.
@@ -173,6 +309,33 @@ class TgtOptions:
     deployment = DEFAULT_DEPLOYMENT
     metrics_disabled = False
     traces_disabled = False
+    compact_span_queue = False
+    buffered_histograms = False
+    sharded_counters = False
+    metrics_multiprocess_dir = None
+    prometheus_metrics = False
+    prometheus_host = DEFAULT_PROMETHEUS_HOST
+    prometheus_port = DEFAULT_PROMETHEUS_PORT
+    propagators = DEFAULT_PROPAGATORS
+    instrumentations_enabled = None
+    instrumentations_disabled = []
+    config_reload_file = None
+    span_cpu_time = False
+    span_allocations = False
+    profiling = False
+    profiling_frequency = DEFAULT_PROFILING_FREQUENCY
+    profiling_export_interval = DEFAULT_PROFILING_EXPORT_INTERVAL
+    profiling_file = None
+    debug_file = None
+    debug_file_max_bytes = DEFAULT_DEBUG_FILE_MAX_BYTES
+    memory_budget_mb = 0
+    memory_budget_priority = DEFAULT_MEMORY_BUDGET_PRIORITY
+    flush_mode = DEFAULT_FLUSH_MODE
+    flush_deadline_millis = DEFAULT_FLUSH_DEADLINE_MILLIS
+    normalize_spans = False
+    span_routes = []
+    baggage_max_entries = DEFAULT_BAGGAGE_MAX_ENTRIES
+    baggage_max_bytes = DEFAULT_BAGGAGE_MAX_BYTES
 
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements
     def __init__(
@@ -191,7 +354,34 @@ class TgtOptions:
         debug: bool = False,
         deployment: str = DEFAULT_DEPLOYMENT,
         metrics_disabled: bool = False,
-        traces_disabled: bool = False
+        traces_disabled: bool = False,
+        compact_span_queue: bool = False,
+        buffered_histograms: bool = False,
+        sharded_counters: bool = False,
+        metrics_multiprocess_dir: str = None,
+        prometheus_metrics: bool = False,
+        prometheus_host: str = None,
+        prometheus_port: int = None,
+        propagators: list = None,
+        baggage_max_entries: int = None,
+        baggage_max_bytes: int = None,
+        instrumentations_enabled: list = None,
+        instrumentations_disabled: list = None,
+        config_reload_file: str = None,
+        span_cpu_time: bool = False,
+        span_allocations: bool = False,
+        profiling: bool = False,
+        profiling_frequency: int = None,
+        profiling_export_interval: int = None,
+        profiling_file: str = None,
+        debug_file: str = None,
+        debug_file_max_bytes: int = None,
+        memory_budget_mb: int = None,
+        memory_budget_priority: list = None,
+        flush_mode: str = None,
+        flush_deadline_millis: int = None,
+        normalize_spans: bool = False,
+        span_routes: list = None
     ):
         # Detect deployment
 
@@ -215,6 +405,143 @@ class TgtOptions:
             INVALID_TRACES_DISABLED_ERROR
         )
 
+        self.compact_span_queue = parse_bool(
+            COMPACT_SPAN_QUEUE,
+            (compact_span_queue or False),
+            INVALID_COMPACT_SPAN_QUEUE_ERROR
+        )
+
+        self.buffered_histograms = parse_bool(
+            BUFFERED_HISTOGRAMS,
+            (buffered_histograms or False),
+            INVALID_BUFFERED_HISTOGRAMS_ERROR
+        )
+
+        self.sharded_counters = parse_bool(
+            SHARDED_COUNTERS,
+            (sharded_counters or False),
+            INVALID_SHARDED_COUNTERS_ERROR
+        )
+
+        self.metrics_multiprocess_dir = os.environ.get(
+            METRICS_MULTIPROCESS_DIR, metrics_multiprocess_dir)
+
+        self.prometheus_metrics = parse_bool(
+            PROMETHEUS_METRICS,
+            (prometheus_metrics or False),
+            INVALID_PROMETHEUS_METRICS_ERROR
+        )
+        self.prometheus_host = os.environ.get(
+            OTEL_EXPORTER_PROMETHEUS_HOST,
+            (prometheus_host or DEFAULT_PROMETHEUS_HOST))
+        self.prometheus_port = parse_int(
+            OTEL_EXPORTER_PROMETHEUS_PORT,
+            (prometheus_port or DEFAULT_PROMETHEUS_PORT),
+            INVALID_PROMETHEUS_PORT_ERROR
+        )
+
+        self.propagators = [
+            propagator.lower() for propagator in
+            (parse_list(OTEL_PROPAGATORS, propagators) or DEFAULT_PROPAGATORS)
+        ]
+        self.baggage_max_entries = parse_int(
+            BAGGAGE_MAX_ENTRIES,
+            (baggage_max_entries or DEFAULT_BAGGAGE_MAX_ENTRIES),
+            INVALID_BAGGAGE_MAX_ENTRIES_ERROR
+        )
+        self.baggage_max_bytes = parse_int(
+            BAGGAGE_MAX_BYTES,
+            (baggage_max_bytes or DEFAULT_BAGGAGE_MAX_BYTES),
+            INVALID_BAGGAGE_MAX_BYTES_ERROR
+        )
+
+        # None enables every installed instrumentor
+        self.instrumentations_enabled = parse_list(
+            INSTRUMENTATIONS_ENABLED,
+            instrumentations_enabled
+        )
+        self.instrumentations_disabled = parse_list(
+            INSTRUMENTATIONS_DISABLED,
+            instrumentations_disabled
+        ) or []
+        self.config_reload_file = os.environ.get(
+            CONFIG_RELOAD_FILE,
+            config_reload_file
+        )
+        self.span_cpu_time = parse_bool(
+            SPAN_CPU_TIME,
+            (span_cpu_time or False),
+            INVALID_SPAN_CPU_TIME_ERROR
+        )
+        self.span_allocations = parse_bool(
+            SPAN_ALLOCATIONS,
+            (span_allocations or False),
+            INVALID_SPAN_ALLOCATIONS_ERROR
+        )
+        self.profiling = parse_bool(
+            PROFILING,
+            (profiling or False),
+            INVALID_PROFILING_ERROR
+        )
+        self.profiling_frequency = parse_int(
+            PROFILING_FREQUENCY,
+            (profiling_frequency or DEFAULT_PROFILING_FREQUENCY),
+            INVALID_PROFILING_FREQUENCY_ERROR
+        )
+        self.profiling_export_interval = parse_int(
+            PROFILING_EXPORT_INTERVAL,
+            (profiling_export_interval or DEFAULT_PROFILING_EXPORT_INTERVAL),
+            INVALID_PROFILING_EXPORT_INTERVAL_ERROR
+        )
+        if self.profiling_frequency <= 0:
+            _logger.warning(INVALID_PROFILING_FREQUENCY_ERROR)
+            self.profiling_frequency = DEFAULT_PROFILING_FREQUENCY
+        if self.profiling_export_interval <= 0:
+            _logger.warning(INVALID_PROFILING_EXPORT_INTERVAL_ERROR)
+            self.profiling_export_interval = DEFAULT_PROFILING_EXPORT_INTERVAL
+        self.profiling_file = os.environ.get(PROFILING_FILE, profiling_file)
+        self.debug_file = os.environ.get(DEBUG_FILE, debug_file)
+        self.debug_file_max_bytes = parse_int(
+            DEBUG_FILE_MAX_BYTES,
+            (debug_file_max_bytes or DEFAULT_DEBUG_FILE_MAX_BYTES),
+            INVALID_DEBUG_FILE_MAX_BYTES_ERROR
+        )
+        self.memory_budget_mb = parse_int(
+            MEMORY_BUDGET_MB,
+            (memory_budget_mb or 0),
+            INVALID_MEMORY_BUDGET_MB_ERROR
+        )
+        self.memory_budget_priority = [
+            signal.lower() for signal in parse_list(
+                MEMORY_BUDGET_PRIORITY,
+                memory_budget_priority
+            ) or DEFAULT_MEMORY_BUDGET_PRIORITY
+        ]
+        if not memory_budget_signals.issuperset(
+            self.memory_budget_priority
+        ):
+            _logger.warning(INVALID_MEMORY_BUDGET_PRIORITY_ERROR)
+            self.memory_budget_priority = DEFAULT_MEMORY_BUDGET_PRIORITY
+        self.flush_mode = os.environ.get(
+            FLUSH_MODE,
+            (flush_mode or DEFAULT_FLUSH_MODE)
+        ).strip().lower()
+        if self.flush_mode not in flush_modes:
+            _logger.warning(INVALID_FLUSH_MODE_ERROR)
+            self.flush_mode = DEFAULT_FLUSH_MODE
+        self.flush_deadline_millis = parse_int(
+            FLUSH_DEADLINE_MILLIS,
+            (flush_deadline_millis or DEFAULT_FLUSH_DEADLINE_MILLIS),
+            INVALID_FLUSH_DEADLINE_MILLIS_ERROR
+        )
+        # routes are matched in order, so list more specific ones first
+        self.span_routes = parse_list(SPAN_ROUTES, span_routes) or []
+        self.normalize_spans = parse_bool(
+            NORMALIZE_SPANS,
+            (normalize_spans or False),
+            INVALID_NORMALIZE_SPANS_ERROR
+        ) or bool(self.span_routes)
+
         self.debug = parse_bool(
             DEBUG,
             (debug or False),
@@ -331,3 +658,31 @@ class TgtOptions:
         Returns the OTLP metrics endpoint to send metrics to.
         """
         return self.metrics_endpoint
+
+    def get_logs_endpoint(self) -> str:
+        """
+        Returns the OTLP logs endpoint to send profiles to. Unless
+        OTEL_EXPORTER_OTLP_LOGS_ENDPOINT is set, this is the traces endpoint
+        with its '/v1/traces' path replaced by '/v1/logs'.
+        """
+        endpoint = os.environ.get(OTEL_EXPORTER_OTLP_LOGS_ENDPOINT, None)
+        if endpoint:
+            return endpoint
+        endpoint = self.traces_endpoint.strip("/")
+        if endpoint.endswith(TRACES_HTTP_PATH):
+            endpoint = endpoint[:-len(TRACES_HTTP_PATH)].strip("/")
+        return "/".join([endpoint, LOGS_HTTP_PATH])
+
+    def get_trace_headers(self) -> dict:
+        """
+        Returns the extra headers to send with each traces export request.
+        Exporters fall back to OTEL_EXPORTER_OTLP_TRACES_HEADERS when empty.
+        """
+        return {}
+
+    def get_metrics_headers(self) -> dict:
+        """
+        Returns the extra headers to send with each metrics export request.
+        Exporters fall back to OTEL_EXPORTER_OTLP_METRICS_HEADERS when empty.
+        """
+        return {}
@@ -0,0 +1,455 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.context import Context
+from opentelemetry.exporter.otlp.proto.http._log_exporter import (
+    OTLPLogExporter
+)
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import SpanContext, TraceFlags
+from tgt.opentelemetry.budget import LOGS, MemoryBudget
+from tgt.opentelemetry.debug import JsonLinesLogExporter, json_lines_writer
+from tgt.opentelemetry.options import (
+    DEFAULT_PROFILING_EXPORT_INTERVAL,
+    DEFAULT_PROFILING_FREQUENCY,
+    TgtOptions
+)
+from tgt.opentelemetry.version import __version__
+
+_logger = getLogger(__name__)
+
+# distinct (trace, span, stack) entries kept per export interval
+DEFAULT_MAX_STACKS = 4096
+
+# frames kept from the innermost one outwards
+DEFAULT_MAX_DEPTH = 64
+
+# formatted frame names kept between exports, least recently used first out;
+# each keeps its code object alive
+MAX_FRAME_NAMES = 8192
+
+# approximate bytes held by a stack table entry, plus 8 per frame
+STACK_SIZE = 200
+
+# (trace ID, span ID, folded stack), IDs are 0 outside a sampled span
+StackKey = Tuple[int, int, str]
+
+_SCOPE = InstrumentationScope("tgt.opentelemetry.profiler", __version__)
+
+
+class ActiveSpanTracker(SpanProcessor):
+    """
+    Tracks the innermost open span started on each thread, so another
+    thread can tell which span a thread is working on. Context variables
+    are only readable by their own thread, so the profiler relies on this
+    instead of the OpenTelemetry context.
+    """
+
+    def __init__(self):
+        self._open: Dict[int, List[SpanContext]] = {}
+
+    # pylint: disable=unused-argument
+    def on_start(
+        self,
+        span: Span,
+        parent_context: Optional[Context] = None
+    ) -> None:
+        """Pushes the span onto the starting thread's open spans."""
+        self._open.setdefault(threading.get_ident(), []).append(span.context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        """Removes the span from the open spans of the thread it began on."""
+        opened = self._open.get(threading.get_ident())
+        if opened and opened[-1] is span.context:
+            opened.pop()
+            return
+        for opened in list(self._open.values()):
+            if span.context in opened:
+                opened.remove(span.context)
+                return
+
+    def active(self, thread: int) -> Optional[SpanContext]:
+        """
+        Returns the innermost open span of the thread, if any.
+
+        Args:
+            thread (int): the thread identifier
+        """
+        try:
+            return self._open[thread][-1]
+        except (KeyError, IndexError):
+            return None
+
+    def forget_threads(self, alive) -> None:
+        """
+        Drops the span stacks of threads that are no longer alive, along
+        with any span they left open.
+
+        Args:
+            alive: the identifiers of the live threads
+        """
+        # a snapshot, as threads starting spans add to the dict meanwhile
+        for thread in [thread for thread in list(self._open)
+                       if thread not in alive]:
+            self._open.pop(thread, None)
+
+    def shutdown(self) -> None:
+        """Forgets the spans still open."""
+        self._open.clear()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """Returns immediately, as nothing is buffered."""
+        return True
+
+
+@dataclass
+class Profile:
+    """
+    The stacks sampled over one export interval, folded root first with
+    frames separated by semicolons, and counted by the span they ran in.
+    """
+    start_time_unix_nano: int
+    end_time_unix_nano: int
+    frequency: int
+    stacks: Dict[StackKey, int] = field(default_factory=dict)
+    dropped: int = 0
+
+
+class ProfileExporter:
+    """
+    Interface for exporting the profile of each interval.
+    """
+
+    def export(self, profile: Profile) -> None:
+        """
+        Exports the profile.
+
+        Args:
+            profile (Profile): the stacks sampled over the last interval
+        """
+
+    def shutdown(self) -> None:
+        """
+        Releases the resources held by the exporter.
+        """
+
+
+class FoldedStackFileExporter(ProfileExporter):
+    """
+    Appends the stacks to a file in the folded format read by flamegraph
+    tools, one "frame;frame;frame count" line per stack. Stacks sampled in
+    a span start with trace:<trace id>;span:<span id> frames, so a flame
+    graph can be cut down to one trace.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    def export(self, profile: Profile) -> None:
+        lines = []
+        for (trace_id, span_id, stack), count in profile.stacks.items():
+            if trace_id:
+                stack = f"trace:{trace_id:032x};span:{span_id:016x};{stack}"
+            lines.append(f"{stack} {count}\n")
+        with open(self._path, "a", encoding="utf-8") as profile_file:
+            profile_file.writelines(lines)
+
+
+class LogProfileExporter(ProfileExporter):
+    """
+    Exports each stack as an OTLP log record carrying the trace and span
+    it was sampled in, the folded stack as its body and the sample count as
+    the profile.samples attribute.
+    """
+
+    def __init__(self, log_exporter: LogExporter, resource: Resource):
+        self._log_exporter = log_exporter
+        self._resource = resource
+
+    def export(self, profile: Profile) -> None:
+        records = [
+            LogData(
+                LogRecord(
+                    timestamp=profile.end_time_unix_nano,
+                    observed_timestamp=profile.end_time_unix_nano,
+                    trace_id=trace_id,
+                    span_id=span_id,
+                    # the OTLP encoder reads both
+                    trace_flags=TraceFlags(
+                        TraceFlags.SAMPLED if trace_id else TraceFlags.DEFAULT
+                    ),
+                    severity_number=SeverityNumber.UNSPECIFIED,
+                    body=stack,
+                    resource=self._resource,
+                    attributes={
+                        "profile.samples": count,
+                        "profile.frequency": profile.frequency,
+                        "profile.start_time_unix_nano":
+                            profile.start_time_unix_nano,
+                    },
+                ),
+                _SCOPE,
+            )
+            for (trace_id, span_id, stack), count in profile.stacks.items()
+        ]
+        if records:
+            self._log_exporter.export(records)
+
+    def shutdown(self) -> None:
+        self._log_exporter.shutdown()
+
+
+# pylint: disable=too-many-instance-attributes
+class SamplingProfiler:
+    """
+    A background thread sampling the stack of every other thread at a fixed
+    frequency through sys._current_frames(), counting each stack by the
+    span its thread had open. The counts are kept in a table bounded to
+    max_stacks entries per export interval; samples of new stacks beyond
+    that are counted as dropped, as are new stacks that do not fit in the
+    memory budget, if one is given.
+
+    Each sample only walks frame objects and counts tuples of their code
+    objects; frame names are formatted once per export. The cost grows
+    with thread count and stack depth, not with the work the sampled
+    threads do.
+
+    Exports may run on other threads than the profiler's, such as when
+    telemetry is flushed; the stack table is swapped out under a lock
+    the samples take to update it, and exports run one at a time.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        exporter: ProfileExporter,
+        frequency: int = DEFAULT_PROFILING_FREQUENCY,
+        export_interval: float = DEFAULT_PROFILING_EXPORT_INTERVAL,
+        max_stacks: int = DEFAULT_MAX_STACKS,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        budget: Optional[MemoryBudget] = None
+    ):
+        if frequency <= 0:
+            raise ValueError(f"frequency must be positive, not {frequency}")
+        if export_interval <= 0:
+            raise ValueError(
+                f"export_interval must be positive, not {export_interval}"
+            )
+        self.span_tracker = ActiveSpanTracker()
+        self._exporter = exporter
+        self._frequency = frequency
+        self._export_interval = export_interval
+        self._max_stacks = max_stacks
+        self._max_depth = max_depth
+        self._names: "OrderedDict[object, str]" = OrderedDict()
+        self._stacks: Dict[Tuple[int, int, tuple], int] = {}
+        self._dropped = 0
+        self._budget = budget
+        self._reserved = 0
+        self._start_time = time.time_ns()
+        # guards the stack table, dropped count and reservation
+        self._lock = threading.Lock()
+        # serializes collections, which share the frame names, and exports
+        self._export_lock = threading.RLock()
+        self._done = threading.Event()
+        self._thread = None
+        # the samples taken and the CPU time they took on the profiler thread
+        self.sample_count = 0
+        self.sample_cpu_ns = 0
+
+    def _name(self, code) -> str:
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = (
+                f"{getattr(code, 'co_qualname', code.co_name)} "
+                f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            )
+            if len(self._names) > MAX_FRAME_NAMES:
+                self._names.popitem(last=False)
+        else:
+            self._names.move_to_end(code)
+        return name
+
+    def sample(self) -> None:
+        """
+        Records the current stack of every thread but the profiler's.
+        """
+        start_cpu = time.thread_time_ns()
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        own = threading.get_ident()
+        keys = []
+        for thread, frame in frames.items():
+            if thread == own:
+                continue
+            codes = []
+            while frame is not None and len(codes) < self._max_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            span = self.span_tracker.active(thread)
+            keys.append((
+                span.trace_id if span else 0,
+                span.span_id if span else 0,
+                tuple(codes),
+            ))
+        self.span_tracker.forget_threads(frames)
+        with self._lock:
+            stacks = self._stacks
+            for key in keys:
+                if key in stacks:
+                    stacks[key] += 1
+                elif len(stacks) < self._max_stacks and \
+                        self._reserve(key[2]):
+                    stacks[key] = 1
+                else:
+                    self._dropped += 1
+        del frames
+        self.sample_count += 1
+        self.sample_cpu_ns += time.thread_time_ns() - start_cpu
+
+    def _reserve(self, codes: tuple) -> bool:
+        if self._budget is None:
+            return True
+        size = STACK_SIZE + 8 * len(codes)
+        if not self._budget.reserve(LOGS, size):
+            return False
+        self._reserved += size
+        return True
+
+    def collect(self) -> Profile:
+        """
+        Returns the stacks sampled since the last collection, and starts a
+        new interval.
+        """
+        with self._lock:
+            stacks, self._stacks = self._stacks, {}
+            dropped, self._dropped = self._dropped, 0
+            reserved, self._reserved = self._reserved, 0
+            start_time, self._start_time = self._start_time, time.time_ns()
+            end_time = self._start_time
+        if reserved:
+            self._budget.release(LOGS, reserved)
+        profile = Profile(start_time, end_time, self._frequency)
+        with self._export_lock:
+            for (trace_id, span_id, codes), count in stacks.items():
+                folded = ";".join(
+                    self._name(code) for code in reversed(codes)
+                )
+                key = (trace_id, span_id, folded)
+                profile.stacks[key] = profile.stacks.get(key, 0) + count
+        profile.dropped = dropped
+        return profile
+
+    def export(self) -> None:
+        """
+        Collects the current interval and exports it.
+        """
+        with self._export_lock:
+            profile = self.collect()
+            if profile.dropped:
+                _logger.warning(
+                    "Profiler dropped %d samples beyond %d stacks",
+                    profile.dropped,
+                    self._max_stacks
+                )
+            try:
+                self._exporter.export(profile)
+            except Exception:  # pylint: disable=broad-except
+                _logger.exception("Exception while exporting profile.")
+
+    def start(self) -> None:
+        """
+        Starts sampling on a daemon thread, exporting every interval. The
+        last interval is exported by shutdown, which configure_opentelemetry
+        leaves to the exit flush.
+        """
+        self._thread = threading.Thread(
+            name="TgtSamplingProfiler",
+            target=self._run,
+            daemon=True
+        )
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """
+        Stops sampling and exports the last interval.
+        """
+        if self._done.is_set():
+            return
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.export()
+        self._exporter.shutdown()
+
+    def _run(self) -> None:
+        period = 1 / self._frequency
+        next_sample = time.monotonic()
+        next_export = next_sample + self._export_interval
+        while True:
+            next_sample += period
+            now = time.monotonic()
+            if next_sample < now:
+                # fell behind, e.g. the process was suspended; skip ahead
+                next_sample = now + period
+            if self._done.wait(next_sample - now):
+                return
+            try:
+                self.sample()
+                if next_sample >= next_export:
+                    next_export += self._export_interval
+                    self.export()
+            except Exception:  # pylint: disable=broad-except
+                # one bad sample must not end profiling for the process
+                _logger.exception("Exception while sampling stacks.")
+
+
+def create_profiler(
+    options: TgtOptions,
+    resource: Resource,
+    budget: Optional[MemoryBudget] = None
+) -> SamplingProfiler:
+    """
+    Configures and returns a sampling profiler exporting to the file in
+    the options, or as OTLP logs next to the traces endpoint, or written
+    as OTLP JSON lines in debug mode.
+
+    Args:
+        options (TgtOptions): the Target options to configure with
+        resource (Resource): the resource of the exported log records
+        budget (MemoryBudget, optional): the memory budget sampled stacks
+        are reserved from
+
+    Returns:
+        SamplingProfiler: the profiler, not yet started
+    """
+    if options.profiling_file:
+        exporter = FoldedStackFileExporter(options.profiling_file)
+    elif options.debug:
+        exporter = LogProfileExporter(
+            JsonLinesLogExporter(json_lines_writer(options)),
+            resource
+        )
+    else:
+        exporter = LogProfileExporter(
+            OTLPLogExporter(
+                endpoint=options.get_logs_endpoint(),
+                headers=options.get_trace_headers()
+            ),
+            resource
+        )
+    return SamplingProfiler(
+        exporter,
+        frequency=options.profiling_frequency,
+        export_interval=options.profiling_export_interval,
+        budget=budget
+    )
@@ -0,0 +1,393 @@
+"""Serves metrics for Prometheus to scrape instead of pushing them over OTLP.
+
+Each scrape collects the MeterProvider and answers with the Prometheus text
+format, or OpenMetrics when the scraper asks for it. Encoded responses are
+cached and only regenerated when the collected values change, so frequent
+scrapes from several scrapers stay cheap.
+
+Typical usage example:
+
+    $bash> PROMETHEUS_METRICS=true OTEL_EXPORTER_PROMETHEUS_HOST=0.0.0.0 \\
+        python program.py
+    $bash> curl http://localhost:9464/metrics
+"""
+import gzip
+import math
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Tuple
+from opentelemetry.sdk.metrics.export import (
+    Gauge,
+    Histogram,
+    Metric,
+    MetricReader,
+    MetricsData,
+    Sum
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+_logger = getLogger(__name__)
+
+TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = \
+    "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRICS_PATHS = ("/", "/metrics")
+
+_INVALID_METRIC_NAME_CHARACTERS = re.compile(r"[^a-zA-Z0-9_:]")
+_INVALID_LABEL_NAME_CHARACTERS = re.compile(r"[^a-zA-Z0-9_]")
+_LABEL_VALUE_ESCAPES = str.maketrans({"\\": r"\\", "\"": r"\"", "\n": r"\n"})
+_HELP_ESCAPES = str.maketrans({"\\": r"\\", "\n": r"\n"})
+
+_COUNTER = "counter"
+_GAUGE = "gauge"
+_HISTOGRAM = "histogram"
+
+
+def _metric_name(name: str) -> str:
+    name = _INVALID_METRIC_NAME_CHARACTERS.sub("_", name)
+    return "_" + name if name[:1].isdigit() else name
+
+
+def _label_name(name: str) -> str:
+    name = _INVALID_LABEL_NAME_CHARACTERS.sub("_", name)
+    return "_" + name if name[:1].isdigit() else name
+
+
+def _label_value(value) -> str:
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    elif isinstance(value, (list, tuple)):
+        value = "[" + ",".join(_label_value(item) for item in value) + "]"
+    return str(value).translate(_LABEL_VALUE_ESCAPES)
+
+
+def _labels(attributes) -> str:
+    return ",".join(
+        f'{_label_name(key)}="{_label_value(value)}"'
+        for key, value in attributes
+    )
+
+
+def _value(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _signature(metrics_data: MetricsData) -> tuple:
+    """
+    Returns a cheap-to-compare summary of every series and value in the
+    collection; two collections with equal signatures encode to the same
+    response.
+    """
+    signature = []
+    for resource_metrics in metrics_data.resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            scope = scope_metrics.scope
+            signature.append((scope.name, scope.version))
+            for metric in scope_metrics.metrics:
+                signature.append(metric.name)
+                data = metric.data
+                if isinstance(data, Histogram):
+                    signature.extend(
+                        (
+                            *point.attributes.items(),
+                            point.count,
+                            point.sum,
+                            *point.bucket_counts
+                        )
+                        for point in data.data_points
+                    )
+                else:
+                    signature.extend(
+                        (*point.attributes.items(), point.value)
+                        for point in data.data_points
+                    )
+    return tuple(signature)
+
+
+# pylint: disable=too-few-public-methods
+class PrometheusEncoder:
+    """
+    Encodes MetricsData in the Prometheus text or OpenMetrics format.
+
+    The encoded response is kept until the collected values change, and the
+    label string of every series is kept between encodings, so a scrape of
+    unchanged data costs a comparison and one with a few changed series
+    mostly costs formatting their values.
+    """
+
+    def __init__(self):
+        self._signature: Optional[tuple] = None
+        self._responses: Dict[Tuple[bool, bool], bytes] = {}
+        self._labels: Dict[tuple, str] = {}
+
+    def encode(
+        self,
+        metrics_data: MetricsData,
+        openmetrics: bool = False,
+        compress: bool = False
+    ) -> bytes:
+        """
+        Returns the encoded response for the collection.
+
+        Args:
+            metrics_data (MetricsData): the latest cumulative collection
+            openmetrics (bool): encode as OpenMetrics instead of the
+            Prometheus text format
+            compress (bool): gzip the encoded response
+
+        Returns:
+            bytes: the response body
+        """
+        signature = _signature(metrics_data)
+        if signature != self._signature:
+            self._signature = signature
+            self._responses = {}
+        response = self._responses.get((openmetrics, compress))
+        if response is None:
+            response = self._responses.get((openmetrics, False))
+            if response is None:
+                response = self._render(metrics_data, openmetrics)
+                self._responses[(openmetrics, False)] = response
+            if compress:
+                response = gzip.compress(response, compresslevel=6)
+                self._responses[(openmetrics, True)] = response
+        return response
+
+    def _series_labels(self, labels: Dict[tuple, str], name: str,
+                       scope: InstrumentationScope, attributes) -> str:
+        key = (name, scope.name, scope.version, *attributes.items())
+        series = self._labels.get(key)
+        if series is None:
+            series = _labels((
+                ("otel_scope_name", scope.name),
+                ("otel_scope_version", scope.version or ""),
+                *attributes.items(),
+            ))
+        labels[key] = series
+        return series
+
+    def _render(self, metrics_data: MetricsData, openmetrics: bool) -> bytes:
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        resource = None
+        labels: Dict[tuple, str] = {}
+        for resource_metrics in metrics_data.resource_metrics:
+            resource = resource_metrics.resource
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    self._render_metric(
+                        families, labels, scope_metrics.scope, metric,
+                        openmetrics
+                    )
+        # series that were not collected this time are not kept
+        self._labels = labels
+
+        lines = []
+        if resource is not None:
+            lines.extend(_target_info(resource, openmetrics))
+        for name, (kind, description, samples) in families.items():
+            if description:
+                lines.append(
+                    f"# HELP {name} {description.translate(_HELP_ESCAPES)}"
+                )
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        if openmetrics:
+            lines.append("# EOF")
+        lines.append("")
+        return "\n".join(lines).encode("utf-8")
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _render_metric(self, families, labels, scope: InstrumentationScope,
+                       metric: Metric, openmetrics: bool):
+        data = metric.data
+        name = _metric_name(metric.name)
+        if isinstance(data, Sum) and data.is_monotonic:
+            kind = _COUNTER
+            if name.endswith("_total"):
+                name = name[:-len("_total")]
+            sample = name + "_total"
+            if not openmetrics:
+                name = sample
+        elif isinstance(data, (Sum, Gauge)):
+            kind = _GAUGE
+            sample = name
+        elif isinstance(data, Histogram):
+            kind = _HISTOGRAM
+        else:
+            _logger.debug(
+                "%s is not exposed to Prometheus: %s is not supported",
+                metric.name, type(data).__name__
+            )
+            return
+
+        family = families.get(name)
+        if family is None:
+            family = families[name] = (kind, metric.description, [])
+        samples = family[2]
+
+        if kind != _HISTOGRAM:
+            for point in data.data_points:
+                series = self._series_labels(
+                    labels, metric.name, scope, point.attributes
+                )
+                samples.append(f"{sample}{{{series}}} {_value(point.value)}")
+            return
+
+        for point in data.data_points:
+            series = self._series_labels(
+                labels, metric.name, scope, point.attributes
+            )
+            bounds = [_value(float(bound)) for bound in point.explicit_bounds]
+            bounds.append("+Inf")
+            cumulative = 0
+            for bound, count in zip(bounds, point.bucket_counts):
+                cumulative += count
+                samples.append(
+                    f'{name}_bucket{{{series},le="{bound}"}} {cumulative}'
+                )
+            samples.append(f"{name}_sum{{{series}}} {_value(point.sum)}")
+            samples.append(f"{name}_count{{{series}}} {point.count}")
+
+
+def _target_info(resource: Resource, openmetrics: bool) -> List[str]:
+    kind = "info" if openmetrics else _GAUGE
+    return [
+        "# HELP target_info Target metadata",
+        f"# TYPE target_info {kind}",
+        f"target_info{{{_labels(resource.attributes.items())}}} 1",
+    ]
+
+
+class PrometheusMetricReader(MetricReader):
+    """
+    A MetricReader collected by Prometheus scrapes.
+
+    Serves the latest collection over HTTP from a small in-process server.
+    Scrapes arriving while another scrape is collecting wait for it and share
+    its result instead of collecting again.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9464,
+        start_server: bool = True
+    ):
+        super().__init__()
+        self._encoder = PrometheusEncoder()
+        self._lock = Lock()
+        self._generation = 0
+        self._metrics_data: Optional[MetricsData] = None
+        self._server = None
+        if start_server:
+            self._server = ThreadingHTTPServer(
+                (host, port), _handler_class(self)
+            )
+            self._server.daemon_threads = True
+            Thread(
+                name="TgtPrometheusMetricReader",
+                target=self._server.serve_forever,
+                daemon=True,
+            ).start()
+
+    @property
+    def server_address(self) -> Optional[Tuple[str, int]]:
+        """
+        Returns the (host, port) the scrape endpoint listens on, if any.
+        """
+        if self._server is None:
+            return None
+        return self._server.server_address[:2]
+
+    # pylint: disable=unused-argument
+    def _receive_metrics(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> None:
+        self._metrics_data = metrics_data
+
+    def scrape(
+        self,
+        openmetrics: bool = False,
+        compress: bool = False
+    ) -> bytes:
+        """
+        Collects the metrics and returns the encoded response.
+
+        Args:
+            openmetrics (bool): encode as OpenMetrics instead of the
+            Prometheus text format
+            compress (bool): gzip the encoded response
+
+        Returns:
+            bytes: the response body
+        """
+        generation = self._generation
+        with self._lock:
+            if generation == self._generation:
+                self.collect()
+                self._generation += 1
+            if self._metrics_data is None:
+                return b"# EOF\n" if openmetrics else b""
+            return self._encoder.encode(
+                self._metrics_data, openmetrics, compress
+            )
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        """
+        Stops the scrape endpoint.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _handler_class(reader: PrometheusMetricReader):
+
+    class _ScrapeHandler(BaseHTTPRequestHandler):
+        """Answers scrapes with the reader's encoded response."""
+
+        # pylint: disable=invalid-name
+        def do_GET(self):
+            """
+            Serves the encoded metrics on the scrape paths.
+            """
+            if self.path.split("?")[0] not in METRICS_PATHS:
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in \
+                self.headers.get("Accept", "")
+            compress = "gzip" in self.headers.get("Accept-Encoding", "")
+            try:
+                body = reader.scrape(openmetrics, compress)
+            except Exception:  # pylint: disable=broad-except
+                _logger.exception("Unable to collect metrics for a scrape")
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header(
+                "Content-Type",
+                OPENMETRICS_CONTENT_TYPE if openmetrics else TEXT_CONTENT_TYPE
+            )
+            if compress:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return _ScrapeHandler
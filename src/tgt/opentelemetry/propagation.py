@@ -0,0 +1,259 @@
+import re
+from functools import lru_cache
+from logging import getLogger
+from re import split
+from typing import Optional, Tuple
+from urllib.parse import quote_plus, unquote_plus
+from opentelemetry.baggage import _BAGGAGE_KEY, _is_valid_pair, get_all
+from opentelemetry.baggage.propagation import W3CBaggagePropagator
+from opentelemetry.context import get_current, set_value
+from opentelemetry.context.context import Context
+from opentelemetry.propagators import textmap
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.trace import (
+    NonRecordingSpan,
+    SpanContext,
+    TraceFlags,
+    set_span_in_context
+)
+from opentelemetry.trace.propagation.tracecontext import (
+    TraceContextTextMapPropagator
+)
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util._importlib_metadata import entry_points
+from opentelemetry.util.re import _DELIMITER_PATTERN
+from tgt.opentelemetry.options import (
+    DEFAULT_BAGGAGE_MAX_BYTES,
+    DEFAULT_BAGGAGE_MAX_ENTRIES,
+    TgtOptions
+)
+
+_logger = getLogger(__name__)
+
+# distinct headers kept parsed by each propagator
+DEFAULT_PROPAGATION_CACHE_SIZE = 1024
+
+# the W3C limit on a single baggage list-member
+MAX_BAGGAGE_PAIR_LENGTH = 4096
+
+_TRACEPARENT_RE = re.compile(
+    # pylint: disable=protected-access
+    TraceContextTextMapPropagator._TRACEPARENT_HEADER_FORMAT
+)
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+def _parse_traceparent(
+    traceparent: str,
+    tracestate: Optional[str]
+) -> Optional[NonRecordingSpan]:
+    """
+    Parses the traceparent and tracestate headers like the W3C tracecontext
+    propagator does.
+
+    Returns:
+        NonRecordingSpan: the remote parent, or None if the headers are
+        invalid. The span is immutable, so it is safe to share between
+        requests carrying the same headers.
+    """
+    match = _TRACEPARENT_RE.search(traceparent)
+    if not match:
+        return None
+    version, trace_id, span_id, trace_flags, rest = match.groups()
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    if version == "ff" or (version == "00" and rest):
+        return None
+    return NonRecordingSpan(SpanContext(
+        trace_id=int(trace_id, 16),
+        span_id=int(span_id, 16),
+        is_remote=True,
+        trace_flags=TraceFlags(int(trace_flags, 16)),
+        trace_state=None if tracestate is None
+        else TraceState.from_header([tracestate]),
+    ))
+
+
+# pylint: disable=too-few-public-methods
+class CachingTraceContextPropagator(TraceContextTextMapPropagator):
+    """
+    A W3C tracecontext propagator that keeps recently parsed traceparent
+    and tracestate headers in an LRU cache, so requests repeating a parent,
+    like retries and fan-out from one upstream span, skip the regex match
+    and SpanContext construction.
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_PROPAGATION_CACHE_SIZE):
+        self._parse = lru_cache(maxsize=cache_size)(_parse_traceparent)
+
+    def extract(
+        self,
+        carrier: textmap.CarrierT,
+        context: Optional[Context] = None,
+        getter: textmap.Getter[textmap.CarrierT] = textmap.default_getter,
+    ) -> Context:
+        """
+        Extracts the remote parent span from the traceparent header,
+        reusing the span parsed for an identical earlier header.
+        """
+        if context is None:
+            context = Context()
+        header = getter.get(carrier, self._TRACEPARENT_HEADER_NAME)
+        if not header:
+            return context
+        tracestate = getter.get(carrier, self._TRACESTATE_HEADER_NAME)
+        span = self._parse(
+            header[0],
+            None if tracestate is None else ",".join(tracestate)
+        )
+        if span is None:
+            return context
+        return set_span_in_context(span, context)
+
+
+class CappedBaggagePropagator(W3CBaggagePropagator):
+    """
+    A W3C baggage propagator that caps the entries and bytes of baggage it
+    extracts and injects, and keeps recently parsed and formatted baggage
+    headers in LRU caches.
+
+    Entries beyond either cap are dropped from the end instead of dropping
+    the whole header, and the extracted entries are added to the context in
+    one step rather than one context copy per entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_BAGGAGE_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_BAGGAGE_MAX_BYTES,
+        cache_size: int = DEFAULT_PROPAGATION_CACHE_SIZE
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._parse = lru_cache(maxsize=cache_size)(self._parse_header)
+        self._format = lru_cache(maxsize=cache_size)(self._format_entries)
+
+    def _parse_header(self, header: str) -> Tuple[Tuple[str, str], ...]:
+        entries = []
+        # entries are joined by commas, so the first one adds no separator
+        size = -1
+        for entry in split(_DELIMITER_PATTERN, header):
+            if not entry or len(entry) > MAX_BAGGAGE_PAIR_LENGTH:
+                continue
+            name, separator, value = entry.partition("=")
+            if not separator or not _is_valid_pair(name, value):
+                _logger.warning("Invalid baggage entry: `%s`", entry)
+                continue
+            size += len(entry) + 1
+            if len(entries) == self._max_entries or size > self._max_bytes:
+                _logger.warning(
+                    "Baggage header exceeded %d entries or %d bytes, "
+                    "dropping the remaining entries",
+                    self._max_entries,
+                    self._max_bytes
+                )
+                break
+            entries.append(
+                (unquote_plus(name).strip(), unquote_plus(value).strip())
+            )
+        return tuple(entries)
+
+    def _format_entries(self, entries: Tuple[Tuple[str, object], ...]) -> str:
+        members = []
+        size = -1
+        for key, value in entries[:self._max_entries]:
+            member = quote_plus(str(key)) + "=" + quote_plus(str(value))
+            size += len(member) + 1
+            if size > self._max_bytes:
+                break
+            members.append(member)
+        return ",".join(members)
+
+    def extract(
+        self,
+        carrier: textmap.CarrierT,
+        context: Optional[Context] = None,
+        getter: textmap.Getter[textmap.CarrierT] = textmap.default_getter,
+    ) -> Context:
+        """
+        Extracts the baggage header up to the caps, merging its entries into
+        the baggage already in the context.
+        """
+        if context is None:
+            context = get_current()
+        headers = getter.get(carrier, self._BAGGAGE_HEADER_NAME)
+        header = next(iter(headers), None) if headers else None
+        if not header:
+            return context
+        if len(header) > self._max_bytes:
+            # parse oversized headers up to the caps without caching them
+            entries = self._parse_header(header)
+        else:
+            entries = self._parse(header)
+        if not entries:
+            return context
+        baggage = dict(get_all(context))
+        baggage.update(entries)
+        return set_value(_BAGGAGE_KEY, baggage, context)
+
+    def inject(
+        self,
+        carrier: textmap.CarrierT,
+        context: Optional[Context] = None,
+        setter: textmap.Setter[textmap.CarrierT] = textmap.default_setter,
+    ) -> None:
+        """
+        Injects the context's baggage up to the caps.
+        """
+        baggage_entries = get_all(context=context)
+        if not baggage_entries:
+            return
+        entries = tuple(baggage_entries.items())
+        try:
+            baggage_string = self._format(entries)
+        except TypeError:
+            # unhashable baggage values cannot be cached
+            baggage_string = self._format_entries(entries)
+        if baggage_string:
+            setter.set(carrier, self._BAGGAGE_HEADER_NAME, baggage_string)
+
+
+def create_propagator(options: TgtOptions) -> textmap.TextMapPropagator:
+    """
+    Configures and returns the propagator selected by the options.
+
+    The W3C tracecontext and baggage propagators are replaced by caching
+    versions; any other name is loaded from the installed
+    opentelemetry_propagator entry points, like OTEL_PROPAGATORS is.
+
+    Args:
+        options (TgtOptions): the Target options to configure with
+
+    Returns:
+        TextMapPropagator: a composite of the selected propagators
+    """
+    propagators = []
+    for name in options.propagators:
+        if name == "none":
+            continue
+        if name == "tracecontext":
+            propagators.append(CachingTraceContextPropagator())
+        elif name == "baggage":
+            propagators.append(CappedBaggagePropagator(
+                options.baggage_max_entries,
+                options.baggage_max_bytes
+            ))
+        else:
+            entry_point = next(iter(entry_points(
+                group="opentelemetry_propagator",
+                name=name
+            )), None)
+            if entry_point is None:
+                _logger.warning(
+                    "Propagator %s not found. It is either misspelled or "
+                    "not installed.", name
+                )
+                continue
+            propagators.append(entry_point.load()())
+    return CompositePropagator(propagators)
@@ -0,0 +1,404 @@
+import json
+import os
+import signal
+from logging import getLogger
+from threading import Event, Lock, Thread, current_thread, main_thread
+from typing import List, Optional, Sequence, Tuple
+from opentelemetry.context import Context
+from opentelemetry.sdk.metrics._internal.exceptions import (
+    MetricsTimeoutError
+)
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.trace import SpanLimits
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    ALWAYS_ON,
+    DEFAULT_OFF,
+    DEFAULT_ON,
+    ParentBasedTraceIdRatio,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased
+)
+from opentelemetry.trace import Link, SpanKind
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+_logger = getLogger(__name__)
+
+# how often the config file is checked for changes
+DEFAULT_RELOAD_POLL_SECONDS = 5.0
+
+# the signal reloading the config file immediately, where supported
+RELOAD_SIGNAL = getattr(signal, "SIGHUP", None)
+
+# the sampler names of OTEL_TRACES_SAMPLER, built from the sampler_arg ratio
+_SAMPLERS = {
+    "always_on": lambda ratio: ALWAYS_ON,
+    "always_off": lambda ratio: ALWAYS_OFF,
+    "parentbased_always_on": lambda ratio: DEFAULT_ON,
+    "parentbased_always_off": lambda ratio: DEFAULT_OFF,
+    "traceidratio": TraceIdRatioBased,
+    "parentbased_traceidratio": ParentBasedTraceIdRatio,
+}
+
+_BATCH_SETTINGS = ("schedule_delay_millis", "max_export_batch_size")
+
+
+class ReloadableSampler(Sampler):
+    """
+    A sampler delegating to a sampler that can be swapped while spans are
+    being started. The swap is a single reference assignment, so sampling
+    decisions never wait on a lock and always see one whole sampler.
+    """
+
+    def __init__(self, sampler: Sampler):
+        self._sampler = sampler
+
+    @property
+    def sampler(self) -> Sampler:
+        """The sampler currently making sampling decisions."""
+        return self._sampler
+
+    def swap(self, sampler: Sampler):
+        """
+        Makes the sampler decide for every span started from now on.
+
+        Args:
+            sampler (Sampler): the new sampler
+        """
+        self._sampler = sampler
+
+    # pylint: disable=too-many-arguments
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state: Optional[TraceState] = None,
+    ) -> SamplingResult:
+        """Returns the decision of the current sampler."""
+        return self._sampler.should_sample(
+            parent_context,
+            trace_id,
+            name,
+            kind,
+            attributes,
+            links,
+            trace_state
+        )
+
+    def get_description(self) -> str:
+        """Describes the current sampler."""
+        return f"Reloadable{{{self._sampler.get_description()}}}"
+
+
+def _limit_property(name: str) -> property:
+    return property(
+        # pylint: disable=protected-access
+        lambda self: getattr(self._limits, name),
+        doc=f"The {name} of the current span limits."
+    )
+
+
+# pylint: disable=too-few-public-methods
+class ReloadableSpanLimits(SpanLimits):
+    """
+    Span limits that can be swapped while spans are being recorded. Every
+    limit is read from one SpanLimits snapshot, replaced by a single
+    reference assignment, so spans never wait on a lock.
+
+    Spans take a copy of the attribute limits when they start, so a reload
+    applies to the spans started after it; spans already started keep the
+    limits they started with.
+    """
+    # pylint: disable=super-init-not-called
+    def __init__(self, limits: SpanLimits):
+        self._limits = limits
+
+    def swap(self, limits: SpanLimits):
+        """
+        Makes the limits apply to everything recorded from now on.
+
+        Args:
+            limits (SpanLimits): the new span limits
+        """
+        self._limits = limits
+
+    max_attributes = _limit_property("max_attributes")
+    max_events = _limit_property("max_events")
+    max_links = _limit_property("max_links")
+    max_span_attributes = _limit_property("max_span_attributes")
+    max_event_attributes = _limit_property("max_event_attributes")
+    max_link_attributes = _limit_property("max_link_attributes")
+    max_attribute_length = _limit_property("max_attribute_length")
+    max_span_attribute_length = _limit_property("max_span_attribute_length")
+
+
+class ReloadablePeriodicExportingMetricReader(PeriodicExportingMetricReader):
+    """
+    A PeriodicExportingMetricReader that reads its export interval on every
+    tick, so a reloaded interval applies from the next export on.
+    """
+
+    def _ticker(self) -> None:
+        while not self._shutdown_event.wait(
+            self._export_interval_millis / 1e3
+        ):
+            try:
+                self.collect(timeout_millis=self._export_timeout_millis)
+            except MetricsTimeoutError:
+                _logger.warning(
+                    "Metric collection timed out. Will try again after %s "
+                    "seconds",
+                    self._export_interval_millis / 1e3,
+                    exc_info=True,
+                )
+        # one last collection below before shutting down completely
+        self.collect(timeout_millis=self._export_interval_millis)
+
+
+def _create_sampler(name: str, ratio: Optional[float]) -> Sampler:
+    factory = _SAMPLERS.get(name.strip().lower())
+    if factory is None:
+        raise ValueError(f"unknown sampler {name}")
+    return factory(1.0 if ratio is None else float(ratio))
+
+
+# pylint: disable=too-many-instance-attributes
+class ConfigReloader:
+    """
+    Applies a JSON config file to the running tracer and meter providers,
+    when the file changes and whenever the process receives SIGHUP.
+
+    The file may set any of:
+
+        {
+            "sampler": "parentbased_traceidratio",
+            "sampler_arg": 0.25,
+            "span_limits": {"max_span_attributes": 64, "max_events": 32},
+            "schedule_delay_millis": 1000,
+            "max_export_batch_size": 256,
+            "export_interval_millis": 10000
+        }
+
+    Sampler names are those of OTEL_TRACES_SAMPLER and span_limits takes
+    the SpanLimits arguments. Settings missing from the file revert to the
+    values the providers were started with, so deleting a temporary
+    override, or the whole file, undoes it. Invalid files are logged and
+    leave the current settings in place.
+
+    Reloads run on the watcher thread and swap whole objects or single
+    attributes, so starting spans, recording and exporting never wait on
+    the reloader. SIGHUP is only handled when started from the main thread
+    and no other handler is installed for it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float = DEFAULT_RELOAD_POLL_SECONDS
+    ):
+        self._path = path
+        self._poll_interval = poll_interval
+        self._samplers: List[Tuple[ReloadableSampler, Sampler]] = []
+        self._span_limits: List[Tuple[ReloadableSpanLimits, SpanLimits]] = []
+        self._span_processors: List[Tuple[BatchSpanProcessor, dict]] = []
+        self._metric_readers: List[
+            Tuple[ReloadablePeriodicExportingMetricReader, float]
+        ] = []
+        self._lock = Lock()
+        self._wake = Event()
+        self._stopped = False
+        self._mtime = None
+        self._previous_handler = None
+        self._thread = None
+
+    def reloadable_sampler(self, sampler: Sampler) -> ReloadableSampler:
+        """
+        Returns a reloadable sampler starting out as, and reverting to, the
+        given sampler.
+        """
+        reloadable = ReloadableSampler(sampler)
+        self._samplers.append((reloadable, sampler))
+        return reloadable
+
+    def reloadable_span_limits(
+        self,
+        limits: SpanLimits
+    ) -> ReloadableSpanLimits:
+        """
+        Returns reloadable span limits starting out as, and reverting to,
+        the given limits.
+        """
+        reloadable = ReloadableSpanLimits(limits)
+        self._span_limits.append((reloadable, limits))
+        return reloadable
+
+    def add_span_processor(self, processor: BatchSpanProcessor):
+        """
+        Reloads the schedule delay and export batch size of the processor.
+        """
+        self._span_processors.append((
+            processor,
+            {name: getattr(processor, name) for name in _BATCH_SETTINGS}
+        ))
+
+    def add_metric_reader(
+        self,
+        reader: ReloadablePeriodicExportingMetricReader
+    ):
+        """
+        Reloads the export interval of the reader.
+        """
+        # pylint: disable=protected-access
+        self._metric_readers.append((reader, reader._export_interval_millis))
+
+    def reload(self) -> bool:
+        """
+        Reads the config file and applies it. A missing file is applied
+        as an empty config, reverting every setting.
+
+        Returns:
+            bool: whether the file was read and applied
+        """
+        with self._lock:
+            try:
+                try:
+                    with open(self._path, encoding="utf-8") as config_file:
+                        config = json.load(config_file)
+                except FileNotFoundError:
+                    config = {}
+                if not isinstance(config, dict):
+                    raise ValueError("expected a JSON object")
+                self._apply(config)
+            except (OSError, TypeError, ValueError) as error:
+                _logger.warning(
+                    "Unable to reload config from %s: %s", self._path, error
+                )
+                return False
+        _logger.info("reloaded config from %s", self._path)
+        return True
+
+    def _apply(self, config: dict):
+        # build everything before swapping anything, so an invalid setting
+        # leaves all of the current settings in place
+        sampler = None
+        if config.get("sampler"):
+            sampler = _create_sampler(
+                config["sampler"],
+                config.get("sampler_arg")
+            )
+        limits = SpanLimits(**config["span_limits"]) \
+            if config.get("span_limits") else None
+        for processor, initial in self._span_processors:
+            batch_size = config.get(
+                "max_export_batch_size",
+                initial["max_export_batch_size"]
+            )
+            if not 0 < int(batch_size) <= processor.max_queue_size:
+                raise ValueError(
+                    "max_export_batch_size must be positive and at most "
+                    f"max_queue_size {processor.max_queue_size}"
+                )
+        interval = config.get("export_interval_millis")
+        if interval is not None and float(interval) <= 0:
+            raise ValueError("export_interval_millis must be positive")
+
+        for reloadable, initial in self._samplers:
+            reloadable.swap(sampler or initial)
+        for reloadable, initial in self._span_limits:
+            reloadable.swap(limits or initial)
+        for processor, initial in self._span_processors:
+            batch_size = int(config.get(
+                "max_export_batch_size",
+                initial["max_export_batch_size"]
+            ))
+            # grow the export buffer in place before allowing larger
+            # batches; the worker thread may be filling it right now
+            missing = batch_size - len(processor.spans_list)
+            if missing > 0:
+                processor.spans_list.extend([None] * missing)
+            processor.max_export_batch_size = batch_size
+            processor.schedule_delay_millis = float(config.get(
+                "schedule_delay_millis",
+                initial["schedule_delay_millis"]
+            ))
+        for reader, initial in self._metric_readers:
+            # pylint: disable=protected-access
+            reader._export_interval_millis = float(
+                initial if interval is None else interval
+            )
+
+    def start(self):
+        """
+        Applies the config file if it exists, then starts watching it and
+        handling SIGHUP.
+        """
+        if os.path.exists(self._path):
+            self._mtime = os.stat(self._path).st_mtime_ns
+            self.reload()
+        if RELOAD_SIGNAL is not None:
+            self._handle_signal()
+        self._thread = Thread(
+            name="TgtConfigReloader",
+            target=self._watch,
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops watching the config file and restores the previous SIGHUP
+        handler.
+        """
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._previous_handler is not None:
+            signal.signal(RELOAD_SIGNAL, self._previous_handler)
+            self._previous_handler = None
+
+    def _handle_signal(self):
+        if current_thread() is not main_thread():
+            # signal handlers can only be installed from the main thread
+            _logger.warning(
+                "Unable to handle SIGHUP outside the main thread, "
+                "watching %s for changes only", self._path
+            )
+        elif signal.getsignal(RELOAD_SIGNAL) != signal.SIG_DFL:
+            # the application, or a server it runs in, handles it already
+            _logger.info(
+                "SIGHUP is already handled, watching %s for changes only",
+                self._path
+            )
+        else:
+            self._previous_handler = signal.signal(
+                RELOAD_SIGNAL, self._on_signal
+            )
+
+    def _on_signal(self, signum, frame):  # pylint: disable=unused-argument
+        # reload on the watcher thread; the interrupted main thread may be
+        # holding the lock a reload needs
+        self._wake.set()
+
+    def _watch(self):
+        while True:
+            signalled = self._wake.wait(self._poll_interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                mtime = os.stat(self._path).st_mtime_ns
+            except OSError:
+                mtime = None
+            # a deleted file changes the modification time to None, and
+            # reverts to the settings started with
+            if signalled or mtime != self._mtime:
+                self._mtime = mtime
+                self.reload()
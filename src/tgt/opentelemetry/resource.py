@@ -29,8 +29,8 @@ def create_resource(options: TgtOptions):
 
     attributes = {
         ResourceAttributes.SERVICE_NAME: options.service_name,
-        ResourceAttributes.SCOPE_NAME: "tgt-opentelemetry-python",
-        ResourceAttributes.SCOPE_VERSION: __version__,
+        ResourceAttributes.OTEL_SCOPE_NAME: "tgt-opentelemetry-python",
+        ResourceAttributes.OTEL_SCOPE_VERSION: __version__,
         ResourceAttributes.PROCESS_RUNTIME_NAME: "python",
 
         "tgt.distro.runtime_version": platform.python_version()
@@ -1,51 +1,97 @@
+from typing import Optional
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    SimpleSpanProcessor,
-    ConsoleSpanExporter
-)
+from opentelemetry.sdk.trace import SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.sdk.trace.sampling import (
     DEFAULT_OFF
 )
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
-    OTLPSpanExporter as HTTPSpanExporter
+from tgt.opentelemetry.budget import (
+    BudgetedBatchSpanProcessor,
+    BudgetedCompactBatchSpanProcessor,
+    MemoryBudget
+)
+from tgt.opentelemetry.compact import CompactBatchSpanProcessor
+from tgt.opentelemetry.debug import JsonLinesSpanExporter, json_lines_writer
+from tgt.opentelemetry.exporter import PooledHTTPSpanExporter
+from tgt.opentelemetry.normalize import (
+    NormalizingSpanProcessor,
+    SpanNormalizer
 )
 from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.reload import ConfigReloader
+from tgt.opentelemetry.usage import ResourceUsageSpanProcessor
 
 def create_tracer_provider(
     options: TgtOptions,
-    resource: Resource
+    resource: Resource,
+    reloader: Optional[ConfigReloader] = None,
+    budget: Optional[MemoryBudget] = None
 ) -> TracerProvider:
     """
     Configures and returns a new TracerProvider to send traces telemetry.
 
+    The provider does not shut itself down at exit; configure_opentelemetry
+    registers it with the exit flush. Callers using it on its own must call
+    shutdown() themselves, or spans still queued are lost at exit.
+
     Args:
         options (TgtOptions): the Target options to configure with
         resource (Resource): the resource to use with the new tracer provider
+        reloader (ConfigReloader, optional): makes the sampler, span limits
+        and batch settings reloadable while the provider runs
+        budget (MemoryBudget, optional): the memory budget queued spans
+        are reserved from
 
     Returns:
         TracerProvider: the new tracer provider
     """
+    sampler = DEFAULT_OFF
+    span_limits = SpanLimits()
+    if reloader is not None:
+        sampler = reloader.reloadable_sampler(sampler)
+        span_limits = reloader.reloadable_span_limits(span_limits)
+    # shut down by the distro's exit hook, within FLUSH_DEADLINE_MILLIS
     trace_provider = TracerProvider(
         resource=resource,
-        sampler=DEFAULT_OFF
+        sampler=sampler,
+        span_limits=span_limits,
+        shutdown_on_exit=False
     )
 
-    if options.debug:
+    if options.span_cpu_time or options.span_allocations:
+        # added first, so the usage attributes are set before export
         trace_provider.add_span_processor(
-            SimpleSpanProcessor(
-                ConsoleSpanExporter()
-            )
+            ResourceUsageSpanProcessor(allocations=options.span_allocations)
         )
-    else:
+    if options.normalize_spans:
+        # added before the batch processor, so spans are queued rewritten
         trace_provider.add_span_processor(
-            BatchSpanProcessor(
-                HTTPSpanExporter(
-                    endpoint=options.get_traces_endpoint(),
-                    headers=options.get_trace_headers()
-                )
-            )
+            NormalizingSpanProcessor(SpanNormalizer(options.span_routes))
         )
 
+    if options.debug:
+        # batched like the HTTP exporter, so spans are written off the
+        # request thread
+        span_exporter = JsonLinesSpanExporter(json_lines_writer(options))
+    else:
+        span_exporter = PooledHTTPSpanExporter(
+            endpoint=options.get_traces_endpoint(),
+            headers=options.get_trace_headers()
+        )
+    if budget is not None:
+        if options.compact_span_queue:
+            batch_span_processor = BudgetedCompactBatchSpanProcessor
+        else:
+            batch_span_processor = BudgetedBatchSpanProcessor
+        span_processor = batch_span_processor(span_exporter, budget)
+    else:
+        if options.compact_span_queue:
+            batch_span_processor = CompactBatchSpanProcessor
+        else:
+            batch_span_processor = BatchSpanProcessor
+        span_processor = batch_span_processor(span_exporter)
+    if reloader is not None:
+        reloader.add_span_processor(span_processor)
+    trace_provider.add_span_processor(span_processor)
+
     return trace_provider
@@ -0,0 +1,185 @@
+from threading import Thread
+
+from opentelemetry.sdk.metrics import Counter, Histogram, MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    InMemoryMetricReader,
+)
+from opentelemetry.sdk.metrics.view import View
+from opentelemetry.sdk.resources import Resource
+
+from tgt.opentelemetry import aggregation
+from tgt.opentelemetry.aggregation import (
+    BufferedHistogramAggregation,
+    ShardedSumAggregation,
+)
+from tgt.opentelemetry.metrics import create_meter_provider
+from tgt.opentelemetry.options import TgtOptions
+
+VALUES = [0, 3, 5, 7.5, 42, 99, 100, 101, 999, 20000]
+
+
+def _histogram_points(aggregation_, temporality, batches):
+    reader = InMemoryMetricReader(
+        preferred_temporality={Histogram: temporality}
+    )
+    views = [] if aggregation_ is None else [
+        View(instrument_name="latency", aggregation=aggregation_)
+    ]
+    provider = MeterProvider(metric_readers=[reader], views=views)
+    histogram = provider.get_meter("test").create_histogram("latency")
+    points = []
+    for batch in batches:
+        for value in batch:
+            histogram.record(value, {"route": "/"})
+        data = reader.get_metrics_data()
+        (point,) = data.resource_metrics[0].scope_metrics[0] \
+            .metrics[0].data.data_points
+        points.append(point)
+    provider.shutdown()
+    return points
+
+
+def _comparable(point):
+    return (
+        point.count,
+        float(point.sum),
+        tuple(point.bucket_counts),
+        float(point.min),
+        float(point.max),
+    )
+
+
+def test_buffered_histogram_matches_default_histogram():
+    batches = [VALUES, VALUES[:4]]
+    for temporality in (
+        AggregationTemporality.CUMULATIVE,
+        AggregationTemporality.DELTA,
+    ):
+        expected = _histogram_points(None, temporality, batches)
+        actual = _histogram_points(
+            BufferedHistogramAggregation(), temporality, batches
+        )
+        assert [_comparable(p) for p in actual] == \
+            [_comparable(p) for p in expected]
+
+
+def test_buffered_histogram_without_numpy(monkeypatch):
+    monkeypatch.setattr(aggregation, "numpy", None)
+    expected = _histogram_points(
+        None, AggregationTemporality.CUMULATIVE, [VALUES]
+    )
+    actual = _histogram_points(
+        BufferedHistogramAggregation(),
+        AggregationTemporality.CUMULATIVE,
+        [VALUES]
+    )
+    assert _comparable(actual[0]) == _comparable(expected[0])
+
+
+def test_buffered_histogram_folds_early_when_buffer_fills():
+    (point,) = _histogram_points(
+        BufferedHistogramAggregation(max_buffered=3),
+        AggregationTemporality.CUMULATIVE,
+        [VALUES]
+    )
+    assert point.count == len(VALUES)
+
+
+def test_buffered_histogram_counts_every_threaded_record():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        metric_readers=[reader],
+        views=[View(
+            instrument_name="latency",
+            aggregation=BufferedHistogramAggregation(max_buffered=500)
+        )]
+    )
+    histogram = provider.get_meter("test").create_histogram("latency")
+
+    def record():
+        for i in range(5000):
+            histogram.record(i % 300)
+
+    threads = [Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    data = reader.get_metrics_data()
+    (point,) = data.resource_metrics[0].scope_metrics[0] \
+        .metrics[0].data.data_points
+    assert point.count == 8 * 5000
+    provider.shutdown()
+
+
+def test_buffered_histograms_option_adds_view():
+    options = TgtOptions(buffered_histograms=True)
+    meter_provider = create_meter_provider(options, Resource.create({}))
+    (view,) = meter_provider._sdk_config.views
+    assert isinstance(view._aggregation, BufferedHistogramAggregation)
+
+
+def _counter_values(reader):
+    data = reader.get_metrics_data()
+    return [
+        point.value
+        for point in data.resource_metrics[0].scope_metrics[0]
+        .metrics[0].data.data_points
+    ]
+
+
+def test_sharded_counter_merges_stripes_from_many_threads():
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        metric_readers=[reader],
+        views=[View(
+            instrument_name="requests",
+            aggregation=ShardedSumAggregation()
+        )]
+    )
+    counter = provider.get_meter("test").create_counter("requests")
+
+    def add():
+        for _ in range(2000):
+            counter.add(1, {"route": "/"})
+
+    threads = [Thread(target=add) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _counter_values(reader) == [16 * 2000]
+    counter.add(5, {"route": "/"})
+    assert _counter_values(reader) == [16 * 2000 + 5]
+    provider.shutdown()
+
+
+def test_sharded_counter_supports_delta_temporality():
+    reader = InMemoryMetricReader(
+        preferred_temporality={Counter: AggregationTemporality.DELTA}
+    )
+    provider = MeterProvider(
+        metric_readers=[reader],
+        views=[View(
+            instrument_name="requests",
+            aggregation=ShardedSumAggregation()
+        )]
+    )
+    counter = provider.get_meter("test").create_counter("requests")
+    counter.add(3)
+    assert _counter_values(reader) == [3]
+    counter.add(2)
+    assert _counter_values(reader) == [2]
+    provider.shutdown()
+
+
+def test_counter_shards_option_adds_views():
+    options = TgtOptions(sharded_counters=True)
+    meter_provider = create_meter_provider(options, Resource.create({}))
+    views = meter_provider._sdk_config.views
+    assert len(views) == 2
+    assert all(
+        isinstance(view._aggregation, ShardedSumAggregation)
+        for view in views
+    )
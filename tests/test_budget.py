@@ -0,0 +1,137 @@
+import pytest
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+from tgt.opentelemetry.budget import (
+    LOGS,
+    METRICS,
+    SPAN_SIZE,
+    STREAM_SIZE,
+    TRACES,
+    BudgetedBatchSpanProcessor,
+    BudgetedCompactBatchSpanProcessor,
+    BudgetedMeterProvider,
+    MemoryBudget,
+    create_memory_budget,
+)
+from tgt.opentelemetry.options import TgtOptions
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+
+def test_lower_priorities_are_shed_first():
+    budget = MemoryBudget(1000, ["metrics", "traces", "logs"])
+    assert budget.reserve(LOGS, 700)
+    assert not budget.reserve(LOGS, 101)
+    assert budget.reserve(TRACES, 150)
+    assert not budget.reserve(TRACES, 51)
+    assert budget.reserve(METRICS, 150)
+    assert not budget.reserve(METRICS, 1)
+    assert budget.dropped == {TRACES: 1, METRICS: 1, LOGS: 1}
+    budget.release(LOGS, 700)
+    assert budget.usage() == {TRACES: 150, METRICS: 150, LOGS: 0}
+    assert budget.reserve(LOGS, 500)
+
+
+def _end_spans(processor, count):
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("test")
+    for _ in range(count):
+        with tracer.start_as_current_span("GET /items/<id>") as span:
+            span.set_attribute("http.route", "/items/<id>")
+    return provider
+
+
+def test_queued_spans_are_bounded_and_released_on_export():
+    budget = MemoryBudget(10 * SPAN_SIZE, [TRACES])
+    exporter = ListExporter()
+    processor = BudgetedBatchSpanProcessor(
+        exporter, budget, schedule_delay_millis=60_000
+    )
+    provider = _end_spans(processor, 50)
+    assert 5 < len(processor.queue) < 10
+    assert budget.dropped[TRACES] == 50 - len(processor.queue)
+    assert budget.used_bytes > 0
+    queued = len(processor.queue)
+    provider.force_flush()
+    assert len(exporter.spans) == queued
+    assert budget.used_bytes == 0
+    provider.shutdown()
+
+
+def test_spans_dropped_at_fork_release_their_reservations():
+    budget = MemoryBudget(100 * SPAN_SIZE, [TRACES])
+    processor = BudgetedBatchSpanProcessor(
+        ListExporter(), budget, schedule_delay_millis=60_000
+    )
+    provider = _end_spans(processor, 5)
+    assert budget.used_bytes > 0
+    # as the SDK does in a forked child
+    processor._at_fork_reinit()
+    budget._at_fork_reinit()
+    assert not processor.queue
+    assert budget.used_bytes == 0
+    provider.shutdown()
+
+
+def test_unknown_priority_signals_are_rejected(monkeypatch, caplog):
+    with pytest.raises(ValueError):
+        MemoryBudget(1000, ["traces", "spans"])
+    monkeypatch.setenv("MEMORY_BUDGET_PRIORITY", "Traces,spans")
+    assert TgtOptions().memory_budget_priority == [
+        "metrics", "traces", "logs"
+    ]
+    assert "MEMORY_BUDGET_PRIORITY" in caplog.text
+    monkeypatch.setenv("MEMORY_BUDGET_PRIORITY", "Traces,logs")
+    assert TgtOptions().memory_budget_priority == ["traces", "logs"]
+
+
+def test_compact_spans_reserve_less():
+    budget = MemoryBudget(10 * SPAN_SIZE, [TRACES])
+    processor = BudgetedCompactBatchSpanProcessor(
+        ListExporter(), budget, schedule_delay_millis=60_000
+    )
+    provider = _end_spans(processor, 40)
+    assert len(processor.queue) == 40
+    provider.shutdown()
+    assert budget.used_bytes == 0
+
+
+def test_metric_streams_past_the_budget_overflow():
+    budget = MemoryBudget(10 * STREAM_SIZE, [METRICS])
+    reader = InMemoryMetricReader()
+    provider = BudgetedMeterProvider(budget, metric_readers=[reader])
+    counter = provider.get_meter("test").create_counter("requests")
+    for user in range(20):
+        counter.add(1, {"user": str(user)})
+    counter.add(1, {"user": "0"})
+    (metric,) = reader.get_metrics_data() \
+        .resource_metrics[0].scope_metrics[0].metrics
+    points = {
+        point.attributes.get("user", "overflow"): point.value
+        for point in metric.data.data_points
+    }
+    assert 5 < len(points) - 1 < 10
+    assert points["0"] == 2
+    assert points["overflow"] == 20 - (len(points) - 1)
+    assert budget.dropped[METRICS] == points["overflow"]
+
+
+def test_budget_options(monkeypatch):
+    assert create_memory_budget(TgtOptions()) is None
+    monkeypatch.setenv("MEMORY_BUDGET_MB", "64")
+    monkeypatch.setenv("MEMORY_BUDGET_PRIORITY", "traces,metrics")
+    budget = create_memory_budget(TgtOptions())
+    assert budget.limit_bytes == 64 * 1024 * 1024
+    assert budget.reserve(TRACES, budget.limit_bytes)
+    assert not budget.reserve(LOGS, 1)
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+from opentelemetry.trace import Status, StatusCode
+
+from tgt.opentelemetry import compact
+from tgt.opentelemetry.compact import (
+    CompactBatchSpanProcessor,
+    CompactSpan,
+    intern_keys,
+)
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.trace import create_tracer_provider
+
+
+class _CapturingExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+
+class _CapturingProcessor(SpanProcessor):
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+def _ended_span(provider, name="compact", **attributes):
+    capture = _CapturingProcessor()
+    provider.add_span_processor(capture)
+    span = provider.get_tracer("test").start_span(name, attributes=attributes)
+    span.add_event("event", {"key": "value"})
+    span.set_status(Status(StatusCode.ERROR, "boom"))
+    span.end()
+    return capture.spans[0]
+
+
+def test_compact_span_encodes_like_readable_span():
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "test"}),
+        sampler=ALWAYS_ON
+    )
+    span = _ended_span(provider, route="/items/<id>", status_code=200)
+    compact = CompactSpan.from_span(span)
+    assert compact.attributes == dict(span.attributes)
+    assert encode_spans([compact]) == encode_spans([span])
+
+
+def test_attribute_keys_are_shared_between_spans():
+    first = intern_keys(("http.route", "http.status_code"))
+    second = intern_keys(tuple(["http.route", "http.status_code"]))
+    assert first is second
+
+
+def test_interned_key_sets_are_bounded(monkeypatch):
+    monkeypatch.setattr(compact, "MAX_INTERNED_KEY_SETS", 2)
+    monkeypatch.setattr(compact, "_interned_key_sets", OrderedDict())
+    first = intern_keys(("a",))
+    for keys in (("b",), ("a",), ("c",)):
+        intern_keys(keys)
+    assert intern_keys(("a",)) is first
+    assert list(compact._interned_key_sets) == [("c",), ("a",)]
+
+
+def test_processor_queues_compact_spans_and_exports_them():
+    exporter = _CapturingExporter()
+    processor = CompactBatchSpanProcessor(exporter)
+    provider = TracerProvider(sampler=ALWAYS_ON)
+    provider.add_span_processor(processor)
+    with provider.get_tracer("test").start_as_current_span("work") as span:
+        span.set_attribute("items", 3)
+    assert isinstance(processor.queue[0], CompactSpan)
+    processor.force_flush()
+    assert [span.name for span in exporter.spans] == ["work"]
+    assert exporter.spans[0].attributes == {"items": 3}
+    processor.shutdown()
+
+
+def test_processor_skips_unsampled_spans():
+    processor = CompactBatchSpanProcessor(_CapturingExporter())
+    provider = TracerProvider(sampler=ALWAYS_OFF)
+    provider.add_span_processor(processor)
+    provider.get_tracer("test").start_span("dropped").end()
+    assert len(processor.queue) == 0
+    processor.shutdown()
+
+
+def test_compact_span_queue_option_selects_processor():
+    options = TgtOptions(compact_span_queue=True)
+    tracer_provider = create_tracer_provider(options, Resource.create({}))
+    (batch,) = tracer_provider._active_span_processor._span_processors
+    assert isinstance(batch, CompactBatchSpanProcessor)
@@ -0,0 +1,137 @@
+import json
+
+from opentelemetry._logs import SeverityNumber
+from opentelemetry.sdk._logs import LogData, LogRecord
+from opentelemetry.sdk._logs.export import LogExportResult
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import TraceFlags
+
+from tgt.opentelemetry.debug import (
+    JsonLinesLogExporter,
+    JsonLinesMetricExporter,
+    JsonLinesSpanExporter,
+    JsonLinesWriter,
+    json_lines_writer,
+)
+from tgt.opentelemetry.options import TgtOptions
+
+
+def _finished_spans():
+    spans = []
+
+    class Collect:
+        def on_start(self, span, parent_context=None):
+            pass
+
+        def on_end(self, span):
+            spans.append(span)
+
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(Collect())
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("parent"):
+        with tracer.start_as_current_span("child") as child:
+            child.set_attribute("http.route", "/items/<id>")
+    return spans
+
+
+def test_span_exporter_writes_one_otlp_json_line_per_batch(tmp_path):
+    path = tmp_path / "debug.jsonl"
+    spans = _finished_spans()
+    JsonLinesSpanExporter(JsonLinesWriter(str(path))).export(spans)
+
+    (line,) = path.read_text().splitlines()
+    request = json.loads(line)
+    (resource_spans,) = request["resourceSpans"]
+    encoded = resource_spans["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in encoded] == ["child", "parent"]
+    child, parent = spans
+    assert encoded[0]["traceId"] == f"{child.context.trace_id:032x}"
+    assert encoded[0]["spanId"] == f"{child.context.span_id:016x}"
+    assert encoded[0]["parentSpanId"] == f"{parent.context.span_id:016x}"
+    assert encoded[0]["kind"] == 1
+
+
+def test_metric_and_log_exporters_share_the_writer(tmp_path):
+    path = tmp_path / "debug.jsonl"
+    writer = JsonLinesWriter(str(path))
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    provider.get_meter("test").create_counter("requests").add(2)
+    JsonLinesMetricExporter(writer).export(reader.get_metrics_data())
+    JsonLinesLogExporter(writer).export([
+        LogData(
+            LogRecord(
+                trace_id=0xab,
+                span_id=0xcd,
+                trace_flags=TraceFlags(TraceFlags.SAMPLED),
+                severity_number=SeverityNumber.INFO,
+                body="main;handle",
+                resource=Resource({}),
+            ),
+            InstrumentationScope("test"),
+        )
+    ])
+
+    lines = path.read_text().splitlines()
+    metrics, logs = [json.loads(line) for line in lines]
+    metric = metrics["resourceMetrics"][0]["scopeMetrics"][0]["metrics"][0]
+    assert metric["name"] == "requests"
+    assert metric["sum"]["dataPoints"][0]["asInt"] == "2"
+    record = logs["resourceLogs"][0]["scopeLogs"][0]["logRecords"][0]
+    assert record["traceId"] == f"{0xab:032x}"
+    assert record["body"] == {"stringValue": "main;handle"}
+
+
+def test_writer_rotates_by_size(tmp_path):
+    path = tmp_path / "debug.jsonl"
+    writer = JsonLinesWriter(str(path), max_bytes=10, backup_count=2)
+    for line in ("first", "second", "third", "fourth"):
+        writer.write([line])
+    writer.close()
+    assert path.read_text() == "fourth\n"
+    assert (tmp_path / "debug.jsonl.1").read_text() == "third\n"
+    assert (tmp_path / "debug.jsonl.2").read_text() == "second\n"
+    assert not (tmp_path / "debug.jsonl.3").exists()
+
+
+def test_writer_keeps_writing_when_rotation_fails(tmp_path, monkeypatch):
+    path = tmp_path / "debug.jsonl"
+    writer = JsonLinesWriter(str(path), max_bytes=10, backup_count=1)
+    writer.write(["first"])
+
+    def fail(*args):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr("tgt.opentelemetry.debug.os.replace", fail)
+    writer.write(["second"])
+    monkeypatch.undo()
+    writer.write(["third"])
+    writer.close()
+    assert (tmp_path / "debug.jsonl.1").read_text() == "first\nsecond\n"
+    assert path.read_text() == "third\n"
+
+
+def test_exporters_report_write_failures(tmp_path):
+    writer = JsonLinesWriter(str(tmp_path / "missing" / "debug.jsonl"))
+    assert (
+        JsonLinesSpanExporter(writer).export(_finished_spans())
+        == SpanExportResult.FAILURE
+    )
+    assert (
+        JsonLinesLogExporter(writer).export([]) == LogExportResult.FAILURE
+    )
+
+
+def test_writer_defaults_to_stdout_and_is_shared(monkeypatch, capsys):
+    monkeypatch.delenv("DEBUG_FILE", raising=False)
+    writer = json_lines_writer(TgtOptions(debug=True))
+    assert json_lines_writer(TgtOptions(debug=True)) is writer
+    writer.write(["{}", "{}"])
+    assert capsys.readouterr().out == "{}\n{}\n"
@@ -0,0 +1,207 @@
+from types import SimpleNamespace
+
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+    OTLPMetricExporter as HTTPMetricExporter,
+)
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    InMemoryMetricReader,
+    MetricExportResult,
+    MetricsData,
+    ResourceMetrics,
+    ScopeMetrics,
+)
+from opentelemetry.sdk.metrics.view import View
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+
+from tgt.opentelemetry.aggregation import (
+    DEFAULT_SUM_EXEMPLARS,
+    BufferedHistogramAggregation,
+    ExemplarHistogramAggregation,
+    ExemplarSumAggregation,
+    ShardedSumAggregation,
+)
+from tgt.opentelemetry.exemplars import (
+    ExemplarHTTPMetricExporter,
+    encode_metrics_with_exemplars,
+)
+from tgt.opentelemetry.metrics import create_meter_provider
+from tgt.opentelemetry.options import TgtOptions
+
+
+def _provider(aggregation):
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        metric_readers=[reader],
+        views=[View(instrument_name="*", aggregation=aggregation)],
+        shutdown_on_exit=False,
+    )
+    return provider, reader
+
+
+def _point(reader):
+    data = reader.get_metrics_data()
+    (point,) = data.resource_metrics[0].scope_metrics[0] \
+        .metrics[0].data.data_points
+    return data, point
+
+
+def test_histogram_keeps_latest_sampled_measurement_per_bucket():
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("test")
+    for aggregation in (
+        ExemplarHistogramAggregation(),
+        BufferedHistogramAggregation(exemplars=True),
+    ):
+        provider, reader = _provider(aggregation)
+        histogram = provider.get_meter("test").create_histogram("latency")
+        histogram.record(3)
+        with tracer.start_as_current_span("first"):
+            histogram.record(7)
+        with tracer.start_as_current_span("second") as span:
+            histogram.record(8)
+            histogram.record(400)
+        _, point = _point(reader)
+        context = span.get_span_context()
+        assert point.count == 4
+        assert [exemplar.value for exemplar in point.exemplars] == [8, 400]
+        assert all(
+            exemplar.trace_id == context.trace_id
+            and exemplar.span_id == context.span_id
+            for exemplar in point.exemplars
+        )
+        histogram.record(9)
+        _, point = _point(reader)
+        assert point.exemplars == ()
+        provider.shutdown()
+
+
+def test_unsampled_spans_do_not_produce_exemplars():
+    tracer = TracerProvider(sampler=ALWAYS_OFF).get_tracer("test")
+    provider, reader = _provider(ExemplarHistogramAggregation())
+    histogram = provider.get_meter("test").create_histogram("latency")
+    with tracer.start_as_current_span("unsampled"):
+        histogram.record(7)
+    _, point = _point(reader)
+    assert point.exemplars == ()
+    provider.shutdown()
+
+
+def test_sum_reservoir_is_fixed_size():
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("test")
+    for aggregation in (
+        ExemplarSumAggregation(),
+        ShardedSumAggregation(exemplars=True),
+    ):
+        provider, reader = _provider(aggregation)
+        counter = provider.get_meter("test").create_counter("requests")
+        for _ in range(100):
+            with tracer.start_as_current_span("request"):
+                counter.add(1)
+        _, point = _point(reader)
+        assert point.value == 100
+        assert len(point.exemplars) == DEFAULT_SUM_EXEMPLARS
+        provider.shutdown()
+
+
+def test_exemplars_are_encoded_for_otlp():
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("test")
+    provider, reader = _provider(ExemplarHistogramAggregation())
+    histogram = provider.get_meter("test").create_histogram("latency")
+    with tracer.start_as_current_span("request") as span:
+        histogram.record(7.5)
+    data, _ = _point(reader)
+    provider.shutdown()
+
+    request = encode_metrics_with_exemplars(data)
+    (encoded_point,) = request.resource_metrics[0].scope_metrics[0] \
+        .metrics[0].histogram.data_points
+    (exemplar,) = encoded_point.exemplars
+    context = span.get_span_context()
+    assert exemplar.as_double == 7.5
+    assert exemplar.trace_id == context.trace_id.to_bytes(16, "big")
+    assert exemplar.span_id == context.span_id.to_bytes(8, "big")
+
+
+def test_exemplars_are_encoded_on_the_points_they_belong_to():
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("test")
+    provider, reader = _provider(ExemplarHistogramAggregation())
+    meter = provider.get_meter("test")
+    meter.create_counter("requests").add(1)
+    histogram = meter.create_histogram("latency")
+    with tracer.start_as_current_span("request"):
+        histogram.record(1.5, {"route": "/a"})
+        histogram.record(2.5, {"route": "/b"})
+    data = reader.get_metrics_data()
+    provider.shutdown()
+    (resource_metrics,) = data.resource_metrics
+    (scope_metrics,) = resource_metrics.scope_metrics
+    requests, latency = scope_metrics.metrics
+    # the encoder merges resource metrics sharing a resource
+    data = MetricsData(resource_metrics=[
+        ResourceMetrics(
+            resource=resource_metrics.resource,
+            scope_metrics=[ScopeMetrics(
+                scope=scope_metrics.scope,
+                metrics=[requests],
+                schema_url="",
+            )],
+            schema_url="",
+        ),
+        ResourceMetrics(
+            resource=resource_metrics.resource,
+            scope_metrics=[ScopeMetrics(
+                scope=scope_metrics.scope,
+                metrics=[latency],
+                schema_url="",
+            )],
+            schema_url="",
+        ),
+    ])
+
+    request = encode_metrics_with_exemplars(data)
+    (encoded_resource,) = request.resource_metrics
+    exemplars = {
+        point.attributes[0].value.string_value: [
+            exemplar.as_double for exemplar in point.exemplars
+        ]
+        for scope in encoded_resource.scope_metrics
+        for metric in scope.metrics
+        if metric.name == "latency"
+        for point in metric.histogram.data_points
+    }
+    assert exemplars == {"/a": [1.5], "/b": [2.5]}
+
+
+def test_exporter_posts_exemplars_through_the_stock_exporter(monkeypatch):
+    posted = []
+
+    def _export(self, serialized_data):
+        posted.append(serialized_data)
+        return SimpleNamespace(status_code=200)
+
+    monkeypatch.setattr(HTTPMetricExporter, "_export", _export)
+    tracer = TracerProvider(sampler=ALWAYS_ON).get_tracer("test")
+    provider, reader = _provider(ExemplarHistogramAggregation())
+    histogram = provider.get_meter("test").create_histogram("latency")
+    with tracer.start_as_current_span("request"):
+        histogram.record(7.5)
+    data, _ = _point(reader)
+    provider.shutdown()
+
+    exporter = ExemplarHTTPMetricExporter()
+    assert exporter.export(data) == MetricExportResult.SUCCESS
+    (request,) = posted
+    assert request == encode_metrics_with_exemplars(data).SerializeToString()
+
+
+def test_create_meter_provider_with_exemplars():
+    options = TgtOptions()
+    meter_provider = create_meter_provider(
+        options, Resource.create({}), exemplars=True
+    )
+    (reader,) = meter_provider._sdk_config.metric_readers
+    assert isinstance(reader._exporter, ExemplarHTTPMetricExporter)
+    assert len(meter_provider._sdk_config.views) == 3
+    meter_provider.shutdown()
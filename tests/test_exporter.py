@@ -0,0 +1,114 @@
+import gzip
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import (
+    encode_spans,
+)
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.trace import SpanContext, TraceFlags
+
+from tgt.opentelemetry.exporter import (
+    BufferPool,
+    ExportBuffer,
+    PooledHTTPSpanExporter,
+    compress_into,
+)
+
+
+def _spans(count):
+    resource = Resource.create({"service.name": "test"})
+    return [
+        ReadableSpan(
+            name="span-" + str(i),
+            context=SpanContext(
+                trace_id=i + 1,
+                span_id=i + 1,
+                is_remote=False,
+                trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            ),
+            resource=resource,
+            attributes={"http.route": "/items/<id>", "index": i},
+            start_time=1,
+            end_time=2,
+        )
+        for i in range(count)
+    ]
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    bodies = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.bodies.append((self.headers.get("Content-Encoding"), body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    _Receiver.bodies = []
+    server = HTTPServer(("127.0.0.1", 0), _Receiver)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_export_buffer_grows_and_keeps_contents():
+    buffer = ExportBuffer(4)
+    buffer.write(b"abc")
+    buffer.write(b"defgh")
+    assert bytes(buffer.view()) == b"abcdefgh"
+    assert buffer.capacity >= 8
+    buffer.reset()
+    assert len(buffer) == 0
+    assert buffer.capacity >= 8
+
+
+def test_buffer_pool_reuses_released_buffers():
+    pool = BufferPool(buffer_size=16, max_buffers=1)
+    first = pool.acquire()
+    first.write(b"payload")
+    pool.release(first)
+    second = pool.acquire()
+    assert second is first
+    assert len(second) == 0
+
+
+def test_compress_into_round_trips():
+    data = b"0123456789" * 20000
+    buffer = ExportBuffer(16)
+    compress_into(buffer, data, Compression.Gzip)
+    assert gzip.decompress(bytes(buffer.view())) == data
+    buffer.reset()
+    compress_into(buffer, data, Compression.Deflate)
+    assert zlib.decompress(bytes(buffer.view())) == data
+
+
+def test_pooled_exporter_posts_compressed_batches():
+    server = _serve()
+    spans = _spans(64)
+    try:
+        for compression in (Compression.Gzip, Compression.Deflate):
+            exporter = PooledHTTPSpanExporter(
+                endpoint="http://127.0.0.1:%d/v1/traces" % server.server_port,
+                compression=compression,
+            )
+            assert exporter.export(spans) == SpanExportResult.SUCCESS
+            exporter.shutdown()
+    finally:
+        server.shutdown()
+
+    expected = encode_spans(spans).SerializeToString()
+    (gzip_encoding, gzip_body), (deflate_encoding, deflate_body) = \
+        _Receiver.bodies
+    assert gzip_encoding == "gzip"
+    assert gzip.decompress(gzip_body) == expected
+    assert deflate_encoding == "deflate"
+    assert zlib.decompress(deflate_body) == expected
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+from tgt.opentelemetry.flush import TelemetryFlusher
+from tgt.opentelemetry.options import (
+    DEFAULT_FLUSH_DEADLINE_MILLIS,
+    FLUSH_MODE_BATCH,
+    FLUSH_MODE_INVOCATION,
+    TgtOptions,
+)
+
+
+class SlowExporter(SpanExporter):
+    def __init__(self, delay):
+        self.delay = delay
+        self.exports = 0
+        self.released = threading.Event()
+
+    def export(self, spans):
+        self.exports += 1
+        self.released.wait(self.delay)
+        return SpanExportResult.SUCCESS
+
+
+def _providers(exporter):
+    tracer_provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    tracer_provider.add_span_processor(
+        BatchSpanProcessor(exporter, schedule_delay_millis=60_000)
+    )
+    reader = InMemoryMetricReader()
+    meter_provider = MeterProvider(
+        metric_readers=[reader],
+        shutdown_on_exit=False
+    )
+    return tracer_provider, meter_provider
+
+
+def _end_span(tracer_provider):
+    with tracer_provider.get_tracer("test").start_as_current_span("job"):
+        pass
+
+
+def test_flush_exports_within_the_deadline():
+    exporter = SlowExporter(0.0)
+    tracer_provider, meter_provider = _providers(exporter)
+    flusher = TelemetryFlusher(
+        tracer_provider, meter_provider, deadline_millis=5000
+    )
+    _end_span(tracer_provider)
+    assert flusher.flush(flusher.deadline_millis)
+    assert exporter.exports == 1
+    assert flusher.shutdown(flusher.deadline_millis)
+
+
+def test_stalled_flush_returns_at_the_deadline():
+    exporter = SlowExporter(30.0)
+    tracer_provider, meter_provider = _providers(exporter)
+    flusher = TelemetryFlusher(tracer_provider, meter_provider)
+    _end_span(tracer_provider)
+    start = time.monotonic()
+    assert not flusher.shutdown(200)
+    assert time.monotonic() - start < 1.0
+    exporter.released.set()
+
+
+def test_invocation_flushes_only_what_is_due():
+    exporter = SlowExporter(0.0)
+    tracer_provider, meter_provider = _providers(exporter)
+    flusher = TelemetryFlusher(
+        tracer_provider,
+        meter_provider,
+        metrics_interval_millis=60_000
+    )
+    assert flusher.flush_invocation(1000)
+    assert exporter.exports == 0
+    _end_span(tracer_provider)
+    assert flusher.flush_invocation(1000)
+    assert exporter.exports == 1
+    flusher.shutdown(1000)
+
+
+def test_flush_options(monkeypatch):
+    options = TgtOptions()
+    assert options.flush_mode == FLUSH_MODE_BATCH
+    assert options.flush_deadline_millis == DEFAULT_FLUSH_DEADLINE_MILLIS
+    monkeypatch.setenv("FLUSH_MODE", "Invocation")
+    monkeypatch.setenv("FLUSH_DEADLINE_MILLIS", "250")
+    options = TgtOptions()
+    assert options.flush_mode == FLUSH_MODE_INVOCATION
+    assert options.flush_deadline_millis == 250
+    monkeypatch.setenv("FLUSH_MODE", "never")
+    assert TgtOptions().flush_mode == FLUSH_MODE_BATCH
+
+
+def test_invalid_metric_export_interval_falls_back(monkeypatch):
+    monkeypatch.setenv("OTEL_METRIC_EXPORT_INTERVAL", "abc")
+    tracer_provider, meter_provider = _providers(SlowExporter(0.0))
+    flusher = TelemetryFlusher(tracer_provider, meter_provider)
+    assert flusher._metrics_interval == 60.0
+    flusher.shutdown(1000)
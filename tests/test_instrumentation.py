@@ -0,0 +1,75 @@
+from tgt.opentelemetry import instrumentation
+from tgt.opentelemetry.distro import TargetDistro
+from tgt.opentelemetry.instrumentation import (
+    instrumentation_enabled,
+    instrumentation_report,
+    load_instrumentor,
+)
+from tgt.opentelemetry.options import TgtOptions
+
+
+class FakeInstrumentor:
+    instrumented = []
+
+    def instrument(self, **kwargs):
+        self.instrumented.append(kwargs)
+
+
+class FakeEntryPoint:
+    def __init__(self, name):
+        self.name = name
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        return FakeInstrumentor
+
+
+def test_instrumentation_enabled_without_lists():
+    options = TgtOptions()
+    assert options.instrumentations_enabled is None
+    assert options.instrumentations_disabled == []
+    assert instrumentation_enabled("sqlite3", options)
+
+
+def test_instrumentation_lists_from_environment(monkeypatch):
+    monkeypatch.setenv("INSTRUMENTATIONS_ENABLED", "flask, requests,sqlite3")
+    monkeypatch.setenv("INSTRUMENTATIONS_DISABLED", "sqlite3")
+    options = TgtOptions()
+    assert options.instrumentations_enabled == [
+        "flask", "requests", "sqlite3"
+    ]
+    assert instrumentation_enabled("flask", options)
+    assert not instrumentation_enabled("urllib", options)
+    # the deny list wins over the allow list
+    assert not instrumentation_enabled("sqlite3", options)
+
+
+def test_disabled_instrumentor_is_not_imported(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_report", [])
+    options = TgtOptions(instrumentations_disabled=["logging"])
+    denied = FakeEntryPoint("logging")
+    allowed = FakeEntryPoint("flask")
+    load_instrumentor(denied, options, skip_dep_check=True)
+    load_instrumentor(allowed, options, skip_dep_check=True)
+    assert not denied.loaded
+    assert allowed.loaded
+    assert FakeInstrumentor.instrumented[-1] == {"skip_dep_check": True}
+
+    report = {timing.name: timing for timing in instrumentation_report()}
+    assert report["logging"].skipped == "disabled by options"
+    assert report["logging"].total_seconds == 0
+    assert report["flask"].skipped is None
+    assert report["flask"].total_seconds > 0
+
+
+def test_distro_applies_options_to_instrumentors(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_report", [])
+    monkeypatch.setenv("INSTRUMENTATIONS_ENABLED", "flask")
+    distro = TargetDistro()
+    distro._options = None
+    flask, urllib = FakeEntryPoint("flask"), FakeEntryPoint("urllib")
+    distro.load_instrumentor(flask)
+    distro.load_instrumentor(urllib)
+    assert flask.loaded
+    assert not urllib.loaded
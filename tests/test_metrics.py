@@ -1,5 +1,6 @@
 from opentelemetry.sdk.metrics import MeterProvider
 
+from tgt.opentelemetry.debug import JsonLinesMetricExporter
 from tgt.opentelemetry.options import TgtOptions
 from tgt.opentelemetry.resource import create_resource
 from tgt.opentelemetry.metrics import create_meter_provider
@@ -13,9 +14,10 @@ def test_returns_meter_provider():
     assert len(meter_provider._sdk_config.metric_readers) == 1
 
 
-def test_setting_debug_adds_console_exporter():
+def test_setting_debug_adds_json_lines_exporter():
     options = TgtOptions(debug=True)
     resource = create_resource(options)
     meter_provider = create_meter_provider(options, resource)
     assert isinstance(meter_provider, MeterProvider)
-    assert len(meter_provider._sdk_config.metric_readers) == 1
+    (reader,) = meter_provider._sdk_config.metric_readers
+    assert isinstance(reader._exporter, JsonLinesMetricExporter)
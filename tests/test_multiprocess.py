@@ -0,0 +1,157 @@
+import math
+import os
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    PeriodicExportingMetricReader,
+)
+from opentelemetry.sdk.resources import Resource
+
+from tgt.opentelemetry.metrics import create_meter_provider
+from tgt.opentelemetry.multiprocess import (
+    MultiprocessMetricExporter,
+    SharedMetricFile,
+)
+from tgt.opentelemetry.options import TgtOptions
+
+WORKERS = 4
+ADDS_PER_WORKER = 250
+
+
+class _CapturingExporter(MetricExporter):
+    def __init__(self):
+        super().__init__()
+        self.exported = []
+
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        self.exported.append(metrics_data)
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis=10_000):
+        return True
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+def _provider(directory, exporter):
+    reader = PeriodicExportingMetricReader(
+        MultiprocessMetricExporter(exporter, directory),
+        export_interval_millis=math.inf,
+    )
+    provider = MeterProvider(
+        metric_readers=[reader],
+        resource=Resource.create({"service.name": "workers"}),
+        shutdown_on_exit=False,
+    )
+    return provider, reader
+
+
+def _record(provider, adds):
+    meter = provider.get_meter("test")
+    counter = meter.create_counter("requests")
+    histogram = meter.create_histogram("latency")
+    for i in range(adds):
+        counter.add(1, {"route": "/"})
+        histogram.record(i % 10, {"route": "/"})
+
+
+def _points(metrics_data):
+    (resource_metrics,) = metrics_data.resource_metrics
+    (scope_metrics,) = resource_metrics.scope_metrics
+    return {
+        metric.name: metric.data.data_points[0]
+        for metric in scope_metrics.metrics
+    }
+
+
+def test_shared_metric_file_round_trips_and_grows(tmp_path):
+    path = str(tmp_path / "metrics-1.db")
+    shared = SharedMetricFile(path, size=64)
+    shared.write(b"first", [1.0, 2.0])
+    for i in range(20):
+        shared.write(b"key-%d" % i, [float(i)])
+    shared.write(b"first", [3.0, 4.0])
+    entries = dict(SharedMetricFile.read(path))
+    shared.close()
+    assert entries[b"first"] == (3.0, 4.0)
+    assert entries[b"key-19"] == (19.0,)
+    assert len(entries) == 21
+
+
+def test_shared_metric_file_skips_entries_being_overwritten(tmp_path):
+    path = str(tmp_path / "metrics-1.db")
+    shared = SharedMetricFile(path)
+    shared.write(b"first", [1.0])
+    shared.write(b"second", [2.0])
+    # an odd sequence marks the first entry as being overwritten
+    shared._map[16:24] = (1).to_bytes(8, "little")
+    entries = dict(SharedMetricFile.read(path))
+    shared._map[16:24] = (2).to_bytes(8, "little")
+    shared.write(b"first", [3.0])
+    assert entries == {b"second": (2.0,)}
+    assert dict(SharedMetricFile.read(path)) == {
+        b"first": (3.0,),
+        b"second": (2.0,),
+    }
+    shared.close()
+
+
+def test_only_the_leader_exports(tmp_path):
+    leader_exporter = _CapturingExporter()
+    follower_exporter = _CapturingExporter()
+    leader = MultiprocessMetricExporter(leader_exporter, str(tmp_path))
+    follower = MultiprocessMetricExporter(follower_exporter, str(tmp_path))
+    assert leader.is_leader()
+    assert not follower.is_leader()
+    leader.shutdown()
+    assert follower.is_leader()
+    follower.shutdown()
+
+
+def test_forked_workers_export_merged_totals(tmp_path):
+    directory = str(tmp_path)
+    pids = []
+    for _ in range(WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                provider, reader = _provider(directory, _CapturingExporter())
+                _record(provider, ADDS_PER_WORKER)
+                reader.collect()
+                provider.shutdown()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+
+    exporter = _CapturingExporter()
+    provider, reader = _provider(directory, exporter)
+    _record(provider, ADDS_PER_WORKER)
+    reader.collect()
+    provider.shutdown()
+
+    points = _points(exporter.exported[-1])
+    processes = WORKERS + 1
+    assert points["requests"].value == processes * ADDS_PER_WORKER
+    assert points["latency"].count == processes * ADDS_PER_WORKER
+    assert points["latency"].sum == processes * ADDS_PER_WORKER * 4.5
+    assert points["latency"].min == 0
+    assert points["latency"].max == 9
+    assert sum(points["latency"].bucket_counts) == \
+        processes * ADDS_PER_WORKER
+    assert len(os.listdir(directory)) == processes + 1
+
+
+def test_multiprocess_dir_option_wraps_exporter(monkeypatch, tmp_path):
+    monkeypatch.setenv("METRICS_MULTIPROCESS_DIR", str(tmp_path))
+    options = TgtOptions()
+    assert options.metrics_multiprocess_dir == str(tmp_path)
+    meter_provider = create_meter_provider(options, Resource.create({}))
+    (reader,) = meter_provider._sdk_config.metric_readers
+    assert isinstance(reader._exporter, MultiprocessMetricExporter)
+    meter_provider.shutdown()
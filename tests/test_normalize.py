@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+from tgt.opentelemetry import normalize
+from tgt.opentelemetry.normalize import (
+    NormalizingSpanProcessor,
+    SpanNormalizer,
+)
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.trace import create_tracer_provider
+
+ROUTES = [
+    "/items/<int:item_id>",
+    "/users/<user_id>/orders",
+    "/files/<path:name>",
+]
+
+
+def test_paths_are_rewritten_to_their_route():
+    normalizer = SpanNormalizer(ROUTES)
+    assert normalizer.normalize("GET /items/42?ref=home") == \
+        "GET /items/<int:item_id>"
+    assert normalizer.normalize("https://api:8080/users/ann/orders#top") == \
+        "https://api:8080/users/<user_id>/orders"
+    assert normalizer.normalize("/files/a/b.txt") == "/files/<path:name>"
+    assert normalizer.normalize("/items/abc") == "/items/abc"
+
+
+def test_ids_matching_no_route_are_replaced():
+    normalizer = SpanNormalizer()
+    assert normalizer.normalize("/users/ann/orders/9") == \
+        "/users/ann/orders/<id>"
+    assert normalizer.normalize(
+        "/blobs/0af7651916cd43dd8448eb211c80319c/meta?v=2"
+    ) == "/blobs/<id>/meta"
+    assert normalizer.normalize(
+        "DELETE /jobs/123e4567-e89b-12d3-a456-426614174000"
+    ) == "DELETE /jobs/<id>"
+    assert normalizer.normalize("SELECT") == "SELECT"
+
+
+def test_ended_spans_are_rewritten_and_interned():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(
+        NormalizingSpanProcessor(SpanNormalizer(ROUTES))
+    )
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    for item in (1, 2):
+        with tracer.start_as_current_span(f"GET /items/{item}") as span:
+            span.set_attributes({
+                "http.method": "".join(["G", "E", "T"]),
+                "http.target": f"/items/{item}?ref=home",
+                "http.status_code": 200,
+            })
+    first, second = exporter.get_finished_spans()
+    assert first.name == "GET /items/<int:item_id>"
+    assert dict(first.attributes) == {
+        "http.method": "GET",
+        "http.target": "/items/<int:item_id>",
+        "http.status_code": 200,
+    }
+    assert first.name is second.name
+    assert first.attributes["http.target"] is second.attributes["http.target"]
+
+
+def test_spans_without_http_attributes_keep_their_name():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(
+        NormalizingSpanProcessor(SpanNormalizer(ROUTES))
+    )
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("GET /cache?key") as span:
+        span.set_attribute("url.scheme", "".join(["r", "e", "d", "i", "s"]))
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "GET /cache?key"
+    assert dict(span.attributes) == {"url.scheme": "redis"}
+
+
+def test_enabled_through_options(monkeypatch):
+    assert not TgtOptions().normalize_spans
+    monkeypatch.setenv("SPAN_ROUTES", "/items/<int:item_id>, /users/<id>")
+    options = TgtOptions()
+    assert options.normalize_spans
+    assert options.span_routes == ["/items/<int:item_id>", "/users/<id>"]
+    provider = create_tracer_provider(options, Resource({}))
+    normalizing, _ = provider._active_span_processor._span_processors
+    assert isinstance(normalizing, NormalizingSpanProcessor)
+    provider.shutdown()
+
+
+def test_interned_values_are_bounded(monkeypatch):
+    monkeypatch.setattr(normalize, "MAX_INTERNED_VALUES", 2)
+    monkeypatch.setattr(normalize, "_interned_values", OrderedDict())
+    normalizer = SpanNormalizer(ROUTES)
+    first = normalizer.normalize("/items/1")
+    for path in ("/users/1/carts", "/items/2", "/users/1/wishes"):
+        normalizer.normalize(path)
+    assert normalizer.normalize("/items/3") is first
+    assert list(normalize._interned_values) == [
+        "/users/<id>/wishes",
+        "/items/<int:item_id>",
+    ]
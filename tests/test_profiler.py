@@ -0,0 +1,257 @@
+import threading
+import time
+
+import pytest
+from opentelemetry.sdk._logs.export import InMemoryLogExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+from tgt.opentelemetry import profiler as profiler_module
+from tgt.opentelemetry.budget import LOGS, MemoryBudget
+from tgt.opentelemetry.options import (
+    DEFAULT_PROFILING_EXPORT_INTERVAL,
+    DEFAULT_PROFILING_FREQUENCY,
+    TgtOptions,
+)
+from tgt.opentelemetry.profiler import (
+    FoldedStackFileExporter,
+    LogProfileExporter,
+    ProfileExporter,
+    SamplingProfiler,
+    create_profiler,
+)
+
+
+class ListExporter(ProfileExporter):
+    def __init__(self):
+        self.profiles = []
+
+    def export(self, profile):
+        self.profiles.append(profile)
+
+
+def wait_in_span(tracer, started, release):
+    with tracer.start_as_current_span("request"):
+        started.set()
+        release.wait()
+
+
+def _sample(profiler):
+    # the profiler skips the thread sampling, so sample from another one
+    sampler = threading.Thread(target=profiler.sample)
+    sampler.start()
+    sampler.join()
+
+
+def _profiler_with_span_thread(**kwargs):
+    profiler = SamplingProfiler(ListExporter(), **kwargs)
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(profiler.span_tracker)
+    tracer = provider.get_tracer("test")
+    started, release = threading.Event(), threading.Event()
+    thread = threading.Thread(
+        target=wait_in_span, args=(tracer, started, release)
+    )
+    thread.start()
+    started.wait()
+    return profiler, thread, release
+
+
+def test_samples_are_tagged_with_the_active_span():
+    profiler, thread, release = _profiler_with_span_thread()
+    try:
+        span = profiler.span_tracker.active(thread.ident)
+        _sample(profiler)
+        _sample(profiler)
+    finally:
+        release.set()
+        thread.join()
+
+    profile = profiler.collect()
+    in_span = [
+        (key, count) for key, count in profile.stacks.items()
+        if key[:2] == (span.trace_id, span.span_id)
+    ]
+    assert len(in_span) == 1
+    (_, _, stack), count = in_span[0]
+    assert count == 2
+    assert "wait_in_span (test_profiler.py:" in stack
+    assert stack.index("wait_in_span") < stack.index("Event.wait")
+    # the test thread was sampled outside any span
+    assert any(key[:2] == (0, 0) for key in profile.stacks)
+    assert profiler.span_tracker.active(thread.ident) is None
+    assert not profiler.collect().stacks
+
+
+def test_stack_table_is_bounded():
+    profiler, thread, release = _profiler_with_span_thread(max_stacks=1)
+    try:
+        threads = threading.active_count()
+        _sample(profiler)
+    finally:
+        release.set()
+        thread.join()
+    profile = profiler.collect()
+    assert len(profile.stacks) == 1
+    # every thread but the sampling one, less the one stack kept
+    assert profile.dropped == threads - 1
+
+
+def test_samples_are_not_lost_to_concurrent_exports():
+    profiler, thread, release = _profiler_with_span_thread()
+    profiles = []
+    try:
+        threads = threading.active_count()
+        sampler = threading.Thread(
+            target=lambda: [profiler.sample() for _ in range(300)]
+        )
+        sampler.start()
+        while sampler.is_alive():
+            profiles.append(profiler.collect())
+        sampler.join()
+        profiles.append(profiler.collect())
+    finally:
+        release.set()
+        thread.join()
+    assert sum(
+        sum(profile.stacks.values()) + profile.dropped
+        for profile in profiles
+    ) == 300 * threads
+
+
+def test_frame_names_are_bounded(monkeypatch):
+    monkeypatch.setattr(profiler_module, "MAX_FRAME_NAMES", 2)
+    profiler, thread, release = _profiler_with_span_thread()
+    try:
+        _sample(profiler)
+    finally:
+        release.set()
+        thread.join()
+    profile = profiler.collect()
+    assert any(stack.count(";") >= 2 for _, _, stack in profile.stacks)
+    assert len(profiler._names) == 2
+
+
+def test_stacks_are_reserved_from_the_budget():
+    budget = MemoryBudget(1024 * 1024, [LOGS])
+    profiler, thread, release = _profiler_with_span_thread(budget=budget)
+    try:
+        _sample(profiler)
+        assert budget.usage()[LOGS] > 0
+        profiler.collect()
+        assert budget.usage()[LOGS] == 0
+        # no room left for a single stack
+        budget.reserve(LOGS, budget.limit_bytes - 100)
+        _sample(profiler)
+    finally:
+        release.set()
+        thread.join()
+    profile = profiler.collect()
+    assert not profile.stacks
+    assert profile.dropped > 0
+
+
+def test_folded_stack_file_exporter(tmp_path):
+    path = tmp_path / "profile.folded"
+    exporter = FoldedStackFileExporter(str(path))
+    profiler = SamplingProfiler(exporter)
+    profile = profiler.collect()
+    profile.stacks = {(0xab, 0xcd, "main;handle"): 3, (0, 0, "main;idle"): 5}
+    exporter.export(profile)
+    assert path.read_text().splitlines() == [
+        f"trace:{0xab:032x};span:{0xcd:016x};main;handle 3",
+        "main;idle 5",
+    ]
+
+
+def test_log_exporter_links_stacks_to_traces():
+    log_exporter = InMemoryLogExporter()
+    exporter = LogProfileExporter(log_exporter, Resource({"a": "b"}))
+    profile = SamplingProfiler(exporter).collect()
+    profile.stacks = {(0xab, 0xcd, "main;handle"): 3}
+    exporter.export(profile)
+    (log,) = log_exporter.get_finished_logs()
+    assert log.log_record.trace_id == 0xab
+    assert log.log_record.span_id == 0xcd
+    assert log.log_record.trace_flags.sampled
+    assert log.log_record.body == "main;handle"
+    assert log.log_record.attributes["profile.samples"] == 3
+
+
+def test_background_sampling_and_options(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILING", "true")
+    monkeypatch.setenv("PROFILING_FREQUENCY", "100")
+    monkeypatch.setenv("PROFILING_FILE", str(tmp_path / "profile.folded"))
+    options = TgtOptions()
+    assert options.profiling
+    assert options.get_logs_endpoint().endswith("/v1/logs")
+    profiler = create_profiler(options, Resource({}))
+    profiler.start()
+    time.sleep(0.2)
+    profiler.shutdown()
+    assert profiler.sample_cpu_ns > 0
+    assert (tmp_path / "profile.folded").read_text()
+
+
+def test_dead_threads_are_forgotten_with_their_open_spans():
+    profiler = SamplingProfiler(ListExporter())
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(profiler.span_tracker)
+    tracer = provider.get_tracer("test")
+    thread = threading.Thread(target=lambda: tracer.start_span("abandoned"))
+    thread.start()
+    thread.join()
+    assert profiler.span_tracker.active(thread.ident) is not None
+    # idents are reused, so the live threads of other tests are left out
+    profiler.span_tracker.forget_threads({threading.get_ident()})
+    assert profiler.span_tracker.active(thread.ident) is None
+
+
+def test_sampling_survives_threads_starting_spans():
+    profiler = SamplingProfiler(ListExporter(), frequency=1000)
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(profiler.span_tracker)
+    tracer = provider.get_tracer("test")
+
+    def start_spans():
+        for _ in range(200):
+            with tracer.start_as_current_span("request"):
+                pass
+
+    profiler.start()
+    threads = [threading.Thread(target=start_spans) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    samples = profiler.sample_count
+    time.sleep(0.05)
+    assert profiler.sample_count > samples
+    profiler.shutdown()
+
+
+def test_failed_samples_do_not_stop_profiling(monkeypatch):
+    profiler = SamplingProfiler(ListExporter(), frequency=1000)
+    calls = []
+
+    def failing_sample():
+        calls.append(1)
+        raise RuntimeError("bad sample")
+
+    monkeypatch.setattr(profiler, "sample", failing_sample)
+    profiler.start()
+    time.sleep(0.05)
+    profiler.shutdown()
+    assert len(calls) > 1
+
+
+def test_frequency_must_be_positive(monkeypatch):
+    with pytest.raises(ValueError):
+        SamplingProfiler(ListExporter(), frequency=0)
+    monkeypatch.setenv("PROFILING_FREQUENCY", "0")
+    monkeypatch.setenv("PROFILING_EXPORT_INTERVAL", "-1")
+    options = TgtOptions()
+    assert options.profiling_frequency == DEFAULT_PROFILING_FREQUENCY
+    assert options.profiling_export_interval == \
+        DEFAULT_PROFILING_EXPORT_INTERVAL
@@ -0,0 +1,135 @@
+import gzip
+from urllib.request import Request, urlopen
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    Gauge,
+    Metric,
+    MetricsData,
+    NumberDataPoint,
+    ResourceMetrics,
+    ScopeMetrics,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+
+from tgt.opentelemetry.metrics import create_meter_provider
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.prometheus import (
+    OPENMETRICS_CONTENT_TYPE,
+    PrometheusEncoder,
+    PrometheusMetricReader,
+)
+
+
+def _provider(reader):
+    return MeterProvider(
+        metric_readers=[reader],
+        resource=Resource.create({"service.name": "scraped"}),
+        shutdown_on_exit=False,
+    )
+
+
+def test_scrape_encodes_prometheus_text():
+    reader = PrometheusMetricReader(start_server=False)
+    provider = _provider(reader)
+    meter = provider.get_meter("test", "1.0")
+    meter.create_counter("requests", description="Handled\nrequests") \
+        .add(3, {"route": "/items/\"id\""})
+    meter.create_up_down_counter("in.flight").add(2)
+    meter.create_histogram("latency").record(7, {"route": "/"})
+
+    body = reader.scrape().decode("utf-8")
+    provider.shutdown()
+
+    assert 'service_name="scraped"' in body.split("\n")[2]
+    assert "# HELP requests_total Handled\\nrequests" in body
+    assert "# TYPE requests_total counter" in body
+    assert 'requests_total{otel_scope_name="test",otel_scope_version="1.0",' \
+        'route="/items/\\"id\\""} 3' in body
+    assert "# TYPE in_flight gauge" in body
+    assert "# TYPE latency histogram" in body
+    assert 'latency_bucket{otel_scope_name="test",otel_scope_version="1.0",' \
+        'route="/",le="5.0"} 0' in body
+    assert 'le="10.0"} 1' in body
+    assert 'le="+Inf"} 1' in body
+    assert 'latency_count{otel_scope_name="test",otel_scope_version="1.0",' \
+        'route="/"} 1' in body
+
+
+def test_scrape_is_cached_until_values_change():
+    reader = PrometheusMetricReader(start_server=False)
+    provider = _provider(reader)
+    counter = provider.get_meter("test").create_counter("requests")
+    counter.add(1, {"route": "/"})
+
+    first = reader.scrape()
+    assert reader.scrape() is first
+    counter.add(1, {"route": "/"})
+    changed = reader.scrape()
+    provider.shutdown()
+
+    assert changed is not first
+    assert b"} 2\n" in changed
+
+
+def _gauge_data(attributes):
+    return MetricsData(resource_metrics=[ResourceMetrics(
+        resource=Resource.create({"service.name": "scraped"}),
+        scope_metrics=[ScopeMetrics(
+            scope=InstrumentationScope("test"),
+            metrics=[Metric(
+                name="in.flight",
+                description="",
+                unit="",
+                data=Gauge(data_points=[NumberDataPoint(
+                    attributes=attributes,
+                    start_time_unix_nano=0,
+                    time_unix_nano=0,
+                    value=1,
+                )]),
+            )],
+            schema_url="",
+        )],
+        schema_url="",
+    )])
+
+
+def test_encoding_is_regenerated_when_only_attributes_change():
+    encoder = PrometheusEncoder()
+    first = encoder.encode(_gauge_data({"route": "/a"}))
+    changed = encoder.encode(_gauge_data({"route": "/b"}))
+
+    assert b'route="/a"} 1' in first
+    assert b'route="/b"} 1' in changed
+
+
+def test_scrape_over_http_negotiates_openmetrics_and_gzip():
+    reader = PrometheusMetricReader(host="127.0.0.1", port=0)
+    provider = _provider(reader)
+    provider.get_meter("test").create_counter("requests").add(5)
+    host, port = reader.server_address
+    request = Request(f"http://{host}:{port}/metrics", headers={
+        "Accept": "application/openmetrics-text; version=1.0.0",
+        "Accept-Encoding": "gzip",
+    })
+    with urlopen(request) as response:
+        content_type = response.headers["Content-Type"]
+        body = gzip.decompress(response.read()).decode("utf-8")
+    provider.shutdown()
+
+    assert content_type == OPENMETRICS_CONTENT_TYPE
+    assert "# TYPE requests counter" in body
+    assert "requests_total{" in body
+    assert body.endswith("# EOF\n")
+
+
+def test_prometheus_metrics_option_adds_pull_reader(monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_METRICS", "true")
+    monkeypatch.setenv("OTEL_EXPORTER_PROMETHEUS_HOST", "127.0.0.1")
+    monkeypatch.setenv("OTEL_EXPORTER_PROMETHEUS_PORT", "0")
+    options = TgtOptions()
+    meter_provider = create_meter_provider(options, Resource.create({}))
+    (reader,) = meter_provider._sdk_config.metric_readers
+    assert isinstance(reader, PrometheusMetricReader)
+    meter_provider.shutdown()
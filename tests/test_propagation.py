@@ -0,0 +1,87 @@
+from opentelemetry import baggage, trace
+from opentelemetry.baggage.propagation import W3CBaggagePropagator
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.trace.propagation.tracecontext import (
+    TraceContextTextMapPropagator
+)
+
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.propagation import (
+    CachingTraceContextPropagator,
+    CappedBaggagePropagator,
+    create_propagator,
+)
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+HEADERS = [
+    {"traceparent": TRACEPARENT},
+    {"traceparent": TRACEPARENT, "tracestate": "vendor=value,other=1"},
+    {"traceparent": TRACEPARENT.replace("-01", "-00")},
+    {"traceparent": "00-" + "0" * 32 + "-b7ad6b7169203331-01"},
+    {"traceparent": "ff" + TRACEPARENT[2:]},
+    {"traceparent": TRACEPARENT + "-extra"},
+    {"traceparent": "not a traceparent"},
+    {},
+]
+
+
+def _span_context(context):
+    return trace.get_current_span(context).get_span_context()
+
+
+def test_traceparent_extract_matches_w3c_propagator():
+    expected = TraceContextTextMapPropagator()
+    actual = CachingTraceContextPropagator()
+    for _ in range(2):
+        for headers in HEADERS:
+            assert _span_context(actual.extract(headers)) == \
+                _span_context(expected.extract(headers))
+
+
+def test_traceparent_extract_reuses_parsed_headers():
+    propagator = CachingTraceContextPropagator()
+    first = trace.get_current_span(propagator.extract(HEADERS[0]))
+    second = trace.get_current_span(propagator.extract(HEADERS[0]))
+    assert first is second
+    assert propagator._parse.cache_info().hits == 1
+
+
+def test_baggage_extract_matches_w3c_propagator():
+    headers = {"baggage": "user=alice, tier=gold%20plus,bad entry,empty="}
+    expected = W3CBaggagePropagator().extract(headers)
+    actual = CappedBaggagePropagator().extract(headers)
+    assert baggage.get_all(actual) == baggage.get_all(expected)
+
+
+def test_baggage_extract_caps_entries_and_bytes():
+    header = ",".join(f"key{i}=value{i}" for i in range(20))
+    context = CappedBaggagePropagator(max_entries=5).extract(
+        {"baggage": header}
+    )
+    assert list(baggage.get_all(context)) == [f"key{i}" for i in range(5)]
+
+    context = CappedBaggagePropagator(max_bytes=35).extract(
+        {"baggage": header}
+    )
+    assert list(baggage.get_all(context)) == ["key0", "key1", "key2"]
+
+
+def test_baggage_inject_caps_entries():
+    context = None
+    for i in range(10):
+        context = baggage.set_baggage(f"key{i}", f"value {i}", context)
+    carrier = {}
+    CappedBaggagePropagator(max_entries=3).inject(carrier, context)
+    assert carrier["baggage"] == "key0=value+0,key1=value+1,key2=value+2"
+
+
+def test_create_propagator_from_options(monkeypatch):
+    monkeypatch.setenv("OTEL_PROPAGATORS", "baggage, tracecontext,unknown")
+    monkeypatch.setenv("BAGGAGE_MAX_ENTRIES", "8")
+    options = TgtOptions()
+    propagator = create_propagator(options)
+    assert isinstance(propagator, CompositePropagator)
+    baggage_propagator, trace_propagator = propagator._propagators
+    assert isinstance(baggage_propagator, CappedBaggagePropagator)
+    assert baggage_propagator._max_entries == 8
+    assert isinstance(trace_propagator, CachingTraceContextPropagator)
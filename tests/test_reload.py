@@ -0,0 +1,239 @@
+import io
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter
+)
+from opentelemetry.sdk.trace.sampling import DEFAULT_OFF
+
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.reload import (
+    RELOAD_SIGNAL,
+    ConfigReloader,
+    ReloadablePeriodicExportingMetricReader
+)
+from tgt.opentelemetry.trace import create_tracer_provider
+
+
+def _write(path, config):
+    path.write_text(json.dumps(config))
+
+
+def _provider(reloader):
+    return TracerProvider(
+        sampler=reloader.reloadable_sampler(DEFAULT_OFF),
+        span_limits=reloader.reloadable_span_limits(SpanLimits()),
+    )
+
+
+def test_reload_swaps_sampler_and_span_limits(tmp_path):
+    config = tmp_path / "config.json"
+    reloader = ConfigReloader(str(config))
+    tracer = _provider(reloader).get_tracer("test")
+    with tracer.start_as_current_span("before") as span:
+        assert not span.is_recording()
+
+    _write(config, {
+        "sampler": "always_on",
+        "span_limits": {"max_span_attributes": 2},
+    })
+    assert reloader.reload()
+    with tracer.start_as_current_span("during") as span:
+        span.set_attributes({"a": 1, "b": 2, "c": 3})
+        assert span.is_recording()
+        assert len(span.attributes) == 2
+
+    # settings removed from the file revert to those started with
+    _write(config, {})
+    assert reloader.reload()
+    with tracer.start_as_current_span("after") as span:
+        assert not span.is_recording()
+
+
+def test_invalid_config_keeps_current_settings(tmp_path):
+    config = tmp_path / "config.json"
+    reloader = ConfigReloader(str(config))
+    provider = _provider(reloader)
+    _write(config, {"sampler": "traceidratio", "sampler_arg": 0.5})
+    assert reloader.reload()
+    description = provider.sampler.get_description()
+    assert "TraceIdRatioBased{0.5}" in description
+
+    _write(config, {"sampler": "always_on", "max_export_batch_size": 0})
+    reloader.add_span_processor(BatchSpanProcessor(InMemorySpanExporter()))
+    assert not reloader.reload()
+    config.write_text("{not json")
+    assert not reloader.reload()
+    assert provider.sampler.get_description() == description
+
+
+def test_deleted_config_reverts_settings(tmp_path):
+    config = tmp_path / "config.json"
+    reloader = ConfigReloader(str(config), poll_interval=0.05)
+    provider = _provider(reloader)
+    _write(config, {"sampler": "always_on"})
+    reloader.start()
+    try:
+        assert provider.sampler.sampler.get_description() == "AlwaysOnSampler"
+        config.unlink()
+        deadline = time.monotonic() + 5
+        while provider.sampler.sampler is not DEFAULT_OFF \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.sampler.sampler is DEFAULT_OFF
+    finally:
+        reloader.stop()
+    _write(config, {"sampler": "always_on"})
+    assert reloader.reload()
+    config.unlink()
+    assert reloader.reload()
+    assert provider.sampler.sampler is DEFAULT_OFF
+
+
+def test_reload_applies_export_settings(tmp_path, monkeypatch):
+    config = tmp_path / "config.json"
+    monkeypatch.setenv("CONFIG_RELOAD_FILE", str(config))
+    options = TgtOptions()
+    reloader = ConfigReloader(options.config_reload_file)
+    provider = create_tracer_provider(options, Resource({}), reloader)
+    processor = provider._active_span_processor._span_processors[0]
+    reader = ReloadablePeriodicExportingMetricReader(
+        ConsoleMetricExporter(out=io.StringIO()),
+        export_interval_millis=60_000
+    )
+    reloader.add_metric_reader(reader)
+
+    _write(config, {
+        "schedule_delay_millis": 100,
+        "max_export_batch_size": 1024,
+        "export_interval_millis": 5_000,
+    })
+    assert reloader.reload()
+    assert processor.schedule_delay_millis == 100
+    assert processor.max_export_batch_size == 1024
+    assert len(processor.spans_list) == 1024
+    assert reader._export_interval_millis == 5_000
+
+    _write(config, {})
+    assert reloader.reload()
+    assert processor.schedule_delay_millis == 5000
+    assert processor.max_export_batch_size == 512
+    assert reader._export_interval_millis == 60_000
+    processor.shutdown()
+    reader.shutdown()
+
+
+def test_spans_started_concurrently_with_reloads(tmp_path):
+    config = tmp_path / "config.json"
+    reloader = ConfigReloader(str(config))
+    exporter = InMemorySpanExporter()
+    provider = _provider(reloader)
+    processor = BatchSpanProcessor(exporter, max_queue_size=100_000)
+    reloader.add_span_processor(processor)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("test")
+    stop = threading.Event()
+    errors, started = [], []
+
+    def start_spans():
+        count = 0
+        try:
+            while not stop.is_set():
+                with tracer.start_as_current_span("span") as span:
+                    span.set_attributes({str(i): i for i in range(8)})
+                    span.add_event("event")
+                    if span.is_recording():
+                        assert len(span.attributes) <= 8
+                count += 1
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(error)
+        started.append(count)
+
+    threads = [threading.Thread(target=start_spans) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(50):
+        _write(config, {
+            "sampler": "always_on" if i % 2 else "always_off",
+            "span_limits": {"max_span_attributes": 1 + i % 8},
+            "max_export_batch_size": 64 + i,
+            "schedule_delay_millis": 1 + i % 5,
+        })
+        assert reloader.reload()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    processor.shutdown()
+
+    assert not errors
+    assert sum(started) > 0
+    for span in exporter.get_finished_spans():
+        assert 1 <= len(span.attributes) <= 8
+
+
+@pytest.mark.skipif(RELOAD_SIGNAL is None, reason="requires SIGHUP")
+def test_watcher_reloads_on_change_and_signal(tmp_path):
+    config = tmp_path / "config.json"
+    _write(config, {"sampler": "always_on"})
+    reloader = ConfigReloader(str(config), poll_interval=0.05)
+    provider = _provider(reloader)
+    reloader.start()
+    try:
+        assert provider.sampler.sampler.get_description() == "AlwaysOnSampler"
+
+        _write(config, {"sampler": "always_off"})
+        # ensure the modification time moves on coarse filesystems
+        os.utime(config, ns=(time.time_ns(), time.time_ns() + 10**9))
+        deadline = time.monotonic() + 5
+        while provider.sampler.sampler.get_description() != \
+                "AlwaysOffSampler" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.sampler.sampler.get_description() == \
+            "AlwaysOffSampler"
+
+        reloader._poll_interval = 60
+        reloader._wake.set()
+        time.sleep(0.1)
+        _write(config, {"sampler": "always_on"})
+        reloader._mtime = os.stat(config).st_mtime_ns
+        os.kill(os.getpid(), RELOAD_SIGNAL)
+        deadline = time.monotonic() + 5
+        while provider.sampler.sampler.get_description() != \
+                "AlwaysOnSampler" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.sampler.sampler.get_description() == "AlwaysOnSampler"
+    finally:
+        reloader.stop()
+    assert signal.getsignal(RELOAD_SIGNAL) is not reloader._on_signal
+
+
+@pytest.mark.skipif(RELOAD_SIGNAL is None, reason="requires SIGHUP")
+def test_existing_signal_handler_is_kept(tmp_path):
+    def handler(signum, frame):
+        pass
+
+    previous = signal.signal(RELOAD_SIGNAL, handler)
+    reloader = ConfigReloader(str(tmp_path / "config.json"))
+    try:
+        reloader.start()
+        assert signal.getsignal(RELOAD_SIGNAL) is handler
+        reloader.stop()
+        assert signal.getsignal(RELOAD_SIGNAL) is handler
+    finally:
+        signal.signal(RELOAD_SIGNAL, previous)
+
+    reloader = ConfigReloader(str(tmp_path / "config.json"))
+    thread = threading.Thread(target=reloader.start)
+    thread.start()
+    thread.join()
+    reloader.stop()
+    assert signal.getsignal(RELOAD_SIGNAL) is previous
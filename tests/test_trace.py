@@ -1,21 +1,18 @@
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import (
-    BatchSpanProcessor,
-    ConsoleSpanExporter,
-    SimpleSpanProcessor
-)
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
     OTLPSpanExporter as HTTPSpanExporter
 )
+from tgt.opentelemetry.debug import JsonLinesSpanExporter
 from tgt.opentelemetry.options import TgtOptions
 from tgt.opentelemetry.resource import create_resource
 from tgt.opentelemetry.trace import create_tracer_provider
 
 """
-Tracer Provider only provides one of two span processors.
+Tracer Provider only provides one of two span exporters, both batched.
 
 BatchSpanProcessor (HTTP Exporter)
-SimpleSpanProcessor (Console Exporter)
+BatchSpanProcessor (JSON lines Exporter)
 
 """
 
@@ -45,7 +42,7 @@ def test_http_protocol_configures_http_span_exporter_on_batch_span_processor():
     assert isinstance(batch.span_exporter, HTTPSpanExporter)
 
 
-def test_setting_debug_adds_console_exporter_on_simple_span_processor():
+def test_setting_debug_adds_json_lines_exporter_on_batch_span_processor():
     options = TgtOptions(debug=True)
     resource = create_resource(options)
     tracer_provider = create_tracer_provider(options, resource)
@@ -53,9 +50,9 @@ def test_setting_debug_adds_console_exporter_on_simple_span_processor():
     active_span_processors = tracer_provider._active_span_processor._span_processors
     assert len(active_span_processors) == 1
 
-    (console) = active_span_processors
-    assert isinstance(console, SimpleSpanProcessor)
-    assert isinstance(console.span_exporter, ConsoleSpanExporter)
+    (debug,) = active_span_processors
+    assert isinstance(debug, BatchSpanProcessor)
+    assert isinstance(debug.span_exporter, JsonLinesSpanExporter)
 
 def test_setting_no_flags_enables_all_batch_span_processors():
     options = TgtOptions()
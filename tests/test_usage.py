@@ -0,0 +1,79 @@
+import gc
+import threading
+import tracemalloc
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+from tgt.opentelemetry.options import TgtOptions
+from tgt.opentelemetry.trace import create_tracer_provider
+from tgt.opentelemetry.usage import (
+    SPAN_ALLOCATED_BYTES_ATTRIBUTE,
+    SPAN_CPU_TIME_ATTRIBUTE,
+    ResourceUsageSpanProcessor,
+)
+
+
+def _tracer(processor):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=ALWAYS_ON, shutdown_on_exit=False)
+    provider.add_span_processor(processor)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider.get_tracer("test"), exporter
+
+
+def test_records_thread_cpu_time():
+    tracer, exporter = _tracer(ResourceUsageSpanProcessor())
+    with tracer.start_as_current_span("busy"):
+        sum(i * i for i in range(200_000))
+    (span,) = exporter.get_finished_spans()
+    assert span.attributes[SPAN_CPU_TIME_ATTRIBUTE] > 0
+    assert SPAN_ALLOCATED_BYTES_ATTRIBUTE not in span.attributes
+
+
+def test_records_net_allocations():
+    was_tracing = tracemalloc.is_tracing()
+    tracer, exporter = _tracer(ResourceUsageSpanProcessor(allocations=True))
+    try:
+        with tracer.start_as_current_span("allocating"):
+            kept = [bytearray(1024) for _ in range(100)]
+        (span,) = exporter.get_finished_spans()
+        assert span.attributes[SPAN_ALLOCATED_BYTES_ATTRIBUTE] >= 100 * 1024
+        assert kept
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+def test_skips_cpu_time_of_spans_ended_on_another_thread():
+    tracer, exporter = _tracer(ResourceUsageSpanProcessor())
+    span = tracer.start_span("handed off")
+    thread = threading.Thread(target=span.end)
+    thread.start()
+    thread.join()
+    (span,) = exporter.get_finished_spans()
+    assert SPAN_CPU_TIME_ATTRIBUTE not in span.attributes
+
+
+def test_forgets_spans_that_never_end():
+    processor = ResourceUsageSpanProcessor()
+    tracer, _ = _tracer(processor)
+    span = tracer.start_span("abandoned")
+    assert len(processor._started) == 1
+    del span
+    gc.collect()
+    assert len(processor._started) == 0
+
+
+def test_enabled_through_options(monkeypatch):
+    monkeypatch.setenv("SPAN_CPU_TIME", "true")
+    provider = create_tracer_provider(TgtOptions(), Resource({}))
+    usage, _ = provider._active_span_processor._span_processors
+    assert isinstance(usage, ResourceUsageSpanProcessor)
+    assert not usage._allocations
+    provider.shutdown()